@@ -0,0 +1,157 @@
+"""
+Export the trained Keras grading model for the lean serving backends
+(backend/fastapi_service/utils/inference_backends.py): ONNX for ONNX
+Runtime and a .tflite flatbuffer, plus int8-quantized variants of both.
+
+    python export_model.py models/produce_classifier.h5
+    python export_model.py models/produce_classifier.h5 --int8 --calibration-dir data/val/A
+
+Quantization is calibrated on real photos run through the service's own
+preprocess(), so the int8 ranges match what serving feeds the model. Every
+exported file is checked against the Keras model (top-1 agreement and the
+largest score difference) before the script exits.
+"""
+import argparse
+import glob
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# The serving code owns preprocessing and the runtime wrappers; reuse both
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "fastapi_service")
+sys.path.append(SERVICE_DIR)
+
+from utils.ai_inference import INPUT_SIZE, preprocess  # noqa: E402
+from utils.inference_backends import BACKENDS  # noqa: E402
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def load_calibration(directory, count):
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(directory, "**", pattern),
+                                                                       recursive=True))
+    if not paths:
+        raise SystemExit(f"No calibration images found in {directory}")
+    samples = []
+    for path in paths[:count]:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            samples.append(preprocess(image))
+    return np.stack(samples)
+
+
+def serving_function(model):
+    """The model as a tf.function with a dynamic batch dimension, named input 'input'"""
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec((None, *INPUT_SIZE, 3), tf.float32, name="input")])
+    def serve(images):
+        return model(images, training=False)
+
+    return serve
+
+
+def export_onnx(serve, path, opset):
+    import tf2onnx
+    tf2onnx.convert.from_function(serve, input_signature=serve.input_signature, opset=opset, output_path=path)
+
+
+def quantize_onnx(source, path, samples):
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.items = iter(samples)
+
+        def get_next(self):
+            sample = next(self.items, None)
+            return None if sample is None else {"input": sample[np.newaxis]}
+
+    # Shape inference and graph clean-up first, as onnxruntime recommends; a
+    # CNN's shapes are static apart from the batch, so ONNX's own inference suffices
+    prepared = path + ".prep.onnx"
+    quant_pre_process(source, prepared, skip_symbolic_shape=True)
+    try:
+        # QDQ int8 with per-channel weights: the layout ONNX Runtime's CPU kernels are fastest on
+        quantize_static(prepared, path, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(prepared)
+
+
+def export_tflite(serve, path, samples=None):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()])
+    if samples is not None:
+        # Full-integer weights and activations; input/output stay float32
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def check(path, backend, reference, inputs):
+    scores = BACKENDS[backend](path).predict(inputs)
+    agreement = float(np.mean(np.argmax(scores, axis=1) == np.argmax(reference, axis=1)))
+    print(f"  {os.path.basename(path):<36} {os.path.getsize(path) / 1e6:>7.1f} MB  "
+          f"top-1 agreement {agreement:6.1%}  max |diff| {float(np.max(np.abs(scores - reference))):.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("model", nargs="?", default=os.path.join(os.path.dirname(__file__), "models", "produce_classifier.h5"))
+    parser.add_argument("--output-dir", help="default: next to the model")
+    parser.add_argument("--formats", default="onnx,tflite")
+    parser.add_argument("--int8", action="store_true", help="also write int8-quantized variants")
+    parser.add_argument("--calibration-dir", help="photos used to calibrate int8 ranges (required with --int8)")
+    parser.add_argument("--calibration-count", type=int, default=200)
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model) or (os.path.isfile(args.model) and os.path.getsize(args.model) == 0):
+        raise SystemExit(f"{args.model} is missing or empty; train the model first")
+    if args.int8 and not args.calibration_dir:
+        raise SystemExit("--int8 needs --calibration-dir: random inputs give meaningless int8 ranges")
+    formats = args.formats.split(",")
+    if unknown := set(formats) - {"onnx", "tflite"}:
+        raise SystemExit(f"Unknown format(s): {', '.join(sorted(unknown))}")
+
+    import tensorflow as tf
+    model = tf.keras.models.load_model(args.model, compile=False)
+    serve = serving_function(model)
+    samples = load_calibration(args.calibration_dir, args.calibration_count) if args.calibration_dir else None
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.model))
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, os.path.splitext(os.path.basename(args.model.rstrip(os.sep)))[0])
+
+    exported = []
+    if "onnx" in formats:
+        export_onnx(serve, f"{stem}.onnx", args.opset)
+        exported.append((f"{stem}.onnx", "onnx"))
+        if args.int8:
+            quantize_onnx(f"{stem}.onnx", f"{stem}.int8.onnx", samples)
+            exported.append((f"{stem}.int8.onnx", "onnx"))
+    if "tflite" in formats:
+        export_tflite(serve, f"{stem}.tflite")
+        exported.append((f"{stem}.tflite", "tflite"))
+        if args.int8:
+            export_tflite(serve, f"{stem}.int8.tflite", samples)
+            exported.append((f"{stem}.int8.tflite", "tflite"))
+
+    inputs = samples[:64] if samples is not None else np.random.default_rng(0).random(
+        (16, *INPUT_SIZE, 3), dtype=np.float32)
+    reference = model.predict(inputs, verbose=0)
+    print(f"Exported {len(exported)} model(s); checked on {len(inputs)} "
+          f"{'calibration images' if samples is not None else 'random inputs'}:")
+    for path, backend in exported:
+        check(path, backend, reference, inputs)
+    print("Serve one with MODEL_PATH=<file> (INFERENCE_BACKEND=auto picks the runtime from the extension)")
+
+
+if __name__ == "__main__":
+    main()
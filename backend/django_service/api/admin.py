@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Farmer, ProduceRecord, QualityMetrics, Transaction
+from .models import Farmer, ProduceRecord, QualityMetrics, Transaction, AnchorBatch
 
 @admin.register(Farmer)
 class FarmerAdmin(admin.ModelAdmin):
@@ -14,6 +14,10 @@ class ProduceRecordAdmin(admin.ModelAdmin):
     list_display = ('passport_id', 'farmer', 'on_chain_status', 'created_at')
     readonly_fields = ('blockchain_hash',)
 
+@admin.register(AnchorBatch)
+class AnchorBatchAdmin(admin.ModelAdmin):
+    list_display = ('merkle_root', 'leaf_count', 'tx_hash', 'created_at')
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('produce_record', 'buyer_name', 'price', 'status', 'transaction_date')
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from .metrics import stage_timer
+
+
+class AIServiceError(Exception):
+    """The AI service answered, but not with a 200"""
+
+    def __init__(self, message, status_code=None, details=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class AIServiceUnavailable(AIServiceError):
+    """The AI service could not be reached, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open).
+    """
+
+    TRIAL = "trial"
+
+    def __init__(self, threshold=5, reset_seconds=30.0):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """False to reject the call; TRIAL if it is the half-open trial, which the caller must end"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return self.TRIAL
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """End a half-open trial that recorded neither outcome (it raised something unexpected)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class MultipartStream:
+    """
+    multipart/form-data body that reads each file in chunks as it is sent,
+    so uploads are never fully loaded into memory. Having a length lets
+    requests send Content-Length instead of chunked encoding.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, files):
+        # files: [(field, filename, fileobj, content_type)]
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._parts = []
+        for field, filename, fileobj, content_type in files:
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{field}"; filename="{os.path.basename(filename)}"\r\n'
+                f"Content-Type: {content_type or 'application/octet-stream'}\r\n\r\n"
+            ).encode()
+            self._parts.append((header, fileobj, _file_size(fileobj)))
+        self._closing = f"--{self.boundary}--\r\n".encode()
+
+    def __len__(self):
+        return sum(len(header) + size + 2 for header, _, size in self._parts) + len(self._closing)
+
+    def __iter__(self):
+        for header, fileobj, _ in self._parts:
+            yield header
+            fileobj.seek(0)
+            while True:
+                chunk = fileobj.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            yield b"\r\n"
+        yield self._closing
+
+
+def _file_size(fileobj):
+    size = getattr(fileobj, 'size', None)
+    if size is not None:
+        return size
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+class AIServiceClient:
+    """
+    Shared client for the FastAPI AI service.
+
+    One pooled keep-alive requests.Session per process, per-endpoint
+    (connect, read) timeouts, bounded retries with jittered exponential
+    backoff on connection errors and 502/503/504, and a circuit breaker so
+    a dead AI service fails fast instead of pinning Django workers.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, base_url, timeouts, retries=2, backoff=0.2, pool_size=10,
+                 breaker_threshold=5, breaker_reset=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeouts = timeouts
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _post(self, endpoint, path, files=None, stream=False, payload=None):
+        with stage_timer("ai_service"):
+            return self._request_with_retry(endpoint, 'POST', path, files, payload, stream)
+
+    def _get(self, endpoint, path):
+        with stage_timer("ai_service"):
+            return self._request_with_retry(endpoint, 'GET', path)
+
+    def _request_with_retry(self, endpoint, method, path, files=None, payload=None, stream=False):
+        permit = self.breaker.allow()
+        if not permit:
+            raise AIServiceUnavailable("AI service circuit breaker is open")
+        try:
+            return self._send(endpoint, method, path, files, payload, stream)
+        finally:
+            # Anything but a RequestException skips record_success/record_failure; without this
+            # a half-open breaker would wait for a trial that never ends and reject every call.
+            # Only the trial's own call may end it, not one admitted while the breaker was closed
+            if permit == CircuitBreaker.TRIAL:
+                self.breaker.release_trial()
+
+    def _send(self, endpoint, method, path, files, payload, stream):
+        url = f"{self.base_url}{path}"
+        timeout = self.timeouts.get(endpoint, self.timeouts['default'])
+        for attempt in range(self.retries + 1):
+            if files is not None:
+                body = MultipartStream(files)
+                kwargs = {'data': body, 'headers': {'Content-Type': body.content_type}}
+            else:
+                kwargs = {'json': payload}
+            try:
+                response = self.session.request(method, url, timeout=timeout, stream=stream, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = AIServiceUnavailable(f"Failed to connect to analysis service: {e}")
+            else:
+                if response.status_code == 200:
+                    self.breaker.record_success()
+                    return response
+                error_cls = AIServiceUnavailable if response.status_code in self.RETRY_STATUSES else AIServiceError
+                error = error_cls("Analysis service failed", response.status_code, response.text)
+                response.close()
+                if error_cls is AIServiceError:
+                    # The service is up; a 4xx/500 will not change on retry
+                    self.breaker.record_success()
+                    raise error
+
+            if attempt < self.retries:
+                # Full jitter keeps retrying Django workers from synchronising
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+        self.breaker.record_failure()
+        raise error
+
+    def analyze_image(self, fileobj, filename, content_type='image/jpeg'):
+        response = self._post('analyze', '/api/analyze', [('file', filename, fileobj, content_type)])
+        return response.json()
+
+    def analyze_batch(self, files):
+        """files: [(filename, fileobj, content_type)]; yields NDJSON items as they arrive"""
+        response = self._post(
+            'analyze_batch', '/api/analyze/batch',
+            [('files', name, fileobj, content_type) for name, fileobj, content_type in files],
+            stream=True
+        )
+        with response:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def analyze_lab_report(self, fileobj, filename, content_type):
+        response = self._post('lab_report', '/api/lab-report/analyze', [('file', filename, fileobj, content_type)])
+        return response.json()
+
+    def grading_rules(self):
+        """Active grading rules version and table"""
+        return self._get('grading', '/api/grading/rules').json()
+
+    def grade_produce_batch(self, columns, version=None):
+        """columns: confidence, freshness, saturation, defect_count lists; returns grade/label/freshness lists"""
+        return self._post('grading', '/api/grading/produce', payload={**columns, 'version': version}).json()
+
+    def grade_soil_batch(self, columns, version=None):
+        """columns: "<key>" values and "<key>_status" remarks; returns grade/description/count/issues lists"""
+        return self._post('grading', '/api/grading/soil', payload={'columns': columns, 'version': version}).json()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ai_client():
+    """Process-wide client, so every view shares the same connection pool."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AIServiceClient(
+                    settings.FASTAPI_SERVICE_URL,
+                    timeouts=settings.AI_SERVICE_TIMEOUTS,
+                    retries=settings.AI_SERVICE_RETRIES,
+                    pool_size=settings.AI_SERVICE_POOL_SIZE,
+                    breaker_threshold=settings.AI_SERVICE_BREAKER_THRESHOLD,
+                    breaker_reset=settings.AI_SERVICE_BREAKER_RESET,
+                )
+    return _client
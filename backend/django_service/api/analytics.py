@@ -0,0 +1,352 @@
+"""
+Produce quality analytics: grade distribution and average confidence,
+freshness, saturation and defects per farmer, location and day or month.
+
+Every insert (and re-grade) writes a few QualityRollupDelta rows, which are
+pre-aggregated per day, farmer, location and grade, in the same transaction
+as the change. save() and delete() of ProduceRecord and QualityMetrics
+(admin edits, cascades from a deleted farmer) write them through the signal
+receivers at the bottom. Re-grading uses bulk_update, which sends no
+signals, so it calls record_rollups itself. The compact_rollups
+command then folds the deltas into QualityRollup rows at four levels:
+day or month, and per farmer or per location. A query reads the
+coarsest rollups that fit, plus the deltas not yet compacted, so it touches
+thousands of rows instead of every record. Whole months come from month
+rows, and partial months at the ends of the range come from day rows.
+
+Rollup rows hold counts and sums, so rows for the same key simply add up. A
+duplicate row (for example from two overlapping compactions) is therefore
+still counted correctly.
+
+Location is the farmer's location when the record was graded. To recompute
+everything from the records (backfill, or after farmers move), run
+`compact_rollups --rebuild`.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce, TruncDate, TruncMonth
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import ProduceRecord, QualityMetrics, QualityRollup, QualityRollupDelta
+
+TOTALS = ['record_count', 'confidence_sum', 'freshness_sum', 'saturation_sum', 'saturation_count',
+          'defects_sum', 'defects_count']
+GROUP_BY = ('farmer', 'location', 'day', 'month', 'grade')
+# (period_type, per farmer) rollup levels kept by compaction
+LEVELS = [('day', True), ('day', False), ('month', True), ('month', False)]
+
+# KT('metrics__surface_defects__count') would resolve the JSON path on metrics_id
+_defects = Cast(KeyTextTransform('count', 'metrics__surface_defects'), FloatField())
+# The same totals straight from the records: the on-the-fly GROUP BY
+RECORD_TOTALS = {
+    'record_count': Count('id'),
+    'confidence_sum': Sum('metrics__confidence_score'),
+    'freshness_sum': Sum('metrics__freshness_score'),
+    'saturation_sum': Coalesce(Sum('metrics__color_saturation'), 0.0),
+    'saturation_count': Count('metrics__color_saturation'),
+    'defects_sum': Coalesce(Sum(_defects), 0.0),
+    'defects_count': Count(_defects),
+}
+SUMMED_TOTALS = {name: Sum(name) for name in TOTALS}
+
+
+def _totals(metrics):
+    defects = metrics.surface_defects.get('count') if isinstance(metrics.surface_defects, dict) else None
+    saturation = metrics.color_saturation
+    return (1, metrics.confidence_score, metrics.freshness_score, saturation or 0.0, int(saturation is not None),
+            defects or 0.0, int(defects is not None))
+
+
+def record_rollups(records, sign=1):
+    """
+    Write rollup deltas for ProduceRecords that have metrics (farmer and
+    metrics are read from the instances). With sign=-1 the same values are
+    subtracted, which is how a re-grade removes a record's old grade.
+    """
+    totals = defaultdict(lambda: [0] * len(TOTALS))
+    for record in records:
+        if record.metrics is None:
+            continue
+        key = (timezone.localdate(record.created_at), record.farmer_id, record.farmer.location, record.metrics.grade)
+        row = totals[key]
+        for i, value in enumerate(_totals(record.metrics)):
+            row[i] += sign * value
+    QualityRollupDelta.objects.bulk_create([
+        QualityRollupDelta(day=day, farmer_id=farmer, location=location, grade=grade, **dict(zip(TOTALS, values)))
+        for (day, farmer, location, grade), values in totals.items()
+    ])
+
+
+def _records():
+    return ProduceRecord.objects.filter(metrics__isnull=False).annotate(
+        day=TruncDate('created_at'), location=F('farmer__location'), grade=F('metrics__grade')
+    )
+
+
+def _aggregate(queryset, date_field, period_type, keys, totals):
+    """Totals per key and day or month (period_type None: over the whole range)"""
+    if period_type is None:
+        return queryset.values(*keys).annotate(**totals).order_by()
+    bucket = F(date_field) if period_type == 'day' else TruncMonth(date_field)
+    return queryset.annotate(bucket=bucket).values('bucket', *keys).annotate(**totals).order_by()
+
+
+def _level_keys(by_farmer):
+    return ['farmer', 'location', 'grade'] if by_farmer else ['location', 'grade']
+
+
+def _existing(period_type, by_farmer, keys):
+    """
+    (pk, key, totals) of the rollup rows for `keys`. Reads the level over the
+    keys' period span as plain tuples: cheap for the usual "today only"
+    compaction, and one pass of the level after a re-grade.
+    """
+    periods = [key[0] for key in keys]
+    rows = QualityRollup.objects.filter(period_type=period_type, farmer__isnull=not by_farmer,
+                                        period__range=(min(periods), max(periods)))
+    if by_farmer:
+        rows = rows.filter(farmer__in={key[1] for key in keys})
+    for pk, *values in rows.values_list('pk', 'period', 'farmer', 'location', 'grade', *TOTALS).iterator(5000):
+        key = tuple(values[:4])
+        if key in keys:
+            yield pk, key, values[4:]
+
+
+def _merge(period_type, by_farmer, rows):
+    """Add aggregated rows to the rollups of one level"""
+    merged = {}
+    for row in rows:
+        key = (row['bucket'], row.get('farmer'), row['location'], row['grade'])
+        merged[key] = QualityRollup(period_type=period_type, period=key[0], farmer_id=key[1], location=key[2],
+                                    grade=key[3], **{name: row[name] for name in TOTALS})
+    if not merged:
+        return
+    stale = []
+    for pk, key, totals in _existing(period_type, by_farmer, merged):
+        total = merged[key]
+        for name, value in zip(TOTALS, totals):
+            setattr(total, name, getattr(total, name) + value)
+        stale.append(pk)
+    # Replacing the rows is much cheaper than bulk_update's per-row CASE; nothing references them
+    QualityRollup.objects.filter(pk__in=stale).delete()
+    # Re-grades can take a key back to zero records
+    QualityRollup.objects.bulk_create([total for total in merged.values() if total.record_count], batch_size=1000)
+
+
+def compact_rollups(batch_size=5000):
+    """Fold pending deltas into QualityRollup, one transaction per batch; returns the number folded"""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            pending = QualityRollupDelta.objects.order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # A second compactor skips the batch instead of counting it twice
+                pending = pending.select_for_update(skip_locked=True)
+            ids = list(pending.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return folded
+            deltas = QualityRollupDelta.objects.filter(id__in=ids)
+            for period_type, by_farmer in LEVELS:
+                # A deleted farmer's deltas (farmer null) only count for the location
+                level = deltas.filter(farmer__isnull=False) if by_farmer else deltas
+                _merge(period_type, by_farmer,
+                       _aggregate(level, 'day', period_type, _level_keys(by_farmer), SUMMED_TOTALS))
+            deltas.delete()
+        folded += len(ids)
+
+
+def rebuild_rollups():
+    """Recompute every level from the records with GROUP BY; drops pending deltas"""
+    with transaction.atomic():
+        QualityRollupDelta.objects.all().delete()
+        QualityRollup.objects.all().delete()
+        for period_type, by_farmer in LEVELS:
+            rows = _aggregate(_records(), 'day', period_type, _level_keys(by_farmer), RECORD_TOTALS)
+            QualityRollup.objects.bulk_create((
+                QualityRollup(period_type=period_type, period=row['bucket'], farmer_id=row.get('farmer'),
+                              location=row['location'], grade=row['grade'],
+                              **{name: row[name] for name in TOTALS})
+                for row in rows.iterator()
+            ), batch_size=5000)
+    return QualityRollup.objects.count()
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_span(start, end):
+    """
+    Whole months inside [start, end] as a half-open [first, after) range of
+    month starts (None: unbounded), and the day ranges left over at the ends.
+    """
+    first = start if start is None or start.day == 1 else _next_month(start)
+    if end is None:
+        after = None
+    elif _next_month(end) - timedelta(days=1) == end:
+        after = _next_month(end)
+    else:
+        after = end.replace(day=1)
+    if first is not None and after is not None and first >= after:
+        return None, [(start, end)]
+    edges = []
+    if start is not None and start < first:
+        edges.append((start, first - timedelta(days=1)))
+    if after is not None and after <= end:
+        edges.append((after, end))
+    return (first, after), edges
+
+
+def _in_range(queryset, field, start, end):
+    if start is not None:
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if end is not None:
+        queryset = queryset.filter(**{f"{field}__lte": end})
+    return queryset
+
+
+def _sources(start, end, group_by, farmer, location):
+    """(queryset, date field) pairs whose totals add up to the answer"""
+    by_farmer = 'farmer' in group_by or farmer is not None
+    filters = {'location': location} if location is not None else {}
+    if farmer is not None:
+        filters['farmer'] = farmer
+    rollups = QualityRollup.objects.filter(farmer__isnull=not by_farmer, **filters)
+    deltas = QualityRollupDelta.objects.filter(**filters)
+    if by_farmer:
+        deltas = deltas.filter(farmer__isnull=False)
+
+    sources = [(_in_range(deltas, 'day', start, end), 'day')]
+    if 'day' in group_by:
+        months, days = None, [(start, end)]
+    else:
+        months, days = _month_span(start, end)
+    if months is not None:
+        month_rows = rollups.filter(period_type='month')
+        if months[0] is not None:
+            month_rows = month_rows.filter(period__gte=months[0])
+        if months[1] is not None:
+            month_rows = month_rows.filter(period__lt=months[1])
+        sources.append((month_rows, 'period'))
+    for low, high in days:
+        sources.append((_in_range(rollups.filter(period_type='day'), 'period', low, high), 'period'))
+    return sources
+
+
+def quality_summary(start=None, end=None, group_by=(), farmer=None, location=None, source='rollup'):
+    """
+    Grade counts and averages between `start` and `end` (inclusive dates,
+    either may be None) per combination of `group_by` fields. `source='raw'`
+    runs the same query as a GROUP BY over the records instead.
+    """
+    time_key = next((key for key in ('day', 'month') if key in group_by), None)
+    keys = [key for key in ('farmer', 'location') if key in group_by] + ['grade']
+
+    if source == 'raw':
+        records = _records()
+        if farmer is not None:
+            records = records.filter(farmer=farmer)
+        if location is not None:
+            records = records.filter(location=location)
+        parts = [_aggregate(_in_range(records, 'day', start, end), 'day', time_key, keys, RECORD_TOTALS)]
+    else:
+        parts = [_aggregate(queryset, field, time_key, keys, SUMMED_TOTALS)
+                 for queryset, field in _sources(start, end, group_by, farmer, location)]
+
+    groups = {}
+    for part in parts:
+        for row in part:
+            period = row['bucket'].isoformat()[:7 if time_key == 'month' else 10] if time_key else None
+            values = {'farmer': row.get('farmer'), 'location': row.get('location'), 'grade': row['grade'],
+                      time_key: period}
+            group = tuple(values[key] for key in GROUP_BY if key in group_by)
+            totals = groups.setdefault(group, {'grades': defaultdict(int), **{name: 0 for name in TOTALS}})
+            totals['grades'][row['grade']] += row['record_count']
+            for name in TOTALS:
+                totals[name] += row[name]
+
+    results = []
+    # None (unknown location) sorts last
+    for group, totals in sorted(groups.items(), key=lambda item: [(v is None, v or 0) for v in item[0]]):
+        if not totals['record_count']:
+            continue
+        results.append({
+            **dict(zip([key for key in GROUP_BY if key in group_by], group)),
+            'records': totals['record_count'],
+            'grades': {grade: count for grade, count in sorted(totals['grades'].items()) if count},
+            'avg_confidence': totals['confidence_sum'] / totals['record_count'],
+            'avg_freshness': totals['freshness_sum'] / totals['record_count'],
+            'avg_saturation': (totals['saturation_sum'] / totals['saturation_count']
+                               if totals['saturation_count'] else None),
+            'avg_defects': totals['defects_sum'] / totals['defects_count'] if totals['defects_count'] else None,
+        })
+    return results
+
+
+# Fields a rollup key or its totals are read from
+RECORD_FIELDS = {'farmer', 'farmer_id', 'metrics', 'metrics_id'}
+METRICS_FIELDS = {'grade', 'confidence_score', 'freshness_score', 'color_saturation', 'surface_defects'}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=ProduceRecord)
+def _record_saving(sender, instance, update_fields=None, **kwargs):
+    if not instance._state.adding and _touches(update_fields, RECORD_FIELDS):
+        instance._rollup_before = ProduceRecord.objects.filter(pk=instance.pk).values_list(
+            'farmer_id', 'metrics_id').first()
+
+
+@receiver(post_save, sender=ProduceRecord)
+def _record_saved(sender, instance, created, **kwargs):
+    before = instance.__dict__.pop('_rollup_before', None)
+    if created:
+        record_rollups([instance])
+    elif before is not None and before != (instance.farmer_id, instance.metrics_id):
+        farmer_id, metrics_id = before
+        record_rollups([ProduceRecord(pk=instance.pk, farmer_id=farmer_id, metrics_id=metrics_id,
+                                      created_at=instance.created_at)], sign=-1)
+        record_rollups([instance])
+
+
+@receiver(pre_delete, sender=ProduceRecord)
+def _record_deleting(sender, instance, **kwargs):
+    # Also sent per record when a farmer is deleted (CASCADE). pre_delete runs
+    # before the farmer's deltas are unlinked, so this one is unlinked with them
+    record_rollups([instance], sign=-1)
+
+
+def _graded_records(metrics):
+    return list(ProduceRecord.objects.filter(metrics_id=metrics.pk).select_related('farmer', 'metrics'))
+
+
+@receiver(pre_save, sender=QualityMetrics)
+def _metrics_saving(sender, instance, update_fields=None, **kwargs):
+    # A new QualityMetrics is counted when a record is saved with it
+    if not instance._state.adding and _touches(update_fields, METRICS_FIELDS):
+        instance._rollup_records = _graded_records(instance)
+
+
+@receiver(post_save, sender=QualityMetrics)
+def _metrics_saved(sender, instance, **kwargs):
+    records = instance.__dict__.pop('_rollup_records', None)
+    if not records or all(
+        (record.metrics.grade, _totals(record.metrics)) == (instance.grade, _totals(instance)) for record in records
+    ):
+        return
+    record_rollups(records, sign=-1)
+    for record in records:
+        record.metrics = instance
+    record_rollups(records)
+
+
+@receiver(pre_delete, sender=QualityMetrics)
+def _metrics_deleting(sender, instance, **kwargs):
+    # Before SET_NULL unlinks the records, which sends no signals
+    record_rollups(_graded_records(instance), sign=-1)
@@ -0,0 +1,159 @@
+"""
+Batched on-chain anchoring of produce quality hashes.
+
+Instead of one transaction per ProduceRecord, quality hashes are buffered
+(queued_for_anchor_at set, anchor_batch empty). When the buffer holds
+ANCHOR_BATCH_SIZE hashes, or the oldest has waited ANCHOR_BATCH_SECONDS,
+a Merkle tree is built over the batch and only its root is written to
+KrishiPassport.anchorRoot. Each record keeps its leaf index and inclusion
+proof, so the passport can prove membership offline against the root.
+
+Request handlers only buffer; batches are anchored by the
+anchor_quality_hashes command (run it with --loop). A batch is sealed
+(records assigned, root stored, anchored_at empty) in one transaction and
+its root sent afterwards, outside any transaction. A batch whose send
+failed, or whose tx hash was never recorded, is retried with the same root,
+so no hash is ever anchored under two roots.
+"""
+import uuid
+import hashlib
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ProduceRecord, AnchorBatch
+from .metrics import stage_timer
+from .read_cache import invalidate_produce
+from blockchain.contract_interaction import ContractInteraction
+from blockchain.merkle import merkle_proofs, verify_proof
+
+
+def quality_hash_for(record):
+    quality_data_string = f"{record.passport_id}-{record.metrics.grade}-{record.metrics.freshness_score}"
+    return hashlib.sha256(quality_data_string.encode()).hexdigest()
+
+
+class InMemoryChain:
+    """Chain stub for tests and offline runs: remembers anchored roots"""
+
+    def __init__(self):
+        self.roots = {}
+        self._lock = threading.Lock()
+
+    def anchor_merkle_root(self, merkle_root, leaf_count):
+        tx_hash = f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}"[:66]
+        with self._lock:
+            self.roots[merkle_root] = (leaf_count, tx_hash)
+        return tx_hash
+
+    def is_root_anchored(self, merkle_root):
+        return merkle_root in self.roots
+
+
+_memory_chain = InMemoryChain()
+
+
+def get_chain():
+    if settings.ANCHOR_CHAIN == 'memory':
+        return _memory_chain
+    return ContractInteraction()
+
+
+def pending_records():
+    return ProduceRecord.objects.filter(
+        queued_for_anchor_at__isnull=False, anchor_batch__isnull=True
+    ).order_by('queued_for_anchor_at', 'id')
+
+
+def queue_for_anchoring(record):
+    """Buffer the record's quality hash for the next batch"""
+    record.quality_hash = quality_hash_for(record)
+    record.queued_for_anchor_at = timezone.now()
+    record.save(update_fields=['quality_hash', 'queued_for_anchor_at'])
+    return record.quality_hash
+
+
+def flush_due(force=False):
+    """Retry unsent batches, then anchor pending hashes while a batch is full or old enough"""
+    batches = [submit_batch(batch) for batch in AnchorBatch.objects.filter(anchored_at__isnull=True).order_by('id')]
+    while True:
+        pending = pending_records()
+        count = pending.count()
+        if count == 0:
+            break
+        oldest = pending.values_list('queued_for_anchor_at', flat=True).first()
+        expired = timezone.now() - oldest >= timedelta(seconds=settings.ANCHOR_BATCH_SECONDS)
+        if not (force or expired or count >= settings.ANCHOR_BATCH_SIZE):
+            break
+        batch = anchor_batch(settings.ANCHOR_BATCH_SIZE)
+        if batch is None:
+            break
+        batches.append(batch)
+    return batches
+
+
+def anchor_batch(limit):
+    """Seal up to `limit` pending hashes into a batch and anchor its root"""
+    batch = seal_batch(limit)
+    return submit_batch(batch) if batch is not None else None
+
+
+def seal_batch(limit):
+    """Build one Merkle tree over up to `limit` pending hashes and store it, not yet anchored"""
+    with transaction.atomic():
+        records = list(pending_records().select_for_update(skip_locked=True)[:limit])
+        if not records:
+            return None
+
+        root, proofs = merkle_proofs([r.quality_hash for r in records])
+        batch = AnchorBatch.objects.create(merkle_root=root, leaf_count=len(records))
+        for index, (record, proof) in enumerate(zip(records, proofs)):
+            record.anchor_batch = batch
+            record.anchor_leaf_index = index
+            record.merkle_proof = proof
+        ProduceRecord.objects.bulk_update(records, ['anchor_batch', 'anchor_leaf_index', 'merkle_proof'])
+    return batch
+
+
+def submit_batch(batch):
+    """Send a sealed batch's root (unless the chain already has it) and mark its records anchored"""
+    chain = get_chain()
+    tx_hash = batch.tx_hash
+    if not chain.is_root_anchored(batch.merkle_root):
+        with stage_timer("chain_submit"):
+            tx_hash = chain.anchor_merkle_root(batch.merkle_root, batch.leaf_count)
+        if not tx_hash:
+            raise RuntimeError("Blockchain anchoring failed")
+
+    with transaction.atomic():
+        batch.tx_hash = tx_hash
+        batch.anchored_at = timezone.now()
+        batch.save(update_fields=['tx_hash', 'anchored_at'])
+        records = ProduceRecord.objects.filter(anchor_batch=batch)
+        pks = list(records.values_list('pk', flat=True))
+        records.update(blockchain_hash=tx_hash, on_chain_status=True)
+        # update() sends no post_save, so drop the cached passports here
+        transaction.on_commit(lambda: invalidate_produce(pks))
+    return batch
+
+
+def proof_for(record):
+    """Inclusion proof for the passport, verified locally against the root"""
+    if record.anchor_batch_id is None or record.anchor_batch.anchored_at is None:
+        return {
+            "passport_id": record.passport_id,
+            "quality_hash": record.quality_hash,
+            "anchored": False,
+        }
+    batch = record.anchor_batch
+    return {
+        "passport_id": record.passport_id,
+        "quality_hash": record.quality_hash,
+        "anchored": True,
+        "merkle_root": batch.merkle_root,
+        "leaf_index": record.anchor_leaf_index,
+        "proof": record.merkle_proof,
+        "tx_hash": batch.tx_hash,
+        "verified": verify_proof(record.quality_hash, record.merkle_proof, batch.merkle_root),
+    }
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        # Connects the read-cache invalidation and analytics rollup signals
+        from . import analytics, read_cache  # noqa: F401
@@ -0,0 +1,281 @@
+"""
+Background job queue for the produce full pipeline.
+
+Each upload becomes three chained tasks, ai -> db -> chain, so the HTTP
+request only saves the image and returns. Task state lives on
+ProduceRecord.pipeline_status / pipeline_stages, which the status and
+SSE endpoints read.
+
+Two local brokers are available (settings.PIPELINE_QUEUE_BACKEND):
+
+- "inprocess": a queue.Queue drained by worker threads inside the web
+  process. Zero setup, but tasks are lost if the process dies.
+- "sqlite": a task table in settings.PIPELINE_QUEUE_DB shared by every
+  process; run `python manage.py run_pipeline_worker` to drain it. A claim
+  is a lease of settings.PIPELINE_TASK_LEASE seconds: if the worker dies
+  mid-task, another worker takes the task once the lease expires (the db
+  and chain stages skip work that already happened).
+"""
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from .models import ProduceRecord, QualityMetrics
+from .ai_client import get_ai_client
+from .anchoring import quality_hash_for, queue_for_anchoring
+from .metrics import stage_timer
+from blockchain.contract_interaction import ContractInteraction
+
+PIPELINE_STAGES = ('ai', 'db', 'chain')
+
+
+def initial_stages():
+    return {stage: 'pending' for stage in PIPELINE_STAGES}
+
+
+def _update_stage(record_id, stage, state, error=None):
+    record = ProduceRecord.objects.get(pk=record_id)
+    stages = dict(record.pipeline_stages or initial_stages())
+    stages[stage] = state
+    record.pipeline_stages = stages
+    if state == 'failed':
+        record.pipeline_status = 'failed'
+        record.pipeline_error = f"{stage}: {error}"
+    elif stage == PIPELINE_STAGES[-1] and state == 'done':
+        record.pipeline_status = 'completed'
+        record.pipeline_error = None
+    else:
+        record.pipeline_status = 'running'
+    record.save(update_fields=['pipeline_status', 'pipeline_stages', 'pipeline_error'])
+    return record
+
+
+def run_ai_stage(record, payload):
+    """Calls the FastAPI service; the analysis is passed on to the db stage"""
+    with record.image.open('rb') as img_file:
+        return get_ai_client().analyze_image(img_file, record.image.name)
+
+
+def run_db_stage(record, analysis_data):
+    if record.metrics_id is not None:
+        # A retry of a task that already wrote its metrics
+        return None
+    with stage_timer("db_write"):
+        metrics = QualityMetrics.objects.create(
+            grade=analysis_data.get('grade'),
+            confidence_score=analysis_data.get('confidence_score'),
+            freshness_score=analysis_data.get('freshness_score'),
+            color_saturation=analysis_data.get('color_saturation'),
+            surface_defects=analysis_data.get('surface_defects'),
+            grading_rules_version=analysis_data.get('rules_version')
+        )
+        record.metrics = metrics
+        # The analytics post_save receiver records the rollup delta
+        record.save(update_fields=['metrics'])
+    return None
+
+
+def run_chain_stage(record, payload):
+    # A retried or redelivered task must not send a second transaction
+    if record.blockchain_hash or record.on_chain_status:
+        return None
+    if settings.ANCHOR_MODE == 'batch':
+        if record.queued_for_anchor_at is not None:
+            return None
+        # Buffered; on_chain_status flips when the batch root is anchored
+        queue_for_anchoring(record)
+        return None
+
+    quality_hash = quality_hash_for(record)
+    record.quality_hash = quality_hash
+
+    blockchain = ContractInteraction()
+    with stage_timer("chain_submit"):
+        tx_hash = blockchain.record_quality_on_chain(record.passport_id, quality_hash)
+    if not tx_hash:
+        raise RuntimeError("Blockchain recording failed")
+
+    record.blockchain_hash = tx_hash
+    record.on_chain_status = True
+    record.save(update_fields=['quality_hash', 'blockchain_hash', 'on_chain_status'])
+    return None
+
+
+STAGE_HANDLERS = {
+    'ai': run_ai_stage,
+    'db': run_db_stage,
+    'chain': run_chain_stage,
+}
+
+
+def execute_task(task_queue, record_id, stage, payload, attempt):
+    """Run one stage, then enqueue the next one (or a retry)."""
+    close_old_connections()
+    try:
+        record = _update_stage(record_id, stage, 'running')
+        result = STAGE_HANDLERS[stage](record, payload)
+    except ProduceRecord.DoesNotExist:
+        return
+    except Exception as e:
+        if attempt + 1 < settings.PIPELINE_MAX_ATTEMPTS:
+            _update_stage(record_id, stage, 'retrying')
+            task_queue.enqueue(record_id, stage, payload, attempt + 1,
+                               delay=settings.PIPELINE_RETRY_DELAY * (2 ** attempt))
+        else:
+            _update_stage(record_id, stage, 'failed', error=str(e))
+        return
+    finally:
+        close_old_connections()
+
+    _update_stage(record_id, stage, 'done')
+    index = PIPELINE_STAGES.index(stage)
+    if index + 1 < len(PIPELINE_STAGES):
+        task_queue.enqueue(record_id, PIPELINE_STAGES[index + 1], result)
+
+
+class InProcessTaskQueue:
+    """Worker threads in this process draining a queue.Queue"""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"pipeline-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, record_id, stage, payload=None, attempt=0, delay=0):
+        self._ensure_workers()
+        item = (record_id, stage, payload, attempt)
+        if delay:
+            timer = threading.Timer(delay, self._queue.put, args=(item,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._queue.put(item)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            record_id, stage, payload, attempt = self._queue.get()
+            execute_task(self, record_id, stage, payload, attempt)
+
+
+class SQLiteTaskQueue:
+    """Durable task table in a SQLite file, leased atomically by any process"""
+
+    def __init__(self, path, lease_seconds=600.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pipeline_task ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, record_id INTEGER, stage TEXT, "
+            "payload TEXT, attempt INTEGER, available_at REAL, claimed_by TEXT, claimed_at REAL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pipeline_task)")}
+        if 'claimed_at' not in columns:
+            # Queue files created before leases; their claimed rows have no lease and are taken at once
+            conn.execute("ALTER TABLE pipeline_task ADD COLUMN claimed_at REAL")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, record_id, stage, payload=None, attempt=0, delay=0):
+        self._connect().execute(
+            "INSERT INTO pipeline_task (record_id, stage, payload, attempt, available_at) VALUES (?, ?, ?, ?, ?)",
+            (record_id, stage, json.dumps(payload), attempt, time.time() + delay)
+        )
+
+    def claim(self, worker_id):
+        """Atomically take the oldest ready task, or one whose lease expired; None if there is none"""
+        now = time.time()
+        row = self._connect().execute(
+            "UPDATE pipeline_task SET claimed_by = ?, claimed_at = ? WHERE id = ("
+            "SELECT id FROM pipeline_task WHERE available_at <= ? AND "
+            "(claimed_by IS NULL OR claimed_at IS NULL OR claimed_at < ?) "
+            "ORDER BY id LIMIT 1) RETURNING id, record_id, stage, payload, attempt",
+            (worker_id, now, now, now - self.lease_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        task_id, record_id, stage, payload, attempt = row
+        return task_id, record_id, stage, json.loads(payload), attempt
+
+    def complete(self, task_id, worker_id):
+        # A worker that outlived its lease leaves the task to whoever took it over
+        self._connect().execute("DELETE FROM pipeline_task WHERE id = ? AND claimed_by = ?", (task_id, worker_id))
+
+    def depth(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM pipeline_task WHERE claimed_by IS NULL"
+        ).fetchone()[0]
+
+    def work(self, poll_interval=0.5, stop_event=None):
+        worker_id = uuid.uuid4().hex
+        while stop_event is None or not stop_event.is_set():
+            task = self.claim(worker_id)
+            if task is None:
+                time.sleep(poll_interval)
+                continue
+            task_id, record_id, stage, payload, attempt = task
+            try:
+                execute_task(self, record_id, stage, payload, attempt)
+            finally:
+                self.complete(task_id, worker_id)
+
+
+_task_queue = None
+_task_queue_lock = threading.Lock()
+
+
+def get_task_queue():
+    global _task_queue
+    if _task_queue is None:
+        with _task_queue_lock:
+            if _task_queue is None:
+                if settings.PIPELINE_QUEUE_BACKEND == 'sqlite':
+                    _task_queue = SQLiteTaskQueue(settings.PIPELINE_QUEUE_DB, settings.PIPELINE_TASK_LEASE)
+                else:
+                    _task_queue = InProcessTaskQueue(settings.PIPELINE_WORKERS)
+    return _task_queue
+
+
+def submit_pipeline(record):
+    """Mark the record queued and enqueue its first stage"""
+    record.pipeline_status = 'queued'
+    record.pipeline_stages = initial_stages()
+    record.pipeline_error = None
+    record.save(update_fields=['pipeline_status', 'pipeline_stages', 'pipeline_error'])
+    get_task_queue().enqueue(record.pk, PIPELINE_STAGES[0])
+
+
+def pipeline_state(record):
+    return {
+        "id": record.pk,
+        "passport_id": record.passport_id,
+        "pipeline_status": record.pipeline_status,
+        "stages": record.pipeline_stages,
+        "error": record.pipeline_error,
+        "on_chain_status": record.on_chain_status,
+        "blockchain_hash": record.blockchain_hash,
+    }
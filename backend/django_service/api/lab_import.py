@@ -0,0 +1,210 @@
+"""
+Bulk lab report import for backfills from partner labs.
+
+Reports come from a directory tree or a .zip/.tar archive. A bounded thread
+pool extracts them in parallel, results are written with bulk_create in
+chunks, and the sha256 of every imported file is appended to a checkpoint
+so a crashed or interrupted import picks up where it stopped.
+"""
+import io
+import os
+import time
+import hashlib
+import tarfile
+import zipfile
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.dateparse import parse_date
+from django.utils.module_loading import import_string
+from .ai_client import get_ai_client
+from .models import LabReport
+
+REPORT_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+
+
+def lab_report_from_result(result, report_image):
+    """Unsaved LabReport from a /api/lab-report/analyze response"""
+    parameters = result.get('parameters') or {}
+    try:
+        report_date = parse_date(parameters.get('report_date') or '')
+    except ValueError:
+        report_date = None
+    return LabReport(
+        report_image=report_image,
+        sample_id=parameters.get('sample_id'),
+        lab_name=parameters.get('lab_name'),
+        report_date=report_date,
+        ph_value=parameters.get('pH'),
+        ph_status=parameters.get('pH_status'),
+        nitrogen_value=parameters.get('nitrogen'),
+        nitrogen_status=parameters.get('nitrogen_status'),
+        phosphorus_value=parameters.get('phosphorus'),
+        phosphorus_status=parameters.get('phosphorus_status'),
+        potassium_value=parameters.get('potassium'),
+        potassium_status=parameters.get('potassium_status'),
+        organic_carbon_value=parameters.get('organic_carbon'),
+        organic_carbon_status=parameters.get('organic_carbon_status'),
+        grade=result['grade'],
+        grade_description=result['grade_description'],
+        out_of_range_count=result['out_of_range_count'],
+        issues=result['issues'],
+        grading_rules_version=result.get('rules_version'),
+    )
+
+
+class ServiceExtractor:
+    """Sends each report to the AI service lab-report endpoint"""
+
+    def __call__(self, name, data):
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return get_ai_client().analyze_lab_report(io.BytesIO(data), name, content_type)
+
+
+class StubExtractor:
+    """Offline stand-in with a fixed all-normal result, for dry runs and load tests"""
+
+    def __call__(self, name, data):
+        return {
+            "grade": "A",
+            "grade_description": "Top Quality - All parameters within normal range",
+            "out_of_range_count": 0,
+            "issues": [],
+            "parameters": {
+                "pH": 6.8, "pH_status": "Normal",
+                "nitrogen": 280, "nitrogen_status": "Adequate",
+                "phosphorus": 18, "phosphorus_status": "Adequate",
+                "potassium": 140, "potassium_status": "Normal",
+                "organic_carbon": None, "organic_carbon_status": None,
+                "report_date": None, "lab_name": "Stub Laboratory",
+                "sample_id": os.path.splitext(os.path.basename(name))[0],
+            },
+        }
+
+
+EXTRACTORS = {'service': ServiceExtractor, 'stub': StubExtractor}
+
+
+def get_extractor(name=None):
+    """'service', 'stub' or a dotted path to a callable class taking (name, data)"""
+    name = name or settings.LAB_IMPORT_EXTRACTOR
+    extractor_cls = EXTRACTORS.get(name) or import_string(name)
+    return extractor_cls()
+
+
+def _is_report(name):
+    return name.lower().endswith(REPORT_EXTENSIONS) and not os.path.basename(name).startswith('.')
+
+
+def iter_archive(fileobj, name):
+    """Yield (name, bytes) for the reports inside a .zip or .tar(.gz) file object"""
+    if name.lower().endswith('.zip'):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_report(info.filename):
+                    yield info.filename, archive.read(info)
+    else:
+        with tarfile.open(fileobj=fileobj) as archive:
+            for member in archive:
+                if member.isfile() and _is_report(member.name):
+                    yield member.name, archive.extractfile(member).read()
+
+
+def iter_report_files(path):
+    """Yield (name, bytes) for each report in a directory tree or archive"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                if _is_report(filename):
+                    full_path = os.path.join(root, filename)
+                    with open(full_path, 'rb') as f:
+                        yield os.path.relpath(full_path, path), f.read()
+    else:
+        with open(path, 'rb') as f:
+            yield from iter_archive(f, path)
+
+
+class Checkpoint:
+    """Append-only file of sha256 hashes of reports already imported"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.hashes = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.hashes = {line.strip() for line in f if line.strip()}
+
+    def __contains__(self, digest):
+        return digest in self.hashes
+
+    def add_many(self, digests):
+        self.hashes.update(digests)
+        if self.path and digests:
+            with open(self.path, 'a') as f:
+                f.write(''.join(f"{digest}\n" for digest in digests))
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def import_reports(files, extractor=None, workers=4, chunk_size=50, checkpoint=None, progress=None):
+    """
+    Extract and store every report from `files` ((name, bytes) pairs).
+
+    At most `workers` extractions run at once and at most 2 * workers files
+    are held in memory. Rows are written `chunk_size` at a time; hashes reach
+    the checkpoint right after their chunk is stored, so a crash re-imports at
+    most the chunk being written. Returns a summary with throughput.
+    """
+    extractor = extractor or get_extractor()
+    checkpoint = checkpoint if checkpoint is not None else Checkpoint()
+    summary = {"imported": 0, "skipped": 0, "failed": 0, "errors": [], "ids": []}
+    pending_rows = []
+    seen = set()
+    start = time.perf_counter()
+
+    def flush():
+        chunk = pending_rows[:chunk_size]
+        del pending_rows[:chunk_size]
+        reports = LabReport.objects.bulk_create([report for report, _ in chunk])
+        checkpoint.add_many([digest for _, digest in chunk])
+        summary["imported"] += len(reports)
+        summary["ids"].extend(report.pk for report in reports if report.pk is not None)
+        if progress:
+            progress(summary)
+
+    def collect(done):
+        for future in done:
+            name, data, digest = futures.pop(future)
+            try:
+                result = future.result()
+                pending_rows.append((lab_report_from_result(result, ContentFile(data, name=os.path.basename(name))), digest))
+            except Exception as e:
+                summary["failed"] += 1
+                summary["errors"].append({"filename": name, "detail": getattr(e, 'details', None) or str(e)})
+        while len(pending_rows) >= chunk_size:
+            flush()
+
+    futures = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lab-import") as pool:
+        for name, data in files:
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in checkpoint or digest in seen:
+                summary["skipped"] += 1
+                continue
+            seen.add(digest)
+            if len(futures) >= workers * 2:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+            futures[pool.submit(extractor, name, data)] = (name, data, digest)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            collect(done)
+    while pending_rows:
+        flush()
+
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["reports_per_second"] = round(summary["imported"] / elapsed, 2) if elapsed else 0.0
+    return summary
@@ -0,0 +1,124 @@
+"""Synthetic data shared by the seeding and benchmark management commands."""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+from django.utils import timezone
+from api.models import Farmer, QualityMetrics, ProduceRecord, LabReport, Transaction
+
+LOCATIONS = ['Nashik', 'Dhule', 'Solapur', 'Ahmednagar', 'Pune', 'Satara', 'Jalgaon', 'Latur']
+STATUSES = ['Normal', 'Adequate', 'Low', 'High']
+
+
+def add_seed_argument(parser):
+    parser.add_argument('--seed', action='store_true',
+                        help="allow writing synthetic records to a database that is neither SQLite nor a test database")
+
+
+def check_scratch_database(allowed):
+    """
+    Synthetic rows look like real ones to every endpoint, so only write them
+    to SQLite or a test database unless the caller passed --seed.
+    """
+    name = str(connection.settings_dict['NAME'])
+    if allowed or connection.vendor == 'sqlite' or name.startswith(TEST_DATABASE_PREFIX):
+        return
+    raise CommandError(
+        f"Refusing to write synthetic records to the {connection.vendor} database {name!r}; "
+        "pass --seed if this really is a scratch database"
+    )
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the timestamps we set instead of "now", spread over time"""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def seed_produce(count, farmers=500, days=365, on_chain_ratio=0.6, chunk_size=5000, seed=0, stdout=None,
+                 allowed=False):
+    """Create `count` ProduceRecords with metrics, spread over `days` and `farmers`"""
+    check_scratch_database(allowed)
+    rng = random.Random(seed)
+    now = timezone.now()
+    batch_tag = uuid.uuid4().hex[:6]
+
+    farmer_objs = Farmer.objects.bulk_create([
+        Farmer(name=f"Farmer {batch_tag}-{i}", phone_number=f"9{batch_tag[:4]}{i:06d}"[:15],
+               location=rng.choice(LOCATIONS))
+        for i in range(farmers)
+    ])
+
+    created = 0
+    with explicit_timestamps(ProduceRecord._meta.get_field('created_at'),
+                             Transaction._meta.get_field('transaction_date')):
+        while created < count:
+            size = min(chunk_size, count - created)
+            metrics = QualityMetrics.objects.bulk_create([
+                QualityMetrics(
+                    grade=rng.choice('ABC'),
+                    confidence_score=round(rng.uniform(0.5, 1.0), 3),
+                    freshness_score=round(rng.uniform(20, 100), 2),
+                    color_saturation=round(rng.uniform(30, 160), 2),
+                    surface_defects={"count": rng.randint(0, 30), "details": []},
+                )
+                for _ in range(size)
+            ])
+            records = ProduceRecord.objects.bulk_create([
+                ProduceRecord(
+                    farmer=rng.choice(farmer_objs),
+                    image='produce_images/synthetic.jpg',
+                    metrics=metric,
+                    passport_id=f"SYN-{batch_tag}-{created + i}",
+                    on_chain_status=rng.random() < on_chain_ratio,
+                    created_at=now - timedelta(seconds=rng.randint(0, days * 86400)),
+                )
+                for i, metric in enumerate(metrics)
+            ])
+            Transaction.objects.bulk_create([
+                Transaction(produce_record=record, buyer_name="Synthetic buyer",
+                            status=rng.choice(['Pending', 'Completed']),
+                            transaction_date=record.created_at)
+                for record in records if rng.random() < 0.2
+            ])
+            created += size
+            if stdout is not None:
+                stdout.write(f"  produce records: {created}/{count}")
+    return created
+
+
+def seed_lab_reports(count, days=365, chunk_size=5000, seed=0, stdout=None, allowed=False):
+    check_scratch_database(allowed)
+    rng = random.Random(seed)
+    now = timezone.now()
+    created = 0
+    with explicit_timestamps(LabReport._meta.get_field('created_at')):
+        while created < count:
+            size = min(chunk_size, count - created)
+            LabReport.objects.bulk_create([
+                LabReport(
+                    report_image='lab_reports/synthetic.pdf',
+                    sample_id=f"S-{rng.randint(1000, 99999)}",
+                    lab_name="Farmers Quality Testing Laboratory",
+                    ph_value=round(rng.uniform(5.5, 8.5), 1), ph_status=rng.choice(['Normal', 'Acidic', 'Alkaline']),
+                    nitrogen_value=rng.randint(200, 320), nitrogen_status=rng.choice(STATUSES),
+                    phosphorus_value=rng.randint(10, 30), phosphorus_status=rng.choice(STATUSES),
+                    potassium_value=rng.randint(100, 200), potassium_status=rng.choice(STATUSES),
+                    grade=rng.choice('ABC'), grade_description="Synthetic", out_of_range_count=rng.randint(0, 3),
+                    created_at=now - timedelta(seconds=rng.randint(0, days * 86400)),
+                )
+                for _ in range(size)
+            ])
+            created += size
+            if stdout is not None:
+                stdout.write(f"  lab reports: {created}/{count}")
+    return created
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from api.anchoring import flush_due, pending_records
+
+
+class Command(BaseCommand):
+    help = "Anchor buffered quality hashes on-chain as Merkle-root batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="anchor everything pending now, even a partial batch")
+        parser.add_argument('--loop', type=float, default=0, help="keep running, checking every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            for batch in flush_due(force=options['force']):
+                self.stdout.write(f"Anchored {batch.leaf_count} records under root {batch.merkle_root} ({batch.tx_hash})")
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+        self.stdout.write(f"{pending_records().count()} hashes still buffered")
@@ -0,0 +1,86 @@
+import math
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.analytics import compact_rollups, quality_summary, rebuild_rollups, record_rollups
+from api.models import Farmer, ProduceRecord, QualityRollup
+from ._synthetic import add_seed_argument, seed_produce
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic produce records and compare analytics queries answered from the rollups "
+        "with the same GROUP BY over the records (latency, and that the answers match)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=200000, help="seed until there are this many records")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--inserts', type=int, default=1000, help="records replayed for the insert/compact timing")
+        add_seed_argument(parser)
+
+    def _time(self, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return result, statistics.median(timings)
+
+    def _check(self, name, rollup, raw):
+        def same(a, b):
+            return a == b or (a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9))
+
+        if len(rollup) != len(raw):
+            raise CommandError(f"{name}: {len(rollup)} rollup groups vs {len(raw)} from the records")
+        for a, b in zip(rollup, raw):
+            if a.keys() != b.keys() or not all(same(a[key], b[key]) for key in a):
+                raise CommandError(f"{name}: rollup {a} != records {b}")
+
+    def handle(self, *args, **options):
+        missing = options['records'] - ProduceRecord.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} produce records...")
+            seed_produce(missing, stdout=self.stdout, allowed=options['seed'])
+
+        _, seconds = self._time(1, rebuild_rollups)
+        records = ProduceRecord.objects.filter(metrics__isnull=False).count()
+        self.stdout.write(f"\n{records} records -> {QualityRollup.objects.count()} rollup rows "
+                          f"(rebuild {seconds:.1f}s)")
+
+        # Take the newest records out of the rollups, then replay their inserts one at a time, so the
+        # comparison below also covers the insert and compaction path
+        sample = list(ProduceRecord.objects.select_related('farmer', 'metrics')
+                      .filter(metrics__isnull=False).order_by('-id')[:options['inserts']])
+        record_rollups(sample, sign=-1)
+        compact_rollups()
+        start = time.perf_counter()
+        for record in sample:
+            record_rollups([record])
+        per_insert = (time.perf_counter() - start) / max(1, len(sample))
+        start = time.perf_counter()
+        folded = compact_rollups()
+        self.stdout.write(f"record_rollups {per_insert * 1000:.2f}ms per insert; compacted {folded} deltas "
+                          f"in {time.perf_counter() - start:.2f}s")
+
+        today = timezone.localdate()
+        farmer = Farmer.objects.filter(producerecord__isnull=False).order_by('-id').values_list('id', flat=True)[0]
+        queries = {
+            'location x month, all time': {'group_by': ['location', 'month']},
+            'grade mix, last 30 days': {'start': today - timedelta(days=29), 'group_by': ['grade']},
+            'one farmer by day, 90 days': {'start': today - timedelta(days=89), 'farmer': farmer,
+                                           'group_by': ['day']},
+            'farmers, last 100 days': {'start': today - timedelta(days=99), 'group_by': ['farmer']},
+            'location x day, 1 year': {'start': today - timedelta(days=364), 'group_by': ['location', 'day']},
+        }
+
+        self.stdout.write(f"\n{'query':30} {'groups':>7} {'rollup ms':>10} {'GROUP BY ms':>12} {'speedup':>8}")
+        for name, query in queries.items():
+            rollup, rollup_time = self._time(options['repeat'], lambda: quality_summary(**query))
+            raw, raw_time = self._time(options['repeat'], lambda: quality_summary(**query, source='raw'))
+            self._check(name, rollup, raw)
+            self.stdout.write(f"{name:30} {len(rollup):>7} {rollup_time * 1000:>10.1f} {raw_time * 1000:>12.1f} "
+                              f"{raw_time / rollup_time:>7.0f}x")
+        self.stdout.write(self.style.SUCCESS("\nRollup answers match the GROUP BY over the records"))
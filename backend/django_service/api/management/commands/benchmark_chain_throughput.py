@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from blockchain.web3_client import Web3Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sequential sends (nonce lookup + wait per tx) with pipelined sends "
+        "through the nonce manager, against a local Hardhat/anvil node"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rpc-url', default='http://127.0.0.1:8545')
+        parser.add_argument('--private-key', required=True,
+                            help="funded dev account, e.g. Hardhat account #0")
+        parser.add_argument('--count', type=int, default=100)
+
+    def _sequential(self, client, to, count):
+        w3 = client.w3
+        start = time.perf_counter()
+        for _ in range(count):
+            # The old send_transaction flow: fresh nonce lookup, then block on the receipt
+            nonce = w3.eth.get_transaction_count(client.account.address)
+            tx = {
+                'from': client.account.address, 'to': to, 'value': 1, 'nonce': nonce,
+                'gas': 21000, 'gasPrice': w3.to_wei('50', 'gwei'), 'chainId': client.chain_id,
+            }
+            signed = w3.eth.account.sign_transaction(tx, client.private_key)
+            raw = getattr(signed, 'raw_transaction', None) or signed.rawTransaction
+            w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(raw))
+        return time.perf_counter() - start
+
+    def _pipelined(self, client, to, count):
+        start = time.perf_counter()
+        futures = [client.wait_for_receipt(client.send_value(to, 1)) for _ in range(count)]
+        submitted = time.perf_counter() - start
+        for future in futures:
+            future.result()
+        return submitted, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        client = Web3Client(rpc_url=options['rpc_url'], private_key=options['private_key'])
+        if not client.is_connected():
+            self.stderr.write(f"No node at {options['rpc_url']}")
+            return
+        to = Web3.to_checksum_address('0x' + '11' * 20)
+        count = options['count']
+
+        sequential = self._sequential(client, to, count)
+        client.nonces.resync()
+        submitted, confirmed = self._pipelined(client, to, count)
+
+        self.stdout.write(f"{count} transactions")
+        self.stdout.write(f"  sequential: {sequential:.2f}s  ({count / sequential:.1f} tx/s)")
+        self.stdout.write(f"  pipelined:  submitted in {submitted:.2f}s ({count / submitted:.1f} tx/s), "
+                          f"all receipts in {confirmed:.2f}s ({count / confirmed:.1f} tx/s)")
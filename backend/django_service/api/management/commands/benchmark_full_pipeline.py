@@ -0,0 +1,153 @@
+import io
+import json
+import random
+import time
+import uuid
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from PIL import Image, ImageDraw
+from api.models import Farmer
+from api.profiling import current_capture
+from ._synthetic import add_seed_argument, check_scratch_database
+
+RESOLUTIONS = [(640, 480), (1920, 1080), (4032, 3024)]
+
+
+def synthetic_jpeg(width, height, seed=0):
+    """A produce-like test photo: a coloured blob with dark spots on a dark background"""
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 20).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    color = tuple(rng.randint(40, 255) for _ in range(3))
+    draw.ellipse([width // 6, height // 6, width * 5 // 6, height * 5 // 6], fill=color)
+    for _ in range(40):
+        x, y, r = rng.randrange(width), rng.randrange(height), rng.randint(5, max(6, width // 40))
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=(30, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark POST /api/produce/full-pipeline end to end (AI service, DB write, chain) "
+        "per image resolution, with per-stage latency and memory high-water marks. "
+        "Needs the FastAPI service at FASTAPI_SERVICE_URL. Results can be written as JSON and "
+        "compared with fastapi_service/benchmarks/compare.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help="requests per resolution")
+        parser.add_argument('--output', help="write results as JSON to this file")
+        add_seed_argument(parser)
+
+    def _post(self, client, farmer, image_bytes):
+        upload = io.BytesIO(image_bytes)
+        upload.name = 'bench.jpg'
+        return client.post('/api/produce/full-pipeline', {
+            'farmer': farmer.pk,
+            'passport_id': f"BENCH-{uuid.uuid4().hex[:12]}",
+            'image': upload,
+        })
+
+    def handle(self, *args, **options):
+        # Every request stores a real record and sends a chain transaction
+        check_scratch_database(options['seed'])
+        farmer, _ = Farmer.objects.get_or_create(
+            phone_number='0000000000', defaults={'name': 'Benchmark Farmer', 'location': 'Pune'})
+        client = Client()
+        count = options['requests']
+
+        results = {}
+        for width, height in RESOLUTIONS:
+            size = f"{width}x{height}"
+            # Distinct photos, so the AI service's result cache cannot answer
+            images = [synthetic_jpeg(width, height, seed=i) for i in range(count + 1)]
+            response = self._post(client, farmer, images[-1])
+            if response.status_code != 201:
+                raise CommandError(
+                    f"full-pipeline -> {response.status_code} {response.content[:200]!r}; "
+                    f"is the AI service running at {settings.FASTAPI_SERVICE_URL}?")
+
+            latencies = []
+            stage_totals = {}
+            tracemalloc.start()
+            start = time.perf_counter()
+            for image_bytes in images[:count]:
+                # Collect stage timings the same way a profiling capture does
+                stages = []
+                token = current_capture.set(stages)
+                request_start = time.perf_counter()
+                try:
+                    response = self._post(client, farmer, image_bytes)
+                finally:
+                    current_capture.reset(token)
+                latencies.append(time.perf_counter() - request_start)
+                if response.status_code != 201:
+                    raise CommandError(f"full-pipeline -> {response.status_code} {response.content[:200]!r}")
+                for stage in stages:
+                    stage_totals[stage['stage']] = stage_totals.get(stage['stage'], 0) + stage['ms']
+            elapsed = time.perf_counter() - start
+            _, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[f"endpoint.full_pipeline.{size}"] = {
+                'rps': count / elapsed,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'mean_ms': sum(latencies) / count * 1000,
+                **{f"{stage}_ms": total / count for stage, total in stage_totals.items()},
+            }
+            results[f"memory.full_pipeline.{size}"] = {'tracemalloc_peak_mb': traced_peak / (1024 * 1024)}
+            stats = results[f"endpoint.full_pipeline.{size}"]
+            self.stdout.write(f"{size:<10} " + "  ".join(f"{k} {v:.4g}" for k, v in stats.items()))
+
+        rss = peak_rss_mb()
+        if rss is not None:
+            results['memory.full_pipeline.process'] = {'peak_rss_mb': rss}
+
+        if options['output']:
+            run = {
+                'meta': {
+                    'suite': 'django_service',
+                    'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'git': git_revision(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'anchor_mode': settings.ANCHOR_MODE,
+                    'database': settings.DATABASES['default']['ENGINE'],
+                    'args': {'requests': count},
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
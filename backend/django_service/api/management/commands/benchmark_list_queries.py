@@ -0,0 +1,78 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from api.models import Farmer, ProduceRecord
+from ._synthetic import add_seed_argument, seed_produce, seed_lab_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic records in steps up to --rows and check that the list endpoints "
+        "run a constant number of queries per page, with first/deep page latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--steps', type=int, default=3,
+                            help="measure after seeding rows/10**(steps-1), ..., rows")
+        parser.add_argument('--deep-pages', type=int, default=20,
+                            help="cursor pages to walk for the deep-page timing")
+        parser.add_argument('--page-size', type=int, default=50)
+        add_seed_argument(parser)
+
+    def _measure(self, client, url):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} -> {response.status_code}")
+        return response.json(), len(ctx.captured_queries), elapsed
+
+    def _walk(self, client, url, pages):
+        """Follow `next` cursors; return query count and latency of the last page"""
+        body, queries, elapsed = self._measure(client, url)
+        for _ in range(pages - 1):
+            if not body.get('next'):
+                break
+            body, queries, elapsed = self._measure(client, body['next'])
+        return queries, elapsed
+
+    def handle(self, *args, **options):
+        rows, steps, size = options['rows'], options['steps'], options['page_size']
+        targets = sorted({max(1, rows // 10 ** i) for i in range(steps)})
+        client = Client()
+
+        baseline = {}
+        regressions = []
+        for target in targets:
+            missing = target - ProduceRecord.objects.count()
+            if missing > 0:
+                self.stdout.write(f"Seeding {missing} produce records and lab reports...")
+                seed_produce(missing, stdout=self.stdout, allowed=options['seed'])
+                seed_lab_reports(missing, stdout=self.stdout, allowed=options['seed'])
+
+            farmer = Farmer.objects.order_by('-id').first()
+            endpoints = {
+                'marketplace': f"/api/marketplace/list?page_size={size}",
+                'farmer produce': f"/api/produce/farmer/{farmer.id}?page_size={size}",
+                'lab reports': f"/api/lab-reports/?page_size={size}",
+            }
+
+            self.stdout.write(f"\n{ProduceRecord.objects.count()} produce records")
+            for name, url in endpoints.items():
+                _, first_queries, first_time = self._measure(client, url)
+                deep_queries, deep_time = self._walk(client, url, options['deep_pages'])
+                self.stdout.write(
+                    f"  {name:15} queries/page={first_queries} (deep {deep_queries})  "
+                    f"first={first_time * 1000:.1f}ms  page {options['deep_pages']}={deep_time * 1000:.1f}ms"
+                )
+                expected = baseline.setdefault(name, first_queries)
+                if first_queries != expected or deep_queries != expected:
+                    regressions.append(f"{name}: {expected} -> {first_queries}/{deep_queries} queries")
+
+        if regressions:
+            raise CommandError("Query count grows with data: " + "; ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("\nQuery counts are constant across dataset sizes"))
@@ -0,0 +1,64 @@
+import time
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from api.models import LabReport, ProduceRecord
+from ._synthetic import add_seed_argument, seed_produce, seed_lab_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure passport and marketplace read throughput: uncached, cached (200 from the "
+        "read cache) and revalidated (304 via If-None-Match)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000,
+                            help="seed synthetic records up to this many if the table is smaller")
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--distinct', type=int, default=200,
+                            help="distinct passports to cycle through (the hot set)")
+        add_seed_argument(parser)
+
+    def _run(self, client, urls, count, clear=False, etags=None):
+        cache = caches['reads']
+        start = time.perf_counter()
+        for i in range(count):
+            url = urls[i % len(urls)]
+            if clear:
+                cache.clear()
+            headers = {'HTTP_IF_NONE_MATCH': etags[url]} if etags else {}
+            response = client.get(url, **headers)
+            expected = 304 if etags else 200
+            if response.status_code != expected:
+                raise CommandError(f"GET {url} -> {response.status_code}, expected {expected}")
+        return count / (time.perf_counter() - start)
+
+    def handle(self, *args, **options):
+        missing = options['rows'] - ProduceRecord.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} produce records and lab reports...")
+            seed_produce(missing, stdout=self.stdout, allowed=options['seed'])
+            seed_lab_reports(missing, stdout=self.stdout, allowed=options['seed'])
+
+        distinct = options['distinct']
+        endpoints = {
+            'produce passport': [f"/api/produce/{pk}" for pk in
+                                 ProduceRecord.objects.order_by('-id').values_list('pk', flat=True)[:distinct]],
+            'lab passport': [f"/api/lab-reports/{pk}/passport" for pk in
+                             LabReport.objects.order_by('-id').values_list('pk', flat=True)[:distinct]],
+            'marketplace': ["/api/marketplace/list"],
+        }
+        client = Client()
+        count = options['requests']
+
+        for name, urls in endpoints.items():
+            cold = self._run(client, urls, count, clear=True)
+            caches['reads'].clear()
+            etags = {url: client.get(url)['ETag'] for url in urls}
+            warm = self._run(client, urls, count)
+            revalidated = self._run(client, urls, count, etags=etags)
+            self.stdout.write(
+                f"{name:17} uncached={cold:8.0f} req/s  cached={warm:8.0f} req/s ({warm / cold:.1f}x)  "
+                f"304={revalidated:8.0f} req/s ({revalidated / cold:.1f}x)"
+            )
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from api.analytics import compact_rollups, rebuild_rollups
+from api.models import QualityRollupDelta
+
+
+class Command(BaseCommand):
+    help = "Fold pending quality rollup deltas into the analytics rollups (or rebuild them from the records)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help="recompute every rollup from the produce records with GROUP BY")
+        parser.add_argument('--batch-size', type=int, default=5000, help="deltas folded per transaction")
+        parser.add_argument('--loop', type=float, default=0, help="keep running, compacting every N seconds")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            start = time.perf_counter()
+            rows = rebuild_rollups()
+            self.stdout.write(f"Rebuilt {rows} rollup rows in {time.perf_counter() - start:.1f}s")
+            return
+        while True:
+            start = time.perf_counter()
+            folded = compact_rollups(options['batch_size'])
+            if folded:
+                self.stdout.write(f"Compacted {folded} deltas in {time.perf_counter() - start:.2f}s")
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+        self.stdout.write(f"{QualityRollupDelta.objects.count()} deltas pending")
@@ -0,0 +1,66 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from api.models import Farmer, ProduceRecord, LabReport, Transaction
+from api.pagination import CreatedAtCursorPagination
+from ._synthetic import add_seed_argument, seed_produce, seed_lab_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset (if smaller than --rows) and print the query plan "
+        "and timing of each API list/lookup query"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000,
+                            help="produce records and lab reports to have before explaining")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-seed', action='store_true')
+        add_seed_argument(parser)
+
+    def _queries(self):
+        """The querysets the list endpoints run for one page, in the order the views build them"""
+        limit = CreatedAtCursorPagination.page_size + 1
+        ordering = CreatedAtCursorPagination.ordering
+        farmer = Farmer.objects.order_by('-id').first()
+        sample = LabReport.objects.exclude(sample_id=None).values_list('sample_id', flat=True).first()
+        produce = ProduceRecord.objects.select_related('farmer', 'metrics')
+        return {
+            'marketplace list': produce.filter(on_chain_status=True).order_by(*ordering)[:limit],
+            'farmer produce': produce.filter(farmer=farmer).order_by(*ordering)[:limit],
+            'lab report list': LabReport.objects.order_by(*ordering)[:limit],
+            'lab report by sample': LabReport.objects.filter(sample_id=sample).order_by(*ordering)[:limit],
+            'transactions by status': Transaction.objects.filter(status='Pending').order_by('-transaction_date')[:limit],
+            'anchor buffer': ProduceRecord.objects.filter(
+                queued_for_anchor_at__isnull=False, anchor_batch__isnull=True
+            ).order_by('queued_for_anchor_at', 'id')[:limit],
+        }
+
+    def handle(self, *args, **options):
+        if not options['no_seed']:
+            missing = options['rows'] - ProduceRecord.objects.count()
+            if missing > 0:
+                self.stdout.write(f"Seeding {missing} produce records and lab reports...")
+                seed_produce(missing, stdout=self.stdout, allowed=options['seed'])
+                seed_lab_reports(missing, stdout=self.stdout, allowed=options['seed'])
+            # Fresh planner statistics after the bulk load
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        # Postgres can run the plan and report real row counts and timings
+        explain_options = {'analyze': True, 'buffers': True} if connection.vendor == 'postgresql' else {}
+
+        self.stdout.write(f"{ProduceRecord.objects.count()} produce records, "
+                          f"{LabReport.objects.count()} lab reports ({connection.vendor})")
+        for name, queryset in self._queries().items():
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{name}: median {statistics.median(timings):.2f}ms, max {max(timings):.2f}ms"
+            ))
+            self.stdout.write(queryset.explain(**explain_options))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.ai_client import AIServiceError
+from api.regrading import RegradeError, run_regrade
+
+
+class Command(BaseCommand):
+    help = "Re-grade stored produce metrics and lab reports under the AI service's active grading rules"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['produce', 'lab-reports', 'all'], default='all')
+        parser.add_argument('--chunk-size', type=int, default=1000, help="rows per grading call and bulk_update")
+        parser.add_argument('--include-anchored', action='store_true',
+                            help="also re-grade rows whose quality hash is anchored or queued (breaks their proofs)")
+        parser.add_argument('--force', action='store_true', help="re-grade rows already on the active version too")
+        parser.add_argument('--dry-run', action='store_true', help="count what would change without writing")
+
+    def handle(self, *args, **options):
+        def progress(name, scanned, changed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{name}: {scanned} scanned, {changed} changed")
+
+        try:
+            summary = run_regrade(
+                options['target'], chunk_size=options['chunk_size'], include_anchored=options['include_anchored'],
+                force=options['force'], dry_run=options['dry_run'], progress=progress,
+            )
+        except (AIServiceError, RegradeError) as e:
+            raise CommandError(str(e))
+
+        verb = "would change" if options['dry_run'] else "changed"
+        for name, stats in summary.items():
+            self.stdout.write(
+                f"{name}: rules {stats['rules_version']}, {stats['scanned']} scanned, {stats['changed']} {verb}, "
+                f"{stats['skipped_anchored']} anchored skipped, {stats['rows_per_s']:.0f} rows/s"
+            )
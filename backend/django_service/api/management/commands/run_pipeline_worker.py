@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from api.jobs import get_task_queue, SQLiteTaskQueue
+
+
+class Command(BaseCommand):
+    help = "Drain the SQLite-backed full-pipeline task queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=0.5)
+
+    def handle(self, *args, **options):
+        task_queue = get_task_queue()
+        if not isinstance(task_queue, SQLiteTaskQueue):
+            raise CommandError("PIPELINE_QUEUE_BACKEND must be 'sqlite' to run a separate worker")
+        self.stdout.write(f"Pipeline worker reading {settings.PIPELINE_QUEUE_DB}")
+        task_queue.work(poll_interval=options['poll_interval'])
@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the Django service.
+
+MetricsMiddleware records per-route request counts and latency (route is
+the URL pattern, so /api/produce/12 and /api/produce/13 share a series);
+pipeline stages are timed where they run. Queue gauges are read at scrape
+time, so they cost nothing on the request path.
+
+Without PROMETHEUS_MULTIPROC_DIR every worker process has its own registry
+and /metrics reports whichever worker answered. With it, counters and
+histograms are merged across workers, but the scrape-time gauges are not
+registered: the merged view would only show a zero per worker for them.
+"""
+import os
+import time
+from contextlib import contextmanager
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from .profiling import record_stage
+
+# Latencies from a cached read (~1 ms) to a slow chain confirmation (~30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUESTS = Counter("krishi_http_requests_total", "HTTP requests", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "krishi_http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("krishi_http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum")
+STAGE_LATENCY = Histogram(
+    "krishi_stage_duration_seconds", "Pipeline stage latency", ["stage"], buckets=LATENCY_BUCKETS
+)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+STAGE_NAMES = ("ai_service", "db_write", "chain_submit")
+STAGES = {name: STAGE_LATENCY.labels(name) for name in STAGE_NAMES}
+
+
+@contextmanager
+def stage_timer(stage):
+    histogram = STAGES[stage]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed)
+        record_stage(stage, elapsed)
+
+
+def _pipeline_queue_depth():
+    from .jobs import get_task_queue
+    return get_task_queue().depth()
+
+
+def _anchor_buffer_size():
+    from .anchoring import pending_records
+    return pending_records().count()
+
+
+def scrape_time_gauge(name, documentation, read):
+    """Gauge whose value is read() at scrape time; None in multiprocess mode (see above)"""
+    if MULTIPROCESS:
+        return None
+    gauge = Gauge(name, documentation)
+    gauge.set_function(read)
+    return gauge
+
+
+scrape_time_gauge("krishi_pipeline_queue_depth", "Pipeline stage tasks waiting to run", _pipeline_queue_depth)
+scrape_time_gauge("krishi_anchor_buffer_size", "Quality hashes waiting for a Merkle batch", _anchor_buffer_size)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._children = {}
+
+    def _series(self, method, route, status):
+        key = (method, route, status)
+        series = self._children.get(key)
+        if series is None:
+            series = (REQUESTS.labels(method, route, status), REQUEST_LATENCY.labels(method, route))
+            self._children[key] = series
+        return series
+
+    def __call__(self, request):
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            IN_FLIGHT.dec()
+        # For streaming responses (SSE) this is the time to the first byte
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        counter, histogram = self._series(
+            request.method, match.route if match else "unmatched", str(response.status_code)
+        )
+        counter.inc()
+        histogram.observe(elapsed)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus exposition; merges worker processes in multiprocess mode"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,28 @@
+# Generated migration for background full-pipeline status
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_labreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producerecord',
+            name='pipeline_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='pipeline_stages',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='pipeline_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated migration for batched Merkle-root anchoring
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_producerecord_pipeline_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnchorBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merkle_root', models.CharField(max_length=64, unique=True)),
+                ('leaf_count', models.IntegerField()),
+                ('tx_hash', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'anchorbatch',
+            },
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='quality_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='anchor_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='records', to='api.anchorbatch'),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='anchor_leaf_index',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='merkle_proof',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producerecord',
+            name='queued_for_anchor_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated migration for indexes on the list and lookup hot paths
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_anchorbatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labreport',
+            index=models.Index(fields=['-created_at', '-id'], name='labreport_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labreport',
+            index=models.Index(condition=models.Q(('sample_id__isnull', False)), fields=['sample_id'], name='labreport_sample_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producerecord',
+            index=models.Index(condition=models.Q(('on_chain_status', True)), fields=['-created_at', '-id'], name='produce_onchain_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producerecord',
+            index=models.Index(fields=['farmer', '-created_at', '-id'], name='produce_farmer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producerecord',
+            index=models.Index(condition=models.Q(('anchor_batch__isnull', True), ('queued_for_anchor_at__isnull', False)), fields=['queued_for_anchor_at', 'id'], name='produce_anchor_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', '-transaction_date'], name='transaction_status_idx'),
+        ),
+    ]
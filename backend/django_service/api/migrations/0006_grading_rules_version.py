@@ -0,0 +1,23 @@
+# Generated migration recording which grading rules version produced each grade
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labreport',
+            name='grading_rules_version',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='qualitymetrics',
+            name='grading_rules_version',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
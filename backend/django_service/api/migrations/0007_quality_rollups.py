@@ -0,0 +1,56 @@
+# Generated migration for the produce quality analytics rollups
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_grading_rules_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QualityRollupDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0)),
+                ('freshness_sum', models.FloatField(default=0)),
+                ('saturation_sum', models.FloatField(default=0)),
+                ('saturation_count', models.IntegerField(default=0)),
+                ('defects_sum', models.FloatField(default=0)),
+                ('defects_count', models.IntegerField(default=0)),
+                ('day', models.DateField()),
+                ('location', models.CharField(max_length=255)),
+                ('grade', models.CharField(max_length=10)),
+                ('farmer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.farmer')),
+            ],
+            options={
+                'db_table': 'quality_rollup_delta',
+            },
+        ),
+        migrations.CreateModel(
+            name='QualityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_count', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0)),
+                ('freshness_sum', models.FloatField(default=0)),
+                ('saturation_sum', models.FloatField(default=0)),
+                ('saturation_count', models.IntegerField(default=0)),
+                ('defects_sum', models.FloatField(default=0)),
+                ('defects_count', models.IntegerField(default=0)),
+                ('period_type', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period', models.DateField()),
+                ('location', models.CharField(max_length=255)),
+                ('grade', models.CharField(max_length=10)),
+                ('farmer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.farmer')),
+            ],
+            options={
+                'db_table': 'quality_rollup',
+                'indexes': [models.Index(fields=['period_type', 'farmer', 'period'], name='rollup_farmer_period_idx'), models.Index(fields=['period_type', 'location', 'period'], name='rollup_location_period_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Keep a deleted farmer's pending rollup deltas for the location-level rollups
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_quality_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='qualityrollupdelta',
+            name='farmer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.farmer'),
+        ),
+    ]
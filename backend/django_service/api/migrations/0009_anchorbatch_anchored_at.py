@@ -0,0 +1,25 @@
+# Batches are sealed before their root is sent; anchored_at marks the ones confirmed on chain
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_sent_batches(apps, schema_editor):
+    AnchorBatch = apps.get_model('api', 'AnchorBatch')
+    AnchorBatch.objects.filter(tx_hash__isnull=False).update(anchored_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_rollup_delta_farmer_set_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anchorbatch',
+            name='anchored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_sent_batches, migrations.RunPython.noop),
+    ]
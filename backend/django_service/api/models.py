@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 class LabReport(models.Model):
     """Stores soil lab report analysis results"""
@@ -25,6 +26,8 @@ class LabReport(models.Model):
     grade_description = models.TextField()
     out_of_range_count = models.IntegerField(default=0)
     issues = models.JSONField(default=list)
+    # Grading rules table the grade came from; the regrade command updates stale rows
+    grading_rules_version = models.CharField(max_length=32, null=True, blank=True)
     
     # Blockchain integration (for future)
     blockchain_hash = models.CharField(max_length=255, null=True, blank=True)
@@ -37,6 +40,12 @@ class LabReport(models.Model):
     class Meta:
         db_table = 'lab_report'
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering and the cursor-paginated list
+            models.Index(fields=['-created_at', '-id'], name='labreport_recent_idx'),
+            # Lookups by sample; most uploads have no sample id, leave those out
+            models.Index(fields=['sample_id'], condition=Q(sample_id__isnull=False), name='labreport_sample_idx'),
+        ]
     
     def __str__(self):
         return f"Lab Report {self.sample_id or self.id} - Grade {self.grade}"
@@ -59,12 +68,35 @@ class QualityMetrics(models.Model):
     freshness_score = models.FloatField()
     color_saturation = models.FloatField(null=True, blank=True)
     surface_defects = models.JSONField(null=True, blank=True)
+    grading_rules_version = models.CharField(max_length=32, null=True, blank=True)
     captured_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'qualitymetrics'
 
+class AnchorBatch(models.Model):
+    """One Merkle root written on-chain for a batch of quality hashes"""
+    merkle_root = models.CharField(max_length=64, unique=True)
+    leaf_count = models.IntegerField()
+    tx_hash = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Empty while the root is sealed but not yet confirmed sent
+    anchored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'anchorbatch'
+
+    def __str__(self):
+        return f"Anchor {self.merkle_root[:12]} ({self.leaf_count} records)"
+
 class ProduceRecord(models.Model):
+    PIPELINE_STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
     farmer = models.ForeignKey(Farmer, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='produce_images/')
     metrics = models.OneToOneField(QualityMetrics, on_delete=models.SET_NULL, null=True, blank=True)
@@ -73,8 +105,31 @@ class ProduceRecord(models.Model):
     on_chain_status = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Background full-pipeline progress (see api/jobs.py)
+    pipeline_status = models.CharField(max_length=20, choices=PIPELINE_STATUS_CHOICES, default='completed')
+    pipeline_stages = models.JSONField(default=dict, blank=True)
+    pipeline_error = models.TextField(null=True, blank=True)
+
+    # Batched anchoring: the hash waits in the buffer until its batch root is on-chain
+    quality_hash = models.CharField(max_length=64, null=True, blank=True)
+    anchor_batch = models.ForeignKey(AnchorBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='records')
+    anchor_leaf_index = models.IntegerField(null=True, blank=True)
+    merkle_proof = models.JSONField(null=True, blank=True)
+    queued_for_anchor_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         db_table = 'producerecord'
+        indexes = [
+            # Marketplace listing: only on-chain rows, newest first
+            models.Index(fields=['-created_at', '-id'], condition=Q(on_chain_status=True),
+                         name='produce_onchain_recent_idx'),
+            # Farmer history: equality on farmer, then the cursor order
+            models.Index(fields=['farmer', '-created_at', '-id'], name='produce_farmer_recent_idx'),
+            # Anchoring buffer: the small set of hashes still waiting for a batch
+            models.Index(fields=['queued_for_anchor_at', 'id'],
+                         condition=Q(queued_for_anchor_at__isnull=False, anchor_batch__isnull=True),
+                         name='produce_anchor_pending_idx'),
+        ]
 
 class Transaction(models.Model):
     produce_record = models.ForeignKey(ProduceRecord, on_delete=models.CASCADE)
@@ -85,3 +140,55 @@ class Transaction(models.Model):
 
     class Meta:
         db_table = 'transaction'
+        indexes = [
+            models.Index(fields=['status', '-transaction_date'], name='transaction_status_idx'),
+        ]
+
+class RollupTotals(models.Model):
+    """Counts and sums (never averages), so rollup rows can be added together exactly"""
+    record_count = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0)
+    freshness_sum = models.FloatField(default=0)
+    saturation_sum = models.FloatField(default=0)
+    saturation_count = models.IntegerField(default=0)
+    defects_sum = models.FloatField(default=0)
+    defects_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+class QualityRollup(RollupTotals):
+    """
+    Produce quality per day or month, location and grade; per farmer too,
+    or for every farmer of the location when farmer is null. Maintained by
+    the compact_rollups command from QualityRollupDelta.
+    """
+    PERIOD_CHOICES = [('day', 'Day'), ('month', 'Month')]
+
+    period_type = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period = models.DateField()
+    farmer = models.ForeignKey(Farmer, on_delete=models.CASCADE, null=True, blank=True)
+    location = models.CharField(max_length=255)
+    grade = models.CharField(max_length=10)
+
+    class Meta:
+        db_table = 'quality_rollup'
+        indexes = [
+            # Farmer-level rows by farmer, location-level rows (farmer null) by location; both by time
+            models.Index(fields=['period_type', 'farmer', 'period'], name='rollup_farmer_period_idx'),
+            models.Index(fields=['period_type', 'location', 'period'], name='rollup_location_period_idx'),
+        ]
+
+class QualityRollupDelta(RollupTotals):
+    """
+    Quality changes written with each insert (or re-grade), not yet
+    compacted into QualityRollup. Deleting a farmer nulls the farmer: the
+    deltas then only count towards the location-level rollups.
+    """
+    day = models.DateField()
+    farmer = models.ForeignKey(Farmer, on_delete=models.SET_NULL, null=True, blank=True)
+    location = models.CharField(max_length=255)
+    grade = models.CharField(max_length=10)
+
+    class Meta:
+        db_table = 'quality_rollup_delta'
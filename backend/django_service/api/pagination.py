@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on created_at: each page is an indexed range scan
+    (WHERE created_at < cursor ORDER BY created_at DESC LIMIT n), so deep
+    pages cost the same as the first one, unlike OFFSET paging.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,91 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware removes itself at startup (MiddlewareNotUsed) unless
+PROFILING_ENABLED is set, so by default it costs nothing. When on, a request
+is profiled if it carries the X-Profile header (matching PROFILING_TOKEN when
+one is set) or is picked by PROFILING_SAMPLE_RATE. Header requests are always
+kept; sampled ones only when slower than PROFILING_THRESHOLD_MS. Captures
+hold the top of a cProfile report plus the pipeline stage timings and live
+in a bounded ring buffer read by the admin-only /api/admin/profiles.
+"""
+import io
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import deque
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Stage timings of the request being profiled (see metrics.stage_timer)
+current_capture = contextvars.ContextVar('current_capture', default=None)
+
+captures = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+# cProfile can only have one active profiler per process
+_profiler_lock = threading.Lock()
+
+
+def record_stage(stage, seconds):
+    capture = current_capture.get()
+    if capture is not None:
+        capture.append({"stage": stage, "ms": round(seconds * 1000, 3)})
+
+
+def _profile_text(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(settings.PROFILING_TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def _reason(self, request):
+        header = request.headers.get('X-Profile')
+        if header is not None and (not settings.PROFILING_TOKEN or header == settings.PROFILING_TOKEN):
+            return 'header'
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        reason = self._reason(request)
+        if reason is None or not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        stages = []
+        token = current_capture.set(stages)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _profiler_lock.release()
+            current_capture.reset(token)
+
+        elapsed = time.perf_counter() - start
+        if reason == 'header' or elapsed * 1000 >= settings.PROFILING_THRESHOLD_MS:
+            captures.append({
+                "id": uuid.uuid4().hex[:12],
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 3),
+                "captured_at": time.time(),
+                "reason": reason,
+                "stages": stages,
+                "profile": _profile_text(profiler),
+            })
+        return response
@@ -0,0 +1,148 @@
+"""
+Read-through cache for the buyer-facing reads: lab report passports, produce
+passports (QR scans) and marketplace pages.
+
+Entries are the rendered JSON body plus a strong ETag (hash of those exact
+bytes), so a hit skips the database, the serializer and the renderer, and a
+client that sends If-None-Match gets a 304 without the body. The backend is
+the 'reads' cache alias (settings.READ_CACHE_BACKEND: locmem, file or redis;
+use redis when several processes serve traffic so invalidation reaches all of
+them).
+
+Every entry is stored under a generation: one per passport, one shared by
+all marketplace pages. Signals in this module bump the generation when the
+underlying rows change. A read takes the generation before building, and
+stores its entry under that same generation. A read that built from the old
+row while a change committed therefore leaves an entry nobody looks up, and
+it expires after READ_CACHE_TTL. A missing (or evicted) generation is seeded
+with the current time, never 0, so entries of an older generation cannot
+come back.
+"""
+import time
+import hashlib
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+from .models import Farmer, LabReport, ProduceRecord, QualityMetrics
+
+MARKETPLACE_GENERATION = 'generation:marketplace'
+
+
+def _cache():
+    return caches['reads']
+
+
+def lab_report_key(pk):
+    return f"labreport:{pk}"
+
+
+def produce_key(pk):
+    return f"produce:{pk}"
+
+
+def marketplace_key(request):
+    # Pagination links are absolute, so the host is part of the page
+    return f"marketplace:{request.get_host()}:{request.get_full_path()}"
+
+
+def generation_key(key):
+    return f"generation:{key}"
+
+
+def _generation(cache, name):
+    generation = cache.get(name)
+    if generation is None:
+        cache.add(name, time.time_ns(), timeout=None)
+        # Whoever added first wins
+        generation = cache.get(name)
+    return generation
+
+
+def _bump(names):
+    now = time.time_ns()
+    _cache().set_many({name: now for name in names}, timeout=None)
+
+
+def render_entry(data):
+    body = JSONRenderer().render(data)
+    return {'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"', 'body': body}
+
+
+def _matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+
+
+def etag_response(request, entry):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and _matches(if_none_match, entry['etag']):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    # Clients and proxies may keep it, but must revalidate (cheap with the ETag)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_read(request, key, build, generation=None):
+    """
+    JSON response for `key` from the read cache; build() returns the data on
+    a miss. `generation` names the generation key (default: the key's own).
+    """
+    cache = _cache()
+    current = _generation(cache, generation or generation_key(key))
+    versioned = f"{key}@{current}"
+    entry = cache.get(versioned)
+    if entry is None:
+        entry = render_entry(build())
+        cache.set(versioned, entry)
+    return etag_response(request, entry)
+
+
+def invalidate_produce(pks):
+    _bump([generation_key(produce_key(pk)) for pk in pks] + [MARKETPLACE_GENERATION])
+
+
+def invalidate_lab_reports(pks):
+    _bump([generation_key(lab_report_key(pk)) for pk in pks])
+
+
+def bump_marketplace():
+    _bump([MARKETPLACE_GENERATION])
+
+
+def _on_commit(fn, *args):
+    # After commit, so a read that takes the new generation also sees the new row
+    transaction.on_commit(lambda: fn(*args))
+
+
+@receiver([post_save, post_delete], sender=LabReport)
+def _lab_report_changed(sender, instance, **kwargs):
+    _on_commit(invalidate_lab_reports, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ProduceRecord)
+def _produce_changed(sender, instance, **kwargs):
+    _on_commit(invalidate_produce, [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=QualityMetrics)
+def _metrics_changed(sender, instance, **kwargs):
+    pks = list(ProduceRecord.objects.filter(metrics_id=instance.pk).values_list('pk', flat=True))
+    if pks:
+        _on_commit(invalidate_produce, pks)
+
+
+@receiver(post_save, sender=Farmer)
+def _farmer_changed(sender, instance, created, **kwargs):
+    # Produce passports embed the farmer's name
+    if not created:
+        pks = list(ProduceRecord.objects.filter(farmer_id=instance.pk).values_list('pk', flat=True))
+        _on_commit(invalidate_produce, pks)
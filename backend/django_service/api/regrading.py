@@ -0,0 +1,203 @@
+"""
+Bulk re-grading of stored produce metrics and lab reports after the grading
+rules change.
+
+Rows carry the grading_rules_version that produced their grade; re-grading
+walks the rows on an older (or no) version in primary-key order, sends each
+chunk to the AI service's column-oriented /api/grading endpoints, and writes
+the results back in one transaction per chunk: bulk_update for produce
+(freshness differs per row); for lab reports one UPDATE per distinct
+outcome, since soil grades come from a small table and repeat (about 20x
+faster than bulk_update's per-row CASE on SQLite). Rows whose grade did
+not change only get their version stamped, in a single UPDATE.
+
+Re-graded produce is also moved between the analytics rollup keys (the old
+grade is subtracted, the new one added; see analytics.record_rollups).
+
+Anchored rows are skipped by default: a produce quality hash covers the
+grade and freshness score, so changing them would break the on-chain proof.
+"""
+import copy
+import json
+import time
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .ai_client import get_ai_client
+from .analytics import record_rollups
+from .models import LabReport, ProduceRecord, QualityMetrics
+from .read_cache import invalidate_lab_reports, invalidate_produce
+
+# LabReport field for each parameter column the soil rules read
+SOIL_FIELDS = {
+    'pH': 'ph_value',
+    'pH_status': 'ph_status',
+    'nitrogen': 'nitrogen_value',
+    'nitrogen_status': 'nitrogen_status',
+    'phosphorus': 'phosphorus_value',
+    'phosphorus_status': 'phosphorus_status',
+    'potassium': 'potassium_value',
+    'potassium_status': 'potassium_status',
+    'organic_carbon': 'organic_carbon_value',
+    'organic_carbon_status': 'organic_carbon_status',
+}
+
+
+class RegradeError(Exception):
+    """The AI service graded with different rules than the run started with"""
+
+
+def stale_metrics(version, include_anchored=False, force=False):
+    queryset = QualityMetrics.objects.all()
+    if not force:
+        queryset = queryset.exclude(grading_rules_version=version)
+    if not include_anchored:
+        queryset = queryset.exclude(
+            Q(producerecord__quality_hash__isnull=False) | Q(producerecord__on_chain_status=True)
+        )
+    return queryset
+
+
+def stale_lab_reports(version, include_anchored=False, force=False):
+    queryset = LabReport.objects.all()
+    if not force:
+        queryset = queryset.exclude(grading_rules_version=version)
+    if not include_anchored:
+        queryset = queryset.exclude(Q(blockchain_hash__isnull=False) | Q(on_chain_status=True))
+    return queryset
+
+
+def _chunks(queryset, chunk_size, fields):
+    """Keyset pagination on pk, so rows updated (or not, in a dry run) are never revisited"""
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').only(*fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].pk
+
+
+def _check_version(result, version):
+    if result['rules_version'] != version:
+        raise RegradeError(f"AI service switched rules from {version} to {result['rules_version']} mid-run")
+
+
+def _defect_count(defects):
+    return defects.get('count') if isinstance(defects, dict) else None
+
+
+def _move_rollups(before, after):
+    """Take re-graded records out of their old rollup keys and into the new ones"""
+    records = list(ProduceRecord.objects.filter(metrics_id__in=list(after)).select_related('farmer'))
+    for metrics, sign in ((before, -1), (after, 1)):
+        for record in records:
+            record.metrics = metrics[record.metrics_id]
+        record_rollups(records, sign)
+
+
+def regrade_produce(version, chunk_size=1000, include_anchored=False, force=False, dry_run=False):
+    """Yields (scanned, changed) per chunk of QualityMetrics"""
+    client = get_ai_client()
+    queryset = stale_metrics(version, include_anchored, force)
+    fields = ['id', 'grade', 'confidence_score', 'freshness_score', 'color_saturation', 'surface_defects']
+    for rows in _chunks(queryset, chunk_size, fields):
+        result = client.grade_produce_batch({
+            'confidence': [row.confidence_score for row in rows],
+            'freshness': [row.freshness_score for row in rows],
+            # Freshness is recomputed only where the measurements were stored
+            'saturation': [row.color_saturation for row in rows],
+            'defect_count': [_defect_count(row.surface_defects) for row in rows],
+        }, version)
+        _check_version(result, version)
+
+        changed, before = [], {}
+        for row, grade, freshness in zip(rows, result['grade'], result['freshness']):
+            if row.grade != grade or abs(row.freshness_score - freshness) > 1e-9:
+                before[row.pk] = copy.copy(row)
+                row.grade, row.freshness_score, row.grading_rules_version = grade, freshness, version
+                changed.append(row)
+
+        if not dry_run:
+            ids = [row.pk for row in rows]
+            unchanged = set(ids).difference(row.pk for row in changed)
+            with transaction.atomic():
+                QualityMetrics.objects.bulk_update(
+                    changed, ['grade', 'freshness_score', 'grading_rules_version'], batch_size=chunk_size
+                )
+                QualityMetrics.objects.filter(pk__in=unchanged).update(grading_rules_version=version)
+                _move_rollups(before, {row.pk: row for row in changed})
+                # bulk_update and update() send no signals; passports embed the metrics
+                pks = list(ProduceRecord.objects.filter(metrics_id__in=ids).values_list('pk', flat=True))
+                transaction.on_commit(lambda pks=pks: invalidate_produce(pks))
+        yield len(rows), len(changed)
+
+
+def regrade_lab_reports(version, chunk_size=1000, include_anchored=False, force=False, dry_run=False):
+    """Yields (scanned, changed) per chunk of LabReports"""
+    client = get_ai_client()
+    queryset = stale_lab_reports(version, include_anchored, force)
+    fields = ['id', 'grade', 'grade_description', 'out_of_range_count', 'issues', *SOIL_FIELDS.values()]
+    for rows in _chunks(queryset, chunk_size, fields):
+        result = client.grade_soil_batch(
+            {key: [getattr(row, field) for row in rows] for key, field in SOIL_FIELDS.items()}, version
+        )
+        _check_version(result, version)
+
+        # (grade, description, count, issues) -> pks of the rows that now get it
+        changed = defaultdict(list)
+        unchanged = []
+        graded = zip(rows, result['grade'], result['grade_description'], result['out_of_range_count'],
+                     result['issues'])
+        for row, *outcome in graded:
+            if (row.grade, row.grade_description, row.out_of_range_count, row.issues) != tuple(outcome):
+                grade, description, count, issues = outcome
+                changed[(grade, description, count, json.dumps(issues))].append(row.pk)
+            else:
+                unchanged.append(row.pk)
+
+        if not dry_run:
+            now = timezone.now()
+            with transaction.atomic():
+                for (grade, description, count, issues), pks in changed.items():
+                    LabReport.objects.filter(pk__in=pks).update(
+                        grade=grade, grade_description=description, out_of_range_count=count,
+                        issues=json.loads(issues), grading_rules_version=version, updated_at=now,
+                    )
+                LabReport.objects.filter(pk__in=unchanged).update(grading_rules_version=version, updated_at=now)
+                ids = [row.pk for row in rows]
+                transaction.on_commit(lambda ids=ids: invalidate_lab_reports(ids))
+        yield len(rows), len(rows) - len(unchanged)
+
+
+def run_regrade(target, chunk_size=1000, include_anchored=False, force=False, dry_run=False, progress=None):
+    """
+    Re-grade `target` ('produce', 'lab-reports' or 'all') under the AI
+    service's active rules; returns a summary per target.
+    """
+    version = get_ai_client().grading_rules()['version']
+    runners = {'produce': (regrade_produce, stale_metrics), 'lab-reports': (regrade_lab_reports, stale_lab_reports)}
+    summary = {}
+    for name in runners if target == 'all' else [target]:
+        regrade, stale = runners[name]
+        skipped = 0 if include_anchored else (
+            stale(version, include_anchored=True, force=force).count() - stale(version, force=force).count()
+        )
+        scanned = changed = 0
+        start = time.perf_counter()
+        for chunk_scanned, chunk_changed in regrade(version, chunk_size, include_anchored, force, dry_run):
+            scanned += chunk_scanned
+            changed += chunk_changed
+            if progress:
+                progress(name, scanned, changed)
+        seconds = time.perf_counter() - start
+        summary[name] = {
+            'rules_version': version,
+            'scanned': scanned,
+            'changed': changed,
+            'skipped_anchored': skipped,
+            'seconds': round(seconds, 3),
+            'rows_per_s': round(scanned / seconds, 1) if seconds else 0.0,
+        }
+    return summary
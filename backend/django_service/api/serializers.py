@@ -1,7 +1,22 @@
 from rest_framework import serializers
 from .models import Farmer, ProduceRecord, QualityMetrics, Transaction, LabReport
 
-class LabReportSerializer(serializers.ModelSerializer):
+class SelectableFieldsMixin:
+    """
+    Lets list endpoints return a subset of fields: ?fields=id,passport_id,metrics
+    Unknown names are ignored; without the parameter every field is returned.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request is not None else None
+        if fields:
+            wanted = {name.strip() for name in fields.split(',') if name.strip()}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+class LabReportSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = LabReport
         fields = '__all__'
@@ -17,13 +32,17 @@ class FarmerSerializer(serializers.ModelSerializer):
         model = Farmer
         fields = '__all__'
 
-class ProduceRecordSerializer(serializers.ModelSerializer):
+class ProduceRecordSerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     metrics = QualityMetricsSerializer(read_only=True)
     farmer_name = serializers.ReadOnlyField(source='farmer.name')
 
     class Meta:
         model = ProduceRecord
         fields = '__all__'
+        read_only_fields = [
+            'pipeline_status', 'pipeline_stages', 'pipeline_error',
+            'quality_hash', 'anchor_batch', 'anchor_leaf_index', 'merkle_proof', 'queued_for_anchor_at',
+        ]
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,615 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from api.ai_client import AIServiceClient, AIServiceError, AIServiceUnavailable
+from api.analytics import compact_rollups, quality_summary
+from api.anchoring import InMemoryChain, flush_due, pending_records, proof_for, queue_for_anchoring
+from api.jobs import SQLiteTaskQueue, run_chain_stage, run_db_stage
+from api.profiling import ProfilingMiddleware, captures
+from api.read_cache import MARKETPLACE_GENERATION, cached_read, produce_key
+from config.settings import read_cache_config
+from blockchain.web3_client import Web3Client
+from api.management.commands._synthetic import seed_lab_reports, seed_produce
+from api.models import AnchorBatch, Farmer, LabReport, ProduceRecord, QualityMetrics
+
+# Database 15 by default, so a test run never flushes a real read cache
+TEST_REDIS_URL = os.getenv('TEST_REDIS_URL', 'redis://127.0.0.1:6379/15')
+
+
+def redis_available():
+    try:
+        import redis
+        return redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5).ping()
+    except Exception:
+        return False
+
+
+class SyntheticSeedingTests(TestCase):
+    def test_refuses_a_real_database(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.dict(connection.settings_dict, {'NAME': 'krishi'}):
+            with self.assertRaises(CommandError):
+                seed_produce(1)
+            with self.assertRaises(CommandError):
+                seed_lab_reports(1)
+        self.assertFalse(ProduceRecord.objects.exists())
+
+    def test_seed_flag_or_test_database_allows_it(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            with mock.patch.dict(connection.settings_dict, {'NAME': 'krishi'}):
+                self.assertEqual(seed_produce(1, farmers=1, allowed=True), 1)
+            with mock.patch.dict(connection.settings_dict, {'NAME': 'test_krishi'}):
+                self.assertEqual(seed_produce(1, farmers=1), 1)
+
+
+class ListQueryCountTests(TestCase):
+    """The list endpoints run a fixed number of queries per page, whatever the table size"""
+
+    PAGE_SIZE = 20
+    # Queries per page for each list, on a short first page and on a full one
+    EXPECTED = {
+        'marketplace': 1,
+        'farmer produce': 1,
+        'lab reports': 1,
+    }
+
+    def setUp(self):
+        caches['reads'].clear()
+
+    def _seed(self, count):
+        seed_produce(count, farmers=1, on_chain_ratio=1.0, chunk_size=100)
+        seed_lab_reports(count, chunk_size=100)
+
+    def _endpoints(self):
+        farmer = Farmer.objects.order_by('-id').first()
+        return {
+            'marketplace': f"/api/marketplace/list?page_size={self.PAGE_SIZE}",
+            'farmer produce': f"/api/produce/farmer/{farmer.id}?page_size={self.PAGE_SIZE}",
+            'lab reports': f"/api/lab-reports/?page_size={self.PAGE_SIZE}",
+        }
+
+    def _assert_query_counts(self, rows):
+        for name, url in self._endpoints().items():
+            with self.subTest(name, rows=rows):
+                caches['reads'].clear()
+                with self.assertNumQueries(self.EXPECTED[name]):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), min(rows, self.PAGE_SIZE))
+
+    def test_query_count_is_constant(self):
+        self._seed(3)
+        self._assert_query_counts(3)
+        # Only the newest farmer is listed, so seed the larger set for one farmer too
+        self._seed(5 * self.PAGE_SIZE)
+        self._assert_query_counts(5 * self.PAGE_SIZE)
+
+    def test_next_page_query_count(self):
+        self._seed(3 * self.PAGE_SIZE)
+        for name, url in self._endpoints().items():
+            with self.subTest(name):
+                next_url = self.client.get(url).json()['next']
+                caches['reads'].clear()
+                with self.assertNumQueries(self.EXPECTED[name]):
+                    response = self.client.get(next_url)
+                self.assertEqual(len(response.json()['results']), self.PAGE_SIZE)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        captures.clear()
+        self.addCleanup(captures.clear)
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: HttpResponse())
+        self.client.get('/api/lab-reports/', HTTP_X_PROFILE='1')
+        self.assertEqual(len(captures), 0)
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=0)
+    def test_header_request_is_captured_when_enabled(self):
+        middleware = ProfilingMiddleware(lambda request: HttpResponse())
+        middleware(RequestFactory().get('/api/lab-reports/'))
+        self.assertEqual(len(captures), 0)
+        middleware(RequestFactory().get('/api/lab-reports/', HTTP_X_PROFILE='1'))
+        self.assertEqual([(c['path'], c['reason']) for c in captures], [('/api/lab-reports/', 'header')])
+
+    def test_profiles_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/admin/profiles').status_code, 403)
+        self.client.force_login(User.objects.create_user('farmer', password='x'))
+        self.assertEqual(self.client.get('/api/admin/profiles').status_code, 403)
+        self.assertEqual(self.client.get('/api/admin/profiles/abc').status_code, 403)
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        self.assertEqual(self.client.get('/api/admin/profiles').status_code, 200)
+
+
+class QualityRollupTests(TestCase):
+    """Rollups follow save() and delete() and agree with the GROUP BY over the records"""
+
+    def setUp(self):
+        self.nashik = Farmer.objects.create(name="A", phone_number="9000000001", location="Nashik")
+        self.pune = Farmer.objects.create(name="B", phone_number="9000000002", location="Pune")
+        self.records = [self._record(self.nashik, grade) for grade in 'AABBC']
+        self._record(self.pune, 'A')
+
+    def _record(self, farmer, grade):
+        metrics = QualityMetrics.objects.create(grade=grade, confidence_score=0.75, freshness_score=80.0,
+                                                color_saturation=100.0, surface_defects={"count": 2})
+        return ProduceRecord.objects.create(farmer=farmer, image='produce_images/x.jpg', metrics=metrics,
+                                            passport_id=f"KP-{metrics.pk}")
+
+    def assertMatchesRecords(self, group_by=('farmer', 'location', 'grade')):
+        rollup = quality_summary(group_by=group_by)
+        self.assertEqual(rollup, quality_summary(group_by=group_by, source='raw'))
+        return rollup
+
+    def test_inserts(self):
+        self.assertEqual(sum(row['records'] for row in self.assertMatchesRecords()), 6)
+
+    def test_metrics_edit(self):
+        metrics = self.records[0].metrics
+        metrics.grade, metrics.freshness_score = 'C', 40.0
+        metrics.save()
+        self.assertEqual(self.assertMatchesRecords(('grade',))[0]['grades'], {'A': 2})
+
+    def test_record_moved_to_another_farmer(self):
+        record = self.records[0]
+        record.farmer = self.pune
+        record.save()
+        self.assertMatchesRecords()
+
+    def test_unrelated_saves_write_no_deltas(self):
+        record = self.records[0]
+        record.on_chain_status = True
+        with self.assertNumQueries(2):
+            # The row lookup in pre_save, then the UPDATE
+            record.save()
+        with self.assertNumQueries(1):
+            record.save(update_fields=['on_chain_status'])
+        self.assertMatchesRecords()
+
+    def test_deletes(self):
+        self.records[1].delete()
+        self.records[2].metrics.delete()
+        self.assertMatchesRecords()
+        # Some of the farmer's records already compacted, some still pending
+        compact_rollups()
+        self._record(self.nashik, 'B')
+        # CASCADE deletes the farmer's records one by one
+        self.nashik.delete()
+        self.assertEqual([row['records'] for row in self.assertMatchesRecords()], [1])
+        self.assertMatchesRecords(('location', 'month'))
+        compact_rollups()
+        self.assertEqual([row['records'] for row in self.assertMatchesRecords()], [1])
+        self.assertMatchesRecords(('location', 'month'))
+
+    def test_compaction_keeps_the_answer(self):
+        self.records[0].delete()
+        before = self.assertMatchesRecords()
+        compact_rollups()
+        self.assertEqual(self.assertMatchesRecords(), before)
+
+    def test_raw_source_is_staff_only(self):
+        url = '/api/analytics/quality?group_by=grade&source=raw'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get('/api/analytics/quality?group_by=grade').status_code, 200)
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ReadCacheTests(TestCase):
+    """Passports: 200 with an ETag, 304 on If-None-Match, a new body once the row changes"""
+
+    backend = 'locmem'
+
+    def setUp(self):
+        location = None
+        if self.backend == 'file':
+            location = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, location, True)
+        elif self.backend == 'redis':
+            location = TEST_REDIS_URL
+        override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'reads': read_cache_config(self.backend, location),
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        caches['reads'].clear()
+        self.addCleanup(caches['reads'].clear)
+
+        farmer = Farmer.objects.create(name="A", phone_number="9000000001", location="Nashik")
+        self.record = ProduceRecord.objects.create(farmer=farmer, image='produce_images/x.jpg', passport_id="KP-1")
+        self.report = LabReport.objects.create(report_image='lab_reports/x.pdf', sample_id="S-1", grade='A')
+
+    def _cycle(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        return changed.json()
+
+    def test_produce_passport(self):
+        def change():
+            self.record.blockchain_hash = '0xabc'
+            self.record.save()
+
+        self.assertEqual(self._cycle(f'/api/produce/{self.record.pk}', change)['blockchain_hash'], '0xabc')
+
+    def test_lab_report_passport(self):
+        def change():
+            self.report.grade = 'B'
+            self.report.save()
+
+        self._cycle(f'/api/lab-reports/{self.report.pk}/passport', change)
+
+    def test_read_built_before_a_change_is_not_served(self):
+        url = f'/api/produce/{self.record.pk}'
+
+        def build_from_old_row():
+            data = {'blockchain_hash': self.record.blockchain_hash}
+            # The change commits while this read is still building
+            with self.captureOnCommitCallbacks(execute=True):
+                changed = ProduceRecord.objects.get(pk=self.record.pk)
+                changed.blockchain_hash = '0xabc'
+                changed.save()
+            return data
+
+        cached_read(RequestFactory().get(url), produce_key(self.record.pk), build_from_old_row)
+        self.assertEqual(self.client.get(url).json()['blockchain_hash'], '0xabc')
+
+    def test_evicted_generation_does_not_bring_back_old_pages(self):
+        self.record.on_chain_status = True
+        self.record.save()
+        url = '/api/marketplace/list'
+        self.assertIsNone(self.client.get(url).json()['results'][0]['blockchain_hash'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record.blockchain_hash = '0xabc'
+            self.record.save()
+        self.assertEqual(self.client.get(url).json()['results'][0]['blockchain_hash'], '0xabc')
+        caches['reads'].delete(MARKETPLACE_GENERATION)
+        self.assertEqual(self.client.get(url).json()['results'][0]['blockchain_hash'], '0xabc')
+
+
+class FileReadCacheTests(ReadCacheTests):
+    backend = 'file'
+
+
+@unittest.skipUnless(redis_available(), f"no Redis at {TEST_REDIS_URL}")
+class RedisReadCacheTests(ReadCacheTests):
+    backend = 'redis'
+
+
+class BulkAnalyzeTests(TestCase):
+    RESULT = {'grade': 'A', 'confidence_score': 0.75, 'freshness_score': 90.0, 'color_saturation': 110.0,
+              'surface_defects': {'count': 1}, 'rules_version': 'v1'}
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.farmer = Farmer.objects.create(name="A", phone_number="9000000001", location="Nashik")
+
+    def _post(self, count):
+        images = [SimpleUploadedFile(f"{i}.jpg", b"jpeg", content_type='image/jpeg') for i in range(count)]
+        client = mock.Mock()
+        client.analyze_batch.return_value = [{'index': i, 'status': 'ok', 'result': self.RESULT}
+                                             for i in range(count)]
+        with mock.patch('api.views.get_ai_client', return_value=client):
+            return self.client.post('/api/produce/bulk-analyze', {'farmer': self.farmer.pk, 'images': images})
+
+    def test_creates_records_and_rollups(self):
+        response = self._post(3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['created']), 3)
+        self.assertEqual(quality_summary(), quality_summary(source='raw'))
+        self.assertEqual(quality_summary()[0]['records'], 3)
+
+    def test_failed_item_leaves_no_orphan_metrics(self):
+        # Every record gets the same passport ID, so all but the first insert fail
+        with mock.patch('api.views.uuid.uuid4', return_value=mock.Mock(hex='0' * 32)):
+            response = self._post(3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((len(response.json()['created']), len(response.json()['errors'])), (1, 2))
+        self.assertEqual(ProduceRecord.objects.count(), 1)
+        self.assertEqual(QualityMetrics.objects.count(), 1)
+        self.assertEqual(quality_summary()[0]['records'], 1)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.client_ = AIServiceClient('http://ai.invalid', {'default': (1, 1)}, retries=0,
+                                breaker_threshold=1, breaker_reset=0)
+        with mock.patch.object(self.client_.session, 'request', side_effect=requests.ConnectionError):
+            with self.assertRaises(AIServiceUnavailable):
+                self.client_.grading_rules()
+        self.assertEqual(self.client_.breaker.state, 'half-open')
+
+    def test_unexpected_error_in_trial_releases_it(self):
+        with mock.patch.object(self.client_.session, 'request', side_effect=TypeError):
+            with self.assertRaises(TypeError):
+                self.client_.grading_rules()
+        # The next call is let through as a new trial instead of being rejected forever
+        self.assertTrue(self.client_.breaker.allow())
+
+    def test_successful_trial_closes(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'version': 'v1'}
+        with mock.patch.object(self.client_.session, 'request', return_value=response):
+            self.assertEqual(self.client_.grading_rules(), {'version': 'v1'})
+        self.assertEqual(self.client_.breaker.state, 'closed')
+
+    def test_call_admitted_while_closed_leaves_the_trial_alone(self):
+        client = AIServiceClient('http://ai.invalid', {'default': (1, 1)}, retries=0,
+                                 breaker_threshold=1, breaker_reset=0)
+
+        def meanwhile(*args, **kwargs):
+            # Other threads trip the breaker and one of them takes the half-open trial
+            client.breaker.record_failure()
+            self.assertEqual(client.breaker.allow(), client.breaker.TRIAL)
+            raise TypeError
+
+        with mock.patch.object(client.session, 'request', side_effect=meanwhile):
+            with self.assertRaises(TypeError):
+                client.grading_rules()
+        self.assertFalse(client.breaker.allow())
+
+
+class StubAIService(ThreadingHTTPServer):
+    """Local HTTP/1.1 server answering GETs with queued statuses (then 200), counting connections"""
+    daemon_threads = True
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                with self._lock:
+                    self.requests += 1
+                    status = self.statuses.pop(0) if self.statuses else 200
+                body = b'{"version": "v1"}'
+                handler.send_response(status)
+                handler.send_header('Content-Type', 'application/json')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Handler)
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class AIServiceClientTests(SimpleTestCase):
+    def serve(self, statuses=()):
+        server = StubAIService(statuses)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = AIServiceClient(f'http://127.0.0.1:{server.server_port}', {'default': (1, 5)},
+                                 retries=2, backoff=0.01)
+        self.addCleanup(client.session.close)
+        return server, client
+
+    def test_requests_reuse_one_pooled_connection(self):
+        server, client = self.serve()
+        for _ in range(5):
+            self.assertEqual(client.grading_rules(), {'version': 'v1'})
+        self.assertEqual((server.requests, server.connections), (5, 1))
+
+    def test_gateway_errors_are_retried(self):
+        server, client = self.serve([503, 502])
+        self.assertEqual(client.grading_rules(), {'version': 'v1'})
+        self.assertEqual((server.requests, server.connections), (3, 1))
+        self.assertEqual(client.breaker.failures, 0)
+
+    def test_other_errors_are_not_retried(self):
+        server, client = self.serve([500])
+        with self.assertRaises(AIServiceError) as raised:
+            client.grading_rules()
+        self.assertEqual(raised.exception.status_code, 500)
+        self.assertEqual(server.requests, 1)
+
+    def test_persistent_gateway_errors_count_one_breaker_failure(self):
+        server, client = self.serve([503, 503, 503])
+        with self.assertRaises(AIServiceUnavailable):
+            client.grading_rules()
+        self.assertEqual((server.requests, client.breaker.failures), (3, 1))
+
+
+class PipelineTests(TestCase):
+    def setUp(self):
+        farmer = Farmer.objects.create(name="A", phone_number="9000000001", location="Nashik")
+        self.record = ProduceRecord.objects.create(farmer=farmer, passport_id="KP-1", pipeline_status='completed')
+
+    @override_settings(PIPELINE_SSE_MAX_STREAMS=1)
+    def test_event_streams_are_capped(self):
+        first = self.client.get(f'/api/produce/{self.record.pk}/events')
+        second = self.client.get(f'/api/produce/{self.record.pk}/events')
+        self.assertEqual(second.status_code, 503)
+        self.assertTrue(second.json()['status_url'].endswith(f'/api/produce/{self.record.pk}/status'))
+        self.assertIn(b'"completed"', b''.join(first.streaming_content))
+        first.close()
+        # Closing the first response frees its slot
+        third = self.client.get(f'/api/produce/{self.record.pk}/events')
+        self.assertEqual(third.status_code, 200)
+        third.close()
+
+    def test_retried_db_stage_keeps_its_metrics(self):
+        analysis = {'grade': 'A', 'confidence_score': 0.75, 'freshness_score': 90.0, 'rules_version': 'v1'}
+        run_db_stage(self.record, analysis)
+        run_db_stage(ProduceRecord.objects.get(pk=self.record.pk), analysis)
+        self.assertEqual(QualityMetrics.objects.count(), 1)
+
+    @override_settings(ANCHOR_MODE='per_record')
+    def test_retried_chain_stage_sends_no_second_transaction(self):
+        self.record.metrics = QualityMetrics.objects.create(grade='A', confidence_score=0.75, freshness_score=90.0)
+        self.record.save()
+        with mock.patch('api.jobs.ContractInteraction') as contract:
+            contract.return_value.record_quality_on_chain.return_value = '0xabc'
+            run_chain_stage(self.record, None)
+            run_chain_stage(ProduceRecord.objects.get(pk=self.record.pk), None)
+        self.assertEqual(contract.return_value.record_quality_on_chain.call_count, 1)
+
+    def test_abandoned_sqlite_task_is_reclaimed_after_its_lease(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        task_queue = SQLiteTaskQueue(os.path.join(directory, 'queue.sqlite3'), lease_seconds=60)
+        task_queue.enqueue(self.record.pk, 'db', {'grade': 'A'})
+        now = time.time()
+        with mock.patch('api.jobs.time.time', return_value=now):
+            task_id = task_queue.claim('crashed')[0]
+            self.assertIsNone(task_queue.claim('other'))
+        # The first worker died without completing; the lease runs out
+        with mock.patch('api.jobs.time.time', return_value=now + 61):
+            self.assertEqual(task_queue.claim('other'), (task_id, self.record.pk, 'db', {'grade': 'A'}, 0))
+        task_queue.complete(task_id, 'crashed')
+        self.assertEqual(task_queue._connect().execute("SELECT claimed_by FROM pipeline_task").fetchall(),
+                         [('other',)])
+        task_queue.complete(task_id, 'other')
+        self.assertIsNone(task_queue.claim('other'))
+
+
+class MetricsTests(TestCase):
+    def test_scrape_time_gauges_skipped_in_multiprocess_mode(self):
+        from api import metrics
+        with mock.patch.object(metrics, 'MULTIPROCESS', True):
+            self.assertIsNone(metrics.scrape_time_gauge('krishi_test_gauge', 'Test gauge', lambda: 7))
+        # Single-process mode registers them, read at scrape time
+        self.assertIn(b'krishi_pipeline_queue_depth', self.client.get('/metrics').content)
+
+
+@override_settings(ANCHOR_MODE='batch', ANCHOR_BATCH_SIZE=2)
+class AnchoringTests(TestCase):
+    def setUp(self):
+        farmer = Farmer.objects.create(name="A", phone_number="9000000001", location="Nashik")
+        self.records = []
+        for i in range(2):
+            metrics = QualityMetrics.objects.create(grade='A', confidence_score=0.75, freshness_score=90.0)
+            self.records.append(ProduceRecord.objects.create(farmer=farmer, passport_id=f"KP-{i}", metrics=metrics))
+        self.chain = InMemoryChain()
+        patcher = mock.patch('api.anchoring.get_chain', return_value=self.chain)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queueing_never_sends(self):
+        with mock.patch.object(self.chain, 'anchor_merkle_root') as send:
+            for record in self.records:
+                queue_for_anchoring(record)
+        send.assert_not_called()
+        self.assertEqual(pending_records().count(), 2)
+
+    def test_failed_send_is_retried_with_the_same_root(self):
+        for record in self.records:
+            queue_for_anchoring(record)
+        with mock.patch.object(self.chain, 'anchor_merkle_root', return_value=None):
+            with self.assertRaises(RuntimeError):
+                flush_due()
+        batch = AnchorBatch.objects.get()
+        self.assertIsNone(batch.anchored_at)
+        self.assertFalse(pending_records().exists())
+        self.assertFalse(proof_for(ProduceRecord.objects.get(pk=self.records[0].pk))['anchored'])
+
+        self.assertEqual(flush_due(), [batch])
+        self.assertEqual(AnchorBatch.objects.count(), 1)
+        self.assertEqual(list(self.chain.roots), [batch.merkle_root])
+        record = ProduceRecord.objects.get(pk=self.records[0].pk)
+        self.assertTrue(record.on_chain_status)
+        self.assertTrue(proof_for(record)['verified'])
+
+    def test_root_already_on_chain_is_not_sent_again(self):
+        for record in self.records:
+            queue_for_anchoring(record)
+        save = AnchorBatch.save
+
+        def fail_recording(batch, *args, **kwargs):
+            if kwargs.get('update_fields'):
+                raise RuntimeError("database went away")
+            return save(batch, *args, **kwargs)
+
+        # The send goes through but recording its tx hash does not
+        with mock.patch.object(AnchorBatch, 'save', fail_recording):
+            with self.assertRaises(RuntimeError):
+                flush_due()
+        self.assertEqual(len(self.chain.roots), 1)
+        with mock.patch.object(self.chain, 'anchor_merkle_root') as send:
+            flush_due()
+        send.assert_not_called()
+        self.assertTrue(ProduceRecord.objects.get(pk=self.records[1].pk).on_chain_status)
+
+
+class Web3ClientTests(SimpleTestCase):
+    def setUp(self):
+        self.w3 = w3 = mock.Mock()
+        w3.eth.get_transaction_count.return_value = 7
+        w3.eth.get_block.return_value = {'baseFeePerGas': None}
+        w3.eth.account.from_key.return_value = mock.Mock(address='0xsender')
+        w3.eth.account.sign_transaction.side_effect = lambda tx, key: mock.Mock(raw_transaction=tx)
+        w3.eth.send_raw_transaction.side_effect = lambda tx: f"0x{tx['nonce']}"
+        w3.to_hex.side_effect = lambda value: value
+        self.sent = w3.eth.send_raw_transaction
+        # A node URL per test, so each gets its own nonce manager
+        with mock.patch('blockchain.web3_client.get_web3', return_value=(w3, mock.Mock())):
+            self.client_ = Web3Client(rpc_url=f'http://{self.id()}', private_key='0x01')
+        self.function = mock.Mock()
+        self.function.return_value.estimate_gas.return_value = 100
+        self.function.return_value.build_transaction.side_effect = lambda tx: dict(tx)
+
+    def test_contract_calls_carry_the_chain_id(self):
+        self.w3.eth.chain_id = 31337
+        self.assertEqual(self.client_.send_transaction(self.function), '0x7')
+        self.assertEqual(self.client_.send_transaction(self.function), '0x8')
+        built = self.function.return_value.build_transaction.call_args.args[0]
+        self.assertEqual((built['chainId'], built['gas']), (31337, 120))
+
+    def test_revert_in_gas_estimation_uses_no_nonce(self):
+        self.function.return_value.estimate_gas.side_effect = ValueError("execution reverted")
+        with self.assertRaises(ValueError):
+            self.client_.send_transaction(self.function)
+        self.w3.eth.get_transaction_count.assert_not_called()
+
+    def test_rejected_send_gives_the_nonce_back_without_resync(self):
+        self.sent.side_effect = [ValueError("insufficient funds for gas * price + value"), '0x7']
+        with self.assertRaises(ValueError):
+            self.client_.send_transaction(self.function)
+        self.assertEqual(self.client_.send_transaction(self.function), '0x7')
+        self.assertEqual(self.w3.eth.get_transaction_count.call_count, 1)
+
+    def test_nonce_error_resyncs_and_retries(self):
+        self.sent.side_effect = [ValueError("nonce too low"), '0x9']
+        self.w3.eth.get_transaction_count.side_effect = [7, 9]
+        self.assertEqual(self.client_.send_transaction(self.function), '0x9')
+        self.assertEqual(self.sent.call_args.args[0]['nonce'], 9)
@@ -4,13 +4,17 @@ from .views import (
     FarmerViewSet, 
     ProduceRecordViewSet, 
     TransactionViewSet,
-    LabReportViewSet
+    LabReportViewSet,
+    profile_list,
+    profile_detail,
+    quality_analytics
 )
 
 urlpatterns = [
     # Lab Report Endpoints
     path('lab-reports/', LabReportViewSet.as_view({'get': 'list', 'post': 'create'})),
     path('lab-reports/analyze', LabReportViewSet.as_view({'post': 'analyze'})),
+    path('lab-reports/bulk-import', LabReportViewSet.as_view({'post': 'bulk_import'})),
     path('lab-reports/<int:pk>/', LabReportViewSet.as_view({'get': 'retrieve'})),
     path('lab-reports/<int:pk>/passport', LabReportViewSet.as_view({'get': 'passport'})),
 
@@ -21,10 +25,21 @@ urlpatterns = [
     # Produce Endpoints (Matching Image)
     path('produce/create', ProduceRecordViewSet.as_view({'post': 'create_record'})),
     path('produce/full-pipeline', ProduceRecordViewSet.as_view({'post': 'full_pipeline'})),
+    path('produce/bulk-analyze', ProduceRecordViewSet.as_view({'post': 'bulk_analyze'})),
     path('produce/<int:pk>', ProduceRecordViewSet.as_view({'get': 'retrieve'})),
     path('produce/farmer/<int:farmer_id>', ProduceRecordViewSet.as_view({'get': 'get_farmer_produce'})),
     path('produce/<int:pk>/verify', ProduceRecordViewSet.as_view({'post': 'verify'})),
+    path('produce/<int:pk>/status', ProduceRecordViewSet.as_view({'get': 'pipeline_status'})),
+    path('produce/<int:pk>/events', ProduceRecordViewSet.as_view({'get': 'pipeline_events'})),
+    path('produce/<int:pk>/proof', ProduceRecordViewSet.as_view({'get': 'proof'})),
 
     # Marketplace Endpoints (Matching Image)
     path('marketplace/list', TransactionViewSet.as_view({'get': 'list_available'})),
+
+    # Quality analytics (rollups)
+    path('analytics/quality', quality_analytics),
+
+    # Profiling captures (staff only)
+    path('admin/profiles', profile_list),
+    path('admin/profiles/<str:capture_id>', profile_detail),
 ]
@@ -1,10 +1,17 @@
-import requests
-import hashlib
+import json
+import time
 import uuid
+import threading
+import tarfile
+import zipfile
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from .models import Farmer, ProduceRecord, QualityMetrics, Transaction, LabReport
 from .serializers import (
     FarmerSerializer, 
@@ -13,12 +20,63 @@ from .serializers import (
     TransactionSerializer,
     LabReportSerializer
 )
+from .ai_client import get_ai_client, AIServiceError, AIServiceUnavailable
+from .jobs import submit_pipeline, pipeline_state
+from .anchoring import quality_hash_for, queue_for_anchoring, proof_for
+from .pagination import CreatedAtCursorPagination
+from .metrics import stage_timer
+from .profiling import captures as profile_captures
+from .read_cache import MARKETPLACE_GENERATION, cached_read, lab_report_key, produce_key, marketplace_key
+from .lab_import import lab_report_from_result, import_reports, iter_archive
+from .analytics import GROUP_BY, quality_summary
 from blockchain.contract_interaction import ContractInteraction
 
+
+class PipelineEventStream:
+    """
+    SSE body that holds one of this process's settings.PIPELINE_SSE_MAX_STREAMS
+    slots until the response is closed, so streams cannot take every worker.
+    """
+    _active = 0
+    _lock = threading.Lock()
+
+    def __init__(self, events):
+        self._events = events
+        self._closed = False
+
+    @classmethod
+    def open(cls, events):
+        """Wrap `events` if a slot is free, else None"""
+        with cls._lock:
+            if cls._active >= settings.PIPELINE_SSE_MAX_STREAMS:
+                return None
+            cls._active += 1
+        return cls(events)
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            PipelineEventStream._active -= 1
+        self._events.close()
+
+
 class LabReportViewSet(viewsets.ModelViewSet):
     """ViewSet for lab report upload and analysis"""
     queryset = LabReport.objects.all()
     serializer_class = LabReportSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sample_id = self.request.query_params.get('sample_id')
+        if sample_id:
+            queryset = queryset.filter(sample_id=sample_id)
+        return queryset
     
     @action(detail=False, methods=['post'])
     def analyze(self, request):
@@ -36,60 +94,70 @@ class LabReportViewSet(viewsets.ModelViewSet):
         
         # Call FastAPI service for Gemini analysis
         try:
-            url = f"{settings.FASTAPI_SERVICE_URL}/api/lab-report/analyze"
-            files = {'file': report_image}
-            response = requests.post(url, files=files, timeout=30)
-            
-            if response.status_code != 200:
-                return Response(
-                    {"error": "Analysis service failed", "details": response.text},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            analysis_result = response.json()
+            analysis_result = get_ai_client().analyze_lab_report(
+                report_image, report_image.name, report_image.content_type
+            )
             
             # Save to database
-            lab_report = LabReport.objects.create(
-                report_image=report_image,
-                sample_id=analysis_result['parameters'].get('sample_id'),
-                lab_name=analysis_result['parameters'].get('lab_name'),
-                report_date=analysis_result['parameters'].get('report_date'),
-                ph_value=analysis_result['parameters'].get('pH'),
-                ph_status=analysis_result['parameters'].get('pH_status'),
-                nitrogen_value=analysis_result['parameters'].get('nitrogen'),
-                nitrogen_status=analysis_result['parameters'].get('nitrogen_status'),
-                phosphorus_value=analysis_result['parameters'].get('phosphorus'),
-                phosphorus_status=analysis_result['parameters'].get('phosphorus_status'),
-                potassium_value=analysis_result['parameters'].get('potassium'),
-                potassium_status=analysis_result['parameters'].get('potassium_status'),
-                organic_carbon_value=analysis_result['parameters'].get('organic_carbon'),
-                organic_carbon_status=analysis_result['parameters'].get('organic_carbon_status'),
-                grade=analysis_result['grade'],
-                grade_description=analysis_result['grade_description'],
-                out_of_range_count=analysis_result['out_of_range_count'],
-                issues=analysis_result['issues']
-            )
+            lab_report = lab_report_from_result(analysis_result, report_image)
+            lab_report.save()
             
             serializer = self.get_serializer(lab_report)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
-        except requests.exceptions.RequestException as e:
+        except AIServiceUnavailable as e:
             return Response(
                 {"error": "Failed to connect to analysis service", "details": str(e)},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
+        except AIServiceError as e:
+            return Response(
+                {"error": "Analysis service failed", "details": e.details},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
         except Exception as e:
             return Response(
                 {"error": "Unexpected error during analysis", "details": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Import many lab reports in one request: `reports` files and/or an
+        `archive` (.zip or .tar.gz). Extraction runs in parallel and rows are
+        written in chunks; large backfills should use the import_lab_reports
+        command, which can also resume from a checkpoint.
+        """
+        reports = request.FILES.getlist('reports')
+        archive = request.FILES.get('archive')
+        if not reports and archive is None:
+            return Response({"error": "No reports or archive provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def files():
+            for report in reports:
+                yield report.name, report.read()
+            if archive is not None:
+                yield from iter_archive(archive, archive.name)
+
+        try:
+            summary = import_reports(
+                files(), workers=settings.LAB_IMPORT_WORKERS, chunk_size=settings.LAB_IMPORT_CHUNK_SIZE
+            )
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            return Response({"error": "Unreadable archive", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.passport(request, pk=kwargs['pk'])
+
     @action(detail=True, methods=['get'])
     def passport(self, request, pk=None):
         """Generate digital passport view for a lab report"""
-        lab_report = self.get_object()
-        serializer = self.get_serializer(lab_report)
-        return Response(serializer.data)
+        if request.query_params:
+            # ?fields= variants are not cached
+            return Response(self.get_serializer(self.get_object()).data)
+        return cached_read(request, lab_report_key(pk), lambda: self.get_serializer(self.get_object()).data)
 
 class FarmerViewSet(viewsets.ModelViewSet):
     queryset = Farmer.objects.all()
@@ -106,13 +174,27 @@ class TransactionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def list_available(self, request):
         # Implementation for /api/marketplace/list
-        queryset = ProduceRecord.objects.filter(on_chain_status=True)
-        serializer = ProduceRecordSerializer(queryset, many=True)
-        return Response(serializer.data)
+        def build():
+            # One joined query per page: farmer name and metrics come with the row
+            queryset = ProduceRecord.objects.select_related('farmer', 'metrics').filter(on_chain_status=True)
+            paginator = CreatedAtCursorPagination()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = ProduceRecordSerializer(page, many=True, context=self.get_serializer_context())
+            return paginator.get_paginated_response(serializer.data).data
+
+        return cached_read(request, marketplace_key(request), build, MARKETPLACE_GENERATION)
 
 class ProduceRecordViewSet(viewsets.ModelViewSet):
-    queryset = ProduceRecord.objects.all()
+    # ProduceRecordSerializer reads farmer.name and nests metrics; join both
+    queryset = ProduceRecord.objects.select_related('farmer', 'metrics')
     serializer_class = ProduceRecordSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    def retrieve(self, request, *args, **kwargs):
+        # QR scans: served from the read cache, with ETag / If-None-Match
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_read(request, produce_key(kwargs['pk']), lambda: self.get_serializer(self.get_object()).data)
 
     # FULL FLOW ROUTE: Camera -> AI -> DB -> Blockchain -> User
     @action(detail=False, methods=['post'])
@@ -123,10 +205,23 @@ class ProduceRecordViewSet(viewsets.ModelViewSet):
         3. Database (post): Saves metrics and produce records
         4. Blockchain (post): Records quality hash on-chain
         5. Again to User: Returns the full digital passport
+
+        With ?mode=async the image is saved and a passport ID returned at
+        once (202); steps 2-4 run as queued background stages whose progress
+        is at /api/produce/{id}/status and /api/produce/{id}/events.
         """
         # 1. Fetch from camera (request data)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        if request.query_params.get('mode') == 'async':
+            produce_record = serializer.save(passport_id=f"KP-{uuid.uuid4().hex[:8].upper()}")
+            submit_pipeline(produce_record)
+            data = pipeline_state(produce_record)
+            data["status_url"] = f"/api/produce/{produce_record.pk}/status"
+            data["events_url"] = f"/api/produce/{produce_record.pk}/events"
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+
         produce_record = serializer.save()
 
         # 2. Call AI Service (FastAPI)
@@ -136,42 +231,160 @@ class ProduceRecordViewSet(viewsets.ModelViewSet):
             return Response({"error": "AI service analysis failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # 3. Save to Database (PostgreSQL)
-        metrics = QualityMetrics.objects.create(
-            grade=analysis_data.get('grade'),
-            confidence_score=analysis_data.get('confidence_score'),
-            freshness_score=analysis_data.get('freshness_score'),
-            color_saturation=analysis_data.get('color_saturation'),
-            surface_defects=analysis_data.get('surface_defects')
-        )
+        with stage_timer("db_write"):
+            metrics = QualityMetrics.objects.create(
+                grade=analysis_data.get('grade'),
+                confidence_score=analysis_data.get('confidence_score'),
+                freshness_score=analysis_data.get('freshness_score'),
+                color_saturation=analysis_data.get('color_saturation'),
+                surface_defects=analysis_data.get('surface_defects'),
+                grading_rules_version=analysis_data.get('rules_version')
+            )
         
         produce_record.metrics = metrics
         produce_record.passport_id = f"KP-{uuid.uuid4().hex[:8].upper()}"
         
         # 4. Save to Blockchain (Post)
-        quality_data_string = f"{produce_record.passport_id}-{metrics.grade}-{metrics.freshness_score}"
-        quality_hash = hashlib.sha256(quality_data_string.encode()).hexdigest()
-        
-        blockchain = ContractInteraction()
-        tx_hash = blockchain.record_quality_on_chain(produce_record.passport_id, quality_hash)
-        
-        if tx_hash:
-            produce_record.blockchain_hash = tx_hash
-            produce_record.on_chain_status = True
-        
-        produce_record.save()
+        if settings.ANCHOR_MODE == 'batch':
+            # Buffered and anchored later as part of a Merkle-root batch
+            produce_record.save()
+            queue_for_anchoring(produce_record)
+            produce_record.refresh_from_db()
+        else:
+            quality_hash = quality_hash_for(produce_record)
+            produce_record.quality_hash = quality_hash
+            
+            blockchain = ContractInteraction()
+            with stage_timer("chain_submit"):
+                tx_hash = blockchain.record_quality_on_chain(produce_record.passport_id, quality_hash)
+            
+            if tx_hash:
+                produce_record.blockchain_hash = tx_hash
+                produce_record.on_chain_status = True
+            
+            produce_record.save()
         
         # 5. Again to User (Response)
         return Response(self.get_serializer(produce_record).data, status=status.HTTP_201_CREATED)
 
+    # POST /api/produce/bulk-analyze
+    @action(detail=False, methods=['post'])
+    def bulk_analyze(self, request):
+        """
+        Grade many produce images for one farmer in a single request.
+        Sends all images to the AI service batch endpoint in one call, then
+        writes each image's QualityMetrics and ProduceRecord in its own
+        transaction, so a failed write leaves no orphan metrics and does not
+        undo the others. On-chain recording is left to the verify step.
+        """
+        images = request.FILES.getlist('images')
+        if not images:
+            return Response({"error": "No images provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            farmer = Farmer.objects.get(pk=request.data.get('farmer'))
+        except (Farmer.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Unknown farmer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = self._call_ai_batch(images)
+        if results is None:
+            return Response({"error": "AI service analysis failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        analysed = []
+        errors = []
+        for index, image in enumerate(images):
+            item = results.get(index)
+            if item and item.get('status') == 'ok':
+                analysed.append((image, item['result']))
+            else:
+                errors.append({
+                    "filename": image.name,
+                    "detail": item.get('detail') if item else "No result returned"
+                })
+
+        records = []
+        for image, data in analysed:
+            image.seek(0)
+            try:
+                with transaction.atomic():
+                    metrics = QualityMetrics.objects.create(
+                        grade=data.get('grade'),
+                        confidence_score=data.get('confidence_score'),
+                        freshness_score=data.get('freshness_score'),
+                        color_saturation=data.get('color_saturation'),
+                        surface_defects=data.get('surface_defects'),
+                        grading_rules_version=data.get('rules_version')
+                    )
+                    records.append(ProduceRecord.objects.create(
+                        farmer=farmer,
+                        image=image,
+                        metrics=metrics,
+                        passport_id=f"KP-{uuid.uuid4().hex[:8].upper()}"
+                    ))
+            except Exception as e:
+                errors.append({"filename": image.name, "detail": f"Could not save: {e}"})
+
+        return Response({
+            "created": self.get_serializer(records, many=True).data,
+            "errors": errors
+        }, status=status.HTTP_201_CREATED)
+
     # POST /api/produce/create
     @action(detail=False, methods=['post'])
 
     # GET /api/produce/farmer/{id}
     @action(detail=False, methods=['get'], url_path='farmer/(?P<farmer_id>[^/.]+)')
     def get_farmer_produce(self, request, farmer_id=None):
-        queryset = ProduceRecord.objects.filter(farmer_id=farmer_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.get_queryset().filter(farmer_id=farmer_id)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    # GET /api/produce/{id}/status
+    @action(detail=True, methods=['get'])
+    def pipeline_status(self, request, pk=None):
+        """Poll background full-pipeline progress"""
+        return Response(pipeline_state(self.get_object()))
+
+    # GET /api/produce/{id}/events
+    @action(detail=True, methods=['get'])
+    def pipeline_events(self, request, pk=None):
+        """Server-sent events: one event per progress change, until done or failed"""
+        produce_record = self.get_object()
+
+        def stream():
+            last = None
+            deadline = time.monotonic() + settings.PIPELINE_SSE_TIMEOUT
+            while time.monotonic() < deadline:
+                produce_record.refresh_from_db(fields=['pipeline_status', 'pipeline_stages', 'pipeline_error',
+                                                       'on_chain_status', 'blockchain_hash'])
+                state = pipeline_state(produce_record)
+                if state != last:
+                    yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+                    last = state
+                if state["pipeline_status"] in ('completed', 'failed'):
+                    return
+                time.sleep(0.5)
+
+        events = PipelineEventStream.open(stream())
+        if events is None:
+            response = Response(
+                {"error": "Too many open event streams, poll the status endpoint instead",
+                 "status_url": request.build_absolute_uri(f"/api/produce/{produce_record.pk}/status")},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '2'
+            return response
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    # GET /api/produce/{id}/proof
+    @action(detail=True, methods=['get'])
+    def proof(self, request, pk=None):
+        """Merkle inclusion proof of this record's quality hash in its anchored batch"""
+        return Response(proof_for(self.get_object()))
 
     # POST /api/produce/{id}/verify
     @action(detail=True, methods=['post'])
@@ -184,13 +397,24 @@ class ProduceRecordViewSet(viewsets.ModelViewSet):
         if not produce_record.metrics:
             return Response({"error": "No quality metrics found to verify"}, status=status.HTTP_400_BAD_REQUEST)
 
-        quality_data_string = f"{produce_record.passport_id}-{produce_record.metrics.grade}-{produce_record.metrics.freshness_score}"
-        quality_hash = hashlib.sha256(quality_data_string.encode()).hexdigest()
+        if settings.ANCHOR_MODE == 'batch':
+            if produce_record.queued_for_anchor_at is None:
+                queue_for_anchoring(produce_record)
+                produce_record.refresh_from_db()
+            if produce_record.on_chain_status:
+                return Response({"message": "Successfully verified on-chain", "hash": produce_record.blockchain_hash})
+            return Response(
+                {"message": "Queued for batched anchoring", "quality_hash": produce_record.quality_hash},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        quality_hash = quality_hash_for(produce_record)
         
         blockchain = ContractInteraction()
         tx_hash = blockchain.record_quality_on_chain(produce_record.passport_id, quality_hash)
         
         if tx_hash:
+            produce_record.quality_hash = quality_hash
             produce_record.blockchain_hash = tx_hash
             produce_record.on_chain_status = True
             produce_record.save()
@@ -199,13 +423,79 @@ class ProduceRecordViewSet(viewsets.ModelViewSet):
         return Response({"error": "Blockchain recording failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def _call_ai_service(self, produce_record):
-        url = f"{settings.FASTAPI_SERVICE_URL}/api/analyze"
         try:
-            with open(produce_record.image.path, 'rb') as img_file:
-                files = {'file': img_file}
-                response = requests.post(url, files=files)
-                if response.status_code == 200:
-                    return response.json()
+            # Streamed from storage in chunks; never read fully into memory
+            with produce_record.image.open('rb') as img_file:
+                return get_ai_client().analyze_image(img_file, produce_record.image.name)
+        except Exception as e:
+            print(f"Error calling AI service: {e}")
+        return None
+
+    def _call_ai_batch(self, images):
+        """POST all images to /api/analyze/batch; returns {index: NDJSON item}"""
+        files = [(image.name, image, image.content_type) for image in images]
+        try:
+            # Results stream back in completion order, keyed by upload index
+            return {item['index']: item for item in get_ai_client().analyze_batch(files)}
         except Exception as e:
             print(f"Error calling AI service: {e}")
         return None
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_list(request):
+    """Slow-request captures, newest first, without the profile text"""
+    return Response({
+        "enabled": settings.PROFILING_ENABLED,
+        "captures": [
+            {key: value for key, value in capture.items() if key != 'profile'}
+            for capture in reversed(profile_captures)
+        ]
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, capture_id):
+    for capture in profile_captures:
+        if capture['id'] == capture_id:
+            return Response(capture)
+    return Response({"error": "No such capture"}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+def quality_analytics(request):
+    """
+    Produce grade distribution and average quality, e.g.
+    /api/analytics/quality?from=2026-01-01&to=2026-03-31&group_by=location,month
+    group_by: any of farmer, location, day|month, grade. Filters: farmer, location.
+    source=raw (staff only) answers from the records with GROUP BY instead of
+    the rollups; over the whole table that is seconds of database time.
+    """
+    params = request.query_params
+    try:
+        start, end = (parse_date(params[name]) if params.get(name) else None for name in ('from', 'to'))
+        farmer = int(params['farmer']) if params.get('farmer') else None
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if (params.get('from') and start is None) or (params.get('to') and end is None):
+        return Response({"error": "from and to must be YYYY-MM-DD dates"}, status=status.HTTP_400_BAD_REQUEST)
+
+    group_by = [name.strip() for name in params.get('group_by', '').split(',') if name.strip()]
+    unknown = set(group_by) - set(GROUP_BY)
+    if unknown or {'day', 'month'} <= set(group_by):
+        return Response(
+            {"error": f"group_by takes {', '.join(GROUP_BY)} (day or month, not both)"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    source = params.get('source', 'rollup')
+    if source not in ('rollup', 'raw'):
+        return Response({"error": "source is rollup or raw"}, status=status.HTTP_400_BAD_REQUEST)
+    if source == 'raw' and not IsAdminUser().has_permission(request, None):
+        return Response({"error": "source=raw is for staff only"}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        "from": start,
+        "to": end,
+        "group_by": group_by,
+        "source": source,
+        "results": quality_summary(start, end, group_by, farmer, params.get('location') or None, source),
+    })
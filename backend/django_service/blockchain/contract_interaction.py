@@ -15,3 +15,19 @@ class ContractInteraction:
         dummy_tx_hash = f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}"[:66]
         print(f"[MOCK BLOCKCHAIN] Recorded {passport_id} with hash {quality_hash}")
         return dummy_tx_hash
+
+    def anchor_merkle_root(self, merkle_root, leaf_count):
+        """
+        DUMMY ROUTE: Simulates KrishiPassport.anchorRoot(root, leafCount), which
+        records one Merkle root covering a whole batch of quality hashes.
+        """
+        dummy_tx_hash = f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}"[:66]
+        print(f"[MOCK BLOCKCHAIN] Anchored root {merkle_root} covering {leaf_count} records")
+        return dummy_tx_hash
+
+    def is_root_anchored(self, merkle_root):
+        """
+        DUMMY ROUTE: Simulates KrishiPassport.isRootAnchored(root); anchorRoot
+        reverts for a root that is already anchored.
+        """
+        return False
@@ -0,0 +1,56 @@
+import hashlib
+
+
+def _hash_pair(a, b):
+    # Sorted pairs, so a proof is just the list of sibling hashes
+    if b < a:
+        a, b = b, a
+    return hashlib.sha256(a + b).digest()
+
+
+def _leaf(leaf_hex):
+    # Domain-separate leaves from inner nodes (second-preimage protection)
+    return hashlib.sha256(b"\x00" + bytes.fromhex(leaf_hex)).digest()
+
+
+def build_levels(leaves_hex):
+    """All tree levels, leaves first. An odd node is promoted unchanged."""
+    if not leaves_hex:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+    level = [_leaf(h) for h in leaves_hex]
+    levels = [level]
+    while len(level) > 1:
+        level = [
+            _hash_pair(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(leaves_hex):
+    return build_levels(leaves_hex)[-1][0].hex()
+
+
+def merkle_proofs(leaves_hex):
+    """Root and one sibling-hash proof per leaf, from a single tree build."""
+    levels = build_levels(leaves_hex)
+    proofs = []
+    for index in range(len(leaves_hex)):
+        proof = []
+        position = index
+        for level in levels[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling].hex())
+            position //= 2
+        proofs.append(proof)
+    return levels[-1][0].hex(), proofs
+
+
+def verify_proof(leaf_hex, proof, root_hex):
+    """Check membership offline, without talking to the chain"""
+    node = _leaf(leaf_hex)
+    for sibling_hex in proof:
+        node = _hash_pair(node, bytes.fromhex(sibling_hex))
+    return node.hex() == root_hex
@@ -0,0 +1,119 @@
+import time
+import threading
+from concurrent.futures import Future
+from web3.exceptions import TransactionNotFound
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account from a local counter, so transactions
+    can be signed and sent back to back without a get_transaction_count
+    round-trip each. The counter is seeded from the node's pending count and
+    re-seeded by resync() whenever the node rejects a nonce.
+
+    One manager per (node, account) per process; see get_nonce_manager.
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+
+    def next_nonce(self):
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def resync(self):
+        with self._lock:
+            self._next = self.w3.eth.get_transaction_count(self.address, 'pending')
+
+    def release(self, nonce):
+        """
+        Give back a nonce whose transaction never reached the node. If a later
+        one was handed out since, the gap cannot be closed locally, so the
+        counter is re-seeded from the node on next use instead.
+        """
+        with self._lock:
+            if self._next == nonce + 1:
+                self._next = nonce
+            else:
+                self._next = None
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(w3, rpc_url, address):
+    key = (rpc_url, address)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = NonceManager(w3, address)
+        return _managers[key]
+
+
+class ReceiptWatcher:
+    """
+    Waits for transaction receipts on a background thread, so senders get a
+    Future instead of blocking on wait_for_transaction_receipt.
+    """
+
+    def __init__(self, w3, poll_interval=0.5, timeout=120.0):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, tx_hash):
+        future = Future()
+        with self._lock:
+            self._pending[tx_hash] = (future, time.monotonic() + self.timeout)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="receipt-watcher", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                pending = list(self._pending.items())
+            if not pending:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            now = time.monotonic()
+            for tx_hash, (future, deadline) in pending:
+                try:
+                    receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    if now < deadline:
+                        continue
+                    error = TimeoutError(f"No receipt for {tx_hash} after {self.timeout}s")
+                    self._finish(tx_hash, future, error=error)
+                except Exception as e:
+                    self._finish(tx_hash, future, error=e)
+                else:
+                    self._finish(tx_hash, future, receipt=receipt)
+            time.sleep(self.poll_interval)
+
+    def _finish(self, tx_hash, future, receipt=None, error=None):
+        with self._lock:
+            self._pending.pop(tx_hash, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(receipt)
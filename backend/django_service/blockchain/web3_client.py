@@ -1,12 +1,48 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
+from .nonce_manager import get_nonce_manager, ReceiptWatcher
+
+# Errors that mean our local nonce is out of step with the node
+NONCE_ERRORS = (
+    'nonce too low', 'nonce too high', 'invalid transaction nonce',
+    'already known', 'replacement transaction underpriced',
+)
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_web3(rpc_url):
+    """One Web3 per node URL per process, over a pooled keep-alive session."""
+    with _providers_lock:
+        if rpc_url not in _providers:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=20))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=20))
+            provider = Web3.HTTPProvider(rpc_url, session=session, request_kwargs={'timeout': 30})
+            w3 = Web3(provider)
+            _providers[rpc_url] = (w3, ReceiptWatcher(w3))
+        return _providers[rpc_url]
+
 
 class Web3Client:
-    def __init__(self):
-        # Hardcode or manage via settings
-        self.rpc_url = 'http://127.0.0.1:8545' 
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        self.private_key = 'your_private_key_here'
+    def __init__(self, rpc_url=None, private_key=None):
+        # Managed via environment; connection and nonce state are shared per process
+        self.rpc_url = rpc_url or os.getenv('WEB3_RPC_URL', 'http://127.0.0.1:8545')
+        self.w3, self.receipts = get_web3(self.rpc_url)
+        self.private_key = private_key or os.getenv('WEB3_PRIVATE_KEY')
         self.account = self.w3.eth.account.from_key(self.private_key) if self.private_key else None
+        self.nonces = get_nonce_manager(self.w3, self.rpc_url, self.account.address) if self.account else None
+        self.gas_margin = float(os.getenv('WEB3_GAS_MARGIN', '1.2'))
+        # Fee data is re-read at most once per block interval, not per send
+        self.fee_ttl = float(os.getenv('WEB3_FEE_CACHE_SECONDS', '2'))
+        self._fees = None
+        self._fees_at = 0.0
+        self._chain_id = None
         
     def is_connected(self):
         return self.w3.is_connected()
@@ -19,20 +55,78 @@ class Web3Client:
         balance = self.w3.eth.get_balance(address)
         return self.w3.from_wei(balance, 'ether')
 
-    def send_transaction(self, contract_function, *args, **kwargs):
+    def _fee_params(self):
+        """EIP-1559 fees from the latest base fee, or legacy gasPrice"""
+        if self._fees is not None and time.monotonic() - self._fees_at < self.fee_ttl:
+            return self._fees
+        base_fee = self.w3.eth.get_block('latest').get('baseFeePerGas')
+        if base_fee is None:
+            fees = {'gasPrice': self.w3.eth.gas_price}
+        else:
+            priority_fee = self.w3.eth.max_priority_fee
+            fees = {
+                'maxPriorityFeePerGas': priority_fee,
+                # Headroom for the base fee doubling before inclusion
+                'maxFeePerGas': 2 * base_fee + priority_fee,
+            }
+        self._fees, self._fees_at = fees, time.monotonic()
+        return fees
+
+    @property
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _sign_and_send(self, build_tx, retries=2):
+        """
+        Sign with the next local nonce and send without waiting for mining.
+        `build_tx(params)` returns the transaction dict without its nonce.
+
+        The transaction (gas estimation included) is built before a nonce is
+        reserved, so a revert or validation error never uses one. A send the
+        node rejects for its nonce resyncs the manager and is retried; any
+        other failure gives the nonce back, so it leaves no gap that would
+        stall every later transaction.
+        """
         if not self.account:
             raise Exception("Private key not provided")
-            
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
-        
-        tx = contract_function(*args, **kwargs).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            'gas': 2000000,
-            'gasPrice': self.w3.to_wei('50', 'gwei')
-        })
-        
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        
-        return self.w3.to_hex(tx_hash)
+
+        tx = build_tx({'from': self.account.address, **self._fee_params()})
+        for attempt in range(retries + 1):
+            nonce = self.nonces.next_nonce()
+            try:
+                signed_tx = self.w3.eth.account.sign_transaction({**tx, 'nonce': nonce}, self.private_key)
+                raw = getattr(signed_tx, 'raw_transaction', None) or signed_tx.rawTransaction
+                return self.w3.eth.send_raw_transaction(raw)
+            except Exception as e:
+                if any(err in str(e).lower() for err in NONCE_ERRORS):
+                    # Another sender used this nonce (or the node restarted)
+                    self.nonces.resync()
+                    if attempt < retries:
+                        continue
+                else:
+                    self.nonces.release(nonce)
+                raise
+
+    def send_transaction(self, contract_function, *args, **kwargs):
+        """Submit a contract call and return its hash immediately."""
+        bound = contract_function(*args, **kwargs)
+
+        def build(params):
+            gas = bound.estimate_gas({'from': params['from']})
+            return bound.build_transaction({**params, 'gas': int(gas * self.gas_margin), 'chainId': self.chain_id})
+
+        return self.w3.to_hex(self._sign_and_send(build))
+
+    def send_value(self, to, value_wei):
+        def build(params):
+            tx = {**params, 'to': to, 'value': value_wei, 'chainId': self.chain_id}
+            tx['gas'] = int(self.w3.eth.estimate_gas({'from': params['from'], 'to': to, 'value': value_wei}) * self.gas_margin)
+            return tx
+
+        return self.w3.to_hex(self._sign_and_send(build))
+
+    def wait_for_receipt(self, tx_hash):
+        """Future resolved by the background receipt watcher."""
+        return self.receipts.watch(tx_hash)
@@ -16,6 +16,79 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 # External Service URLs
 FASTAPI_SERVICE_URL = os.getenv('FASTAPI_SERVICE_URL', 'http://localhost:8001')
 
+# AI service client: (connect, read) timeouts per endpoint, retries, pool, breaker
+AI_SERVICE_TIMEOUTS = {
+    'default': (3.05, 30),
+    'analyze': (3.05, float(os.getenv('AI_ANALYZE_TIMEOUT', '30'))),
+    'analyze_batch': (3.05, float(os.getenv('AI_ANALYZE_BATCH_TIMEOUT', '300'))),
+    'lab_report': (3.05, float(os.getenv('AI_LAB_REPORT_TIMEOUT', '60'))),
+    'grading': (3.05, float(os.getenv('AI_GRADING_TIMEOUT', '60'))),
+}
+AI_SERVICE_RETRIES = int(os.getenv('AI_SERVICE_RETRIES', '2'))
+AI_SERVICE_POOL_SIZE = int(os.getenv('AI_SERVICE_POOL_SIZE', '10'))
+AI_SERVICE_BREAKER_THRESHOLD = int(os.getenv('AI_SERVICE_BREAKER_THRESHOLD', '5'))
+AI_SERVICE_BREAKER_RESET = float(os.getenv('AI_SERVICE_BREAKER_RESET', '30'))
+
+# Background full pipeline: 'inprocess' (worker threads) or 'sqlite' (run_pipeline_worker)
+PIPELINE_QUEUE_BACKEND = os.getenv('PIPELINE_QUEUE_BACKEND', 'inprocess')
+PIPELINE_QUEUE_DB = os.getenv('PIPELINE_QUEUE_DB', str(BASE_DIR / 'pipeline_queue.sqlite3'))
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '2'))
+PIPELINE_MAX_ATTEMPTS = int(os.getenv('PIPELINE_MAX_ATTEMPTS', '3'))
+PIPELINE_RETRY_DELAY = float(os.getenv('PIPELINE_RETRY_DELAY', '2'))
+# Seconds a sqlite-queue worker holds a task before another worker may take it over
+PIPELINE_TASK_LEASE = float(os.getenv('PIPELINE_TASK_LEASE', '600'))
+PIPELINE_SSE_TIMEOUT = float(os.getenv('PIPELINE_SSE_TIMEOUT', '120'))
+# Each SSE stream holds a worker thread for up to PIPELINE_SSE_TIMEOUT; past this many per process
+# the events endpoint answers 503 and clients poll /api/produce/{id}/status instead
+PIPELINE_SSE_MAX_STREAMS = int(os.getenv('PIPELINE_SSE_MAX_STREAMS', '4'))
+
+# On-chain anchoring: 'per_record' (one tx each) or 'batch' (Merkle root per batch, sent by
+# `manage.py anchor_quality_hashes --loop`)
+ANCHOR_MODE = os.getenv('ANCHOR_MODE', 'per_record')
+ANCHOR_BATCH_SIZE = int(os.getenv('ANCHOR_BATCH_SIZE', '256'))
+ANCHOR_BATCH_SECONDS = float(os.getenv('ANCHOR_BATCH_SECONDS', '300'))
+# 'contract' uses ContractInteraction; 'memory' is an in-process chain stub
+ANCHOR_CHAIN = os.getenv('ANCHOR_CHAIN', 'contract')
+
+# Bulk lab report import: 'service' (AI service), 'stub' (offline) or a dotted path
+LAB_IMPORT_EXTRACTOR = os.getenv('LAB_IMPORT_EXTRACTOR', 'service')
+LAB_IMPORT_WORKERS = int(os.getenv('LAB_IMPORT_WORKERS', '4'))
+LAB_IMPORT_CHUNK_SIZE = int(os.getenv('LAB_IMPORT_CHUNK_SIZE', '50'))
+
+# Read-through cache for passport/marketplace reads (api/read_cache.py):
+# 'locmem' (per process), 'file' or 'redis' (any Redis-compatible server; needs the redis package)
+READ_CACHE_BACKEND = os.getenv('READ_CACHE_BACKEND', 'locmem')
+READ_CACHE_TTL = int(os.getenv('READ_CACHE_TTL', '300'))
+_READ_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'krishi-reads'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'read_cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+
+
+def read_cache_config(backend, location=None):
+    path, default_location = _READ_CACHE_BACKENDS[backend]
+    config = {'BACKEND': path, 'LOCATION': location or default_location, 'TIMEOUT': READ_CACHE_TTL}
+    if backend != 'redis':
+        # Culling limit of the locmem/file backends. RedisCache hands OPTIONS to the
+        # connection pool, which rejects it; size Redis with maxmemory-policy instead
+        config['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('READ_CACHE_MAX_ENTRIES', '10000'))}
+    return config
+
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'reads': read_cache_config(READ_CACHE_BACKEND, os.getenv('READ_CACHE_LOCATION')),
+}
+
+# Request profiling (api/profiling.py); off unless enabled
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_THRESHOLD_MS = float(os.getenv('PROFILING_THRESHOLD_MS', '500'))
+PROFILING_BUFFER_SIZE = int(os.getenv('PROFILING_BUFFER_SIZE', '50'))
+PROFILING_TOP_FUNCTIONS = int(os.getenv('PROFILING_TOP_FUNCTIONS', '40'))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -29,6 +102,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -0,0 +1,93 @@
+"""
+Throughput of the inference micro-batcher at different batch sizes.
+
+Uses a small NumPy MLP in place of MobileNetV2 (or a tiny locally built
+Keras model with --keras), so it runs without downloading weights.
+
+    python benchmarks/bench_batching.py --clients 64 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from common import format_row, summarize
+from utils.ai_inference import INPUT_SIZE, to_result
+from utils.batcher import MicroBatcher
+
+
+def numpy_model(seed=0, hidden=1024):
+    rng = np.random.default_rng(seed)
+    features = 56 * 56 * 3
+    w1 = rng.standard_normal((features, hidden), dtype=np.float32) * 0.01
+    w2 = rng.standard_normal((hidden, 3), dtype=np.float32) * 0.1
+
+    def predict(batch):
+        # Stride-4 subsample down to 56x56, then a two-layer MLP with softmax.
+        # The weight matrix dominates, so per-call cost is mostly fixed.
+        n = batch.shape[0]
+        pooled = np.ascontiguousarray(batch[:, ::4, ::4, :]).reshape(n, -1)
+        logits = np.maximum(pooled @ w1, 0) @ w2
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return [to_result(p) for p in exp / exp.sum(axis=1, keepdims=True)]
+
+    return predict
+
+
+def keras_model():
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(*INPUT_SIZE, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(3, activation="softmax"),
+    ])
+
+    def predict(batch):
+        return [to_result(p) for p in model.predict(batch, batch_size=len(batch), verbose=0)]
+
+    return predict
+
+
+async def run(predict, batch_size, wait_ms, clients, requests):
+    batcher = MicroBatcher(predict, max_batch_size=batch_size, max_wait_ms=wait_ms)
+    sample = np.random.default_rng(1).random((*INPUT_SIZE, 3), dtype=np.float32)
+    latencies = []
+    remaining = [requests]
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            await batcher.submit(sample)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    await batcher.stop()
+    return summarize(latencies, elapsed), batcher.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    parser.add_argument("--keras", action="store_true", help="use a tiny Keras model instead of NumPy")
+    args = parser.parse_args()
+
+    predict = keras_model() if args.keras else numpy_model()
+    predict(np.zeros((1, *INPUT_SIZE, 3), dtype=np.float32))  # warm-up
+
+    print(f"{args.clients} concurrent clients, {args.requests} requests, max wait {args.wait_ms} ms")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        stats, batch_stats = asyncio.run(run(predict, batch_size, args.wait_ms, args.clients, args.requests))
+        print(format_row(f"max_batch_size={batch_size}", stats) + f"  fill {batch_stats['fill_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
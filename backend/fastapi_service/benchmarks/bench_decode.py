@@ -0,0 +1,87 @@
+"""
+Compare the old temp-file analyze path with the in-memory decode path.
+
+The "before" pipeline writes each upload to temp_<name>, reads it back with
+cv2.imread and removes it; the "after" pipeline decodes the bytes once with
+decode_image. Both then run the same process_image / freshness / grade steps.
+
+    python benchmarks/bench_decode.py --images ~/phone_jpegs --concurrency 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from common import Timer, format_row, load_images, summarize
+from utils.image_processor import decode_image, process_image
+from utils.freshness_calculator import calculate_freshness
+from utils.quality_grader import grade_produce
+
+# Stand-in for get_inference so the benchmark does not need TensorFlow
+INFERENCE = {"class": "A", "confidence": 0.92, "raw_scores": [0.92, 0.05, 0.03]}
+
+
+def analyze_from_disk(name, image_bytes, workdir):
+    temp_path = os.path.join(workdir, f"temp_{name}")
+    with open(temp_path, "wb") as buffer:
+        buffer.write(image_bytes)
+    try:
+        image = cv2.imread(temp_path)
+        processed = process_image(image)
+        freshness = calculate_freshness(processed, INFERENCE)
+        return grade_produce(INFERENCE, freshness)
+    finally:
+        os.remove(temp_path)
+
+
+def analyze_in_memory(name, image_bytes, workdir):
+    image = decode_image(image_bytes)
+    processed = process_image(image)
+    freshness = calculate_freshness(processed, INFERENCE)
+    return grade_produce(INFERENCE, freshness)
+
+
+def run(pipeline, images, requests, concurrency, workdir):
+    latencies = []
+
+    def one(i):
+        name, data = images[i % len(images)]
+        # Unique names so concurrent "before" requests do not clobber each other
+        start = time.perf_counter()
+        pipeline(f"{i}_{name}", data, workdir)
+        latencies.append(time.perf_counter() - start)
+
+    with Timer() as t:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+    return summarize(latencies, t.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="directory of phone-camera JPEGs (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    workdir = tempfile.mkdtemp(prefix="bench_decode_")
+    try:
+        # Warm up OpenCV and the page cache before timing
+        analyze_in_memory(*images[0], workdir)
+        before = run(analyze_from_disk, images, args.requests, args.concurrency, workdir)
+        after = run(analyze_in_memory, images, args.requests, args.concurrency, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(images)} images, {args.requests} requests, concurrency {args.concurrency}")
+    print(format_row("before (temp file)", before))
+    print(format_row("after (in-memory)", after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-stage timing of the single-pass FeatureExtractor vs. the old
+full-resolution process_image (HSV, gray, blur, Canny, findContours and a
+Python loop over contours). The extractor counts defects on its downsampled
+frame, so counts differ from the old ones (grading rules v2 recalibrates
+the defect penalty for that); saturation should match to within a fraction
+of a unit. The synthetic photos' noisy background merges most edges into
+one outline, so their defect counts say little about real produce.
+
+    python benchmarks/bench_features.py --repeat 10 --max-side 640
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from common import PHONE_RESOLUTIONS, synthetic_jpeg
+from utils.feature_extractor import FeatureExtractor
+from utils.image_processor import decode_image
+
+
+def legacy_process_image(image, timings):
+    clock = time.perf_counter
+    t0 = clock()
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    saturation = np.mean(hsv[:, :, 1])
+    t1 = clock()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    t2 = clock()
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    defects = [len(c) for c in contours if len(c) > 50]
+    t3 = clock()
+    timings.update({"hsv+saturation": t1 - t0, "gray+blur+canny": t2 - t1, "contours": t3 - t2, "total": t3 - t0})
+    return {"saturation": float(saturation), "defects": {"count": len(defects), "details": defects[:5]}}
+
+
+def bench(fn, image, repeat):
+    totals = defaultdict(float)
+    result = None
+    for _ in range(repeat):
+        timings = {}
+        result = fn(image, timings)
+        for stage, seconds in timings.items():
+            totals[stage] += seconds
+    return {stage: seconds / repeat * 1000 for stage, seconds in totals.items()}, result
+
+
+def print_stages(label, stages):
+    parts = "  ".join(f"{stage} {ms:.2f}" for stage, ms in stages.items() if stage != "total")
+    print(f"  {label:<10} total {stages['total']:>8.2f} ms  ({parts})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-side", type=int, default=640)
+    args = parser.parse_args()
+
+    extractor = FeatureExtractor(max_side=args.max_side, extra_features=True)
+    for width, height in PHONE_RESOLUTIONS + [(1280, 720), (640, 480)]:
+        image = decode_image(synthetic_jpeg(width, height))
+        legacy, old = bench(legacy_process_image, image, args.repeat)
+        single, new = bench(extractor.extract, image, args.repeat)
+        print(f"{width}x{height}: saturation {old['saturation']:.1f} -> {new['saturation']:.1f}, "
+              f"defects {old['defects']['count']} -> {new['defects']['count']}, "
+              f"speed-up {legacy['total'] / single['total']:.1f}x")
+        print_stages("legacy", legacy)
+        print_stages("extractor", single)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+CPU latency, throughput and memory of the inference backends (TensorFlow,
+ONNX Runtime, TFLite; fp32 and int8 exports) on the same model. Each model
+runs in a fresh subprocess, so the import cost and RSS of one runtime do not
+leak into the next.
+
+    python ../../ai-engine/export_model.py ../../ai-engine/models/produce_classifier.h5 --int8 --calibration-dir photos/
+    python benchmarks/bench_inference_backends.py --model-dir ../../ai-engine/models --threads 4
+
+Models whose runtime is not installed are reported and skipped.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from common import peak_rss_mb, percentile
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "ai-engine", "models")
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return peak_rss_mb()
+
+
+def run_child(path, repeat, batch_size):
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    from utils.inference_backends import load_backend
+    backend = load_backend("auto", path)
+    load_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    single = rng.random((1, 224, 224, 3), dtype=np.float32)
+    batch = rng.random((batch_size, 224, 224, 3), dtype=np.float32)
+    backend.predict(single)
+    backend.predict(batch)
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.predict(single)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for _ in range(max(1, repeat // 4)):
+        backend.predict(batch)
+    batch_seconds = (time.perf_counter() - start) / max(1, repeat // 4)
+
+    print(json.dumps({
+        "backend": backend.name,
+        "load_s": load_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "images_per_s": batch_size / batch_seconds,
+        "rss_mb": current_rss_mb() - baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("models", nargs="*", help="model files (default: every export in --model-dir)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=0, help="INFERENCE_THREADS (0: runtime default)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.repeat, args.batch_size)
+        return
+
+    paths = args.models or sorted(
+        path for pattern in ("*.h5", "*.keras", "*.onnx", "*.tflite")
+        for path in glob.glob(os.path.join(args.model_dir, pattern))
+        if os.path.getsize(path) > 0
+    )
+    if not paths:
+        raise SystemExit(f"No exported models in {args.model_dir}; run ai-engine/export_model.py first")
+
+    env = dict(os.environ, INFERENCE_THREADS=str(args.threads), TF_CPP_MIN_LOG_LEVEL="3")
+    print(f"{'model':<34} {'backend':<11} {'load s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'img/s @' + str(args.batch_size):>10} {'RSS +MB':>8} {'peak MB':>8}")
+    for path in paths:
+        command = [sys.executable, __file__, "--child", path, "--repeat", str(args.repeat),
+                   "--batch-size", str(args.batch_size)]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        name = os.path.basename(path)
+        if result.returncode != 0:
+            error = (result.stderr.strip().splitlines() or ["failed"])[-1]
+            print(f"{name:<34} skipped: {error}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{name:<34} {stats['backend']:<11} {stats['load_s']:>7.2f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['images_per_s']:>10.1f} {stats['rss_mb']:>8.1f} "
+              f"{stats['peak_rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
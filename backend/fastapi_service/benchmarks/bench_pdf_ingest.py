@@ -0,0 +1,108 @@
+"""
+Per-report latency and peak memory of PDF lab report ingestion: the old
+first-page 300 DPI PNG round trip vs. pdf_ingest (text layer, and forced
+rasterisation at adaptive DPI). Each mode runs in a fresh subprocess so peak
+RSS is not polluted by the previous one. --scanned also builds image-only
+copies of the reports (150 DPI scans) to exercise the raster path.
+
+    python benchmarks/bench_pdf_ingest.py --reports ../../lab_report --repeat 5
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import SAMPLE_REPORTS, peak_rss_mb, percentile
+from utils.pdf_ingest import ingest_pdf
+
+MODES = ("legacy", "raster", "text")
+
+
+def legacy_ingest(pdf_bytes):
+    import fitz
+    from PIL import Image
+    document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    pix = document[0].get_pixmap(dpi=300)
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    image.load()
+    document.close()
+    return image.width * image.height * len(image.getbands())
+
+
+def new_ingest(pdf_bytes, use_text_layer):
+    content = ingest_pdf(pdf_bytes, use_text_layer=use_text_layer)
+    for page in content.pages:
+        page.to_pil().load()
+    return content.raster_bytes
+
+
+def scanned_copy(pdf_bytes, dpi=150):
+    """Image-only copy of a PDF, as a flatbed scan would produce"""
+    import fitz
+    source = fitz.open(stream=pdf_bytes, filetype="pdf")
+    scan = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(dpi=dpi)
+        scan.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=pix)
+    return scan.tobytes()
+
+
+def run_child(mode, path, repeat, scanned):
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    if scanned:
+        pdf_bytes = scanned_copy(pdf_bytes)
+    # Warm imports and MuPDF's font cache before taking the baseline
+    new_ingest(pdf_bytes, True)
+    baseline = peak_rss_mb()
+
+    latencies = []
+    pixels = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if mode == "legacy":
+            pixels = legacy_ingest(pdf_bytes)
+        else:
+            pixels = new_ingest(pdf_bytes, use_text_layer=(mode == "text"))
+        latencies.append(time.perf_counter() - start)
+    print(json.dumps({
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "peak_delta_mb": peak_rss_mb() - baseline,
+        "bitmap_mb": pixels / (1024 * 1024),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", default=SAMPLE_REPORTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scanned", action="store_true")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.repeat, args.scanned)
+        return
+
+    paths = sorted(glob.glob(os.path.join(args.reports, "*.pdf")))
+    if not paths:
+        raise SystemExit(f"No PDFs found in {args.reports}")
+
+    print(f"{'report':<16} {'mode':<8} {'p50 ms':>9} {'peak +MB':>9} {'bitmap MB':>10}")
+    for path in paths:
+        for mode in MODES:
+            command = [sys.executable, __file__, "--child", mode, path, "--repeat", str(args.repeat)]
+            if args.scanned:
+                command.append("--scanned")
+            output = subprocess.check_output(command, stderr=subprocess.DEVNULL, text=True)
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{os.path.basename(path):<16} {mode:<8} {stats['p50_ms']:>9.1f} "
+                  f"{stats['peak_delta_mb']:>9.1f} {stats['bitmap_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
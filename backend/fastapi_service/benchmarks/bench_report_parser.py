@@ -0,0 +1,76 @@
+"""
+How many sample lab reports the local text-layer parser handles, and the
+per-report latency of that path vs. the Gemini path (stubbed model that sleeps
+for --gemini-latency seconds and returns a canned extraction).
+
+    python benchmarks/bench_report_parser.py --reports ../../lab_report --gemini-latency 2.0
+"""
+import argparse
+import glob
+import os
+import time
+
+from common import SAMPLE_REPORTS, StubGeminiModel, percentile
+from utils import gemini_analyzer
+from utils.gemini_analyzer import LabReportAnalyzer
+from utils.pdf_ingest import ingest_pdf
+from utils.report_parser import parse_report_text
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - start)
+    return result, percentile(latencies, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reports", default=SAMPLE_REPORTS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--gemini-latency", type=float, default=2.0,
+                        help="seconds per stubbed generate_content call")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.reports, "*.pdf")))
+    if not paths:
+        raise SystemExit(f"No PDFs found in {args.reports}")
+
+    model = StubGeminiModel(args.gemini_latency)
+    analyzer = LabReportAnalyzer(model=model)
+    local_count = 0
+    local_ms, remote_ms = [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        content = ingest_pdf(pdf_bytes)
+        parsed = parse_report_text(content.text) if content.text else None
+        handled = bool(parsed and parsed.confident)
+        local_count += handled
+
+        gemini_analyzer.LOCAL_PARSER_ENABLED = True
+        calls = model.calls
+        params, local = timed(lambda: analyzer.extract_parameters(pdf_bytes, is_pdf=True), args.repeat)
+        grade = analyzer.calculate_grade(params)["grade"]
+        went_remote = model.calls > calls
+
+        gemini_analyzer.LOCAL_PARSER_ENABLED = False
+        _, remote = timed(lambda: analyzer.extract_parameters(pdf_bytes, is_pdf=True), args.repeat)
+
+        local_ms.append(local)
+        remote_ms.append(remote)
+        missing = f" missing {','.join(parsed.missing)}" if parsed and parsed.missing else ""
+        print(f"{os.path.basename(path):<16} {'local' if handled else 'gemini':<7} grade {grade}  "
+              f"local path {local:>8.1f} ms{' (fell back)' if went_remote else ''}  "
+              f"gemini path {remote:>8.1f} ms{missing}")
+
+    print(f"\nHandled locally: {local_count}/{len(paths)}")
+    print(f"Mean latency: local path {sum(local_ms) / len(local_ms):.1f} ms, "
+          f"gemini path {sum(remote_ms) / len(remote_ms):.1f} ms "
+          f"(stub sleeps {args.gemini_latency * 1000:.0f} ms per call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start cost of the FastAPI service.
+
+Reports (1) the time to `import main` in a fresh interpreter, with the
+slowest imports from -X importtime, and (2) time-to-first-request: from
+launching uvicorn until /health reports ready and until the first
+/api/analyze response.
+
+    python benchmarks/bench_startup.py --port 8011
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import synthetic_jpeg
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(top):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVICE_DIR, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(result.stderr[-2000:])
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return elapsed, rows[:top]
+
+
+def time_to_first_request(port, timeout):
+    env = dict(os.environ)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        ready_at = None
+        with httpx.Client(base_url=url, timeout=30.0) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get("/health").status_code == 200:
+                        ready_at = time.perf_counter() - start
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+            if ready_at is None:
+                raise SystemExit(f"Service did not become ready within {timeout}s")
+
+            image = synthetic_jpeg(1920, 1080)
+            response = client.post("/api/analyze", files={"file": ("first.jpg", image, "image/jpeg")})
+            first_response_at = time.perf_counter() - start
+            response.raise_for_status()
+    finally:
+        server.terminate()
+        server.wait()
+    return ready_at, first_response_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    elapsed, rows = import_time(args.top)
+    print(f"import main (fresh interpreter): {elapsed * 1000:.0f} ms")
+    for cumulative_us, name in rows:
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    ready_at, first_response_at = time_to_first_request(args.port, args.timeout)
+    print(f"/health ready after:             {ready_at * 1000:.0f} ms")
+    print(f"first /api/analyze response at:  {first_response_at * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
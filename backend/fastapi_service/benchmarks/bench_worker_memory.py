@@ -0,0 +1,123 @@
+"""
+Per-worker memory of the multi-worker serving modes: `uvicorn --workers N`
+(every worker loads its own model) vs. the pre-fork gunicorn config (the
+model is loaded once in the master and shared copy-on-write).
+
+    MODEL_PATH=../../ai-engine/models/produce_classifier.onnx python benchmarks/bench_worker_memory.py --workers 4
+
+RSS counts shared pages in every process that maps them, so it barely moves;
+PSS (shared pages split between the processes sharing them) and USS (pages
+private to the worker) show what each extra worker really costs. Linux only
+(/proc/<pid>/smaps_rollup).
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import synthetic_jpeg
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_mb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, *rest = line.split()
+            if key in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[key.rstrip(":")] = int(rest[0]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "uss": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def worker_pids(master):
+    """Direct children of the server process, minus multiprocessing helpers"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if ppid == master and "resource_tracker" not in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def start(mode, workers, port):
+    if mode == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app",
+                   "--workers", str(workers), "--bind", f"127.0.0.1:{port}"]
+    return subprocess.Popen(command, cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure(mode, workers, port, requests):
+    server = start(mode, workers, port)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 120
+        while True:
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise SystemExit(f"{mode} server did not become ready")
+            time.sleep(0.5)
+
+        pids = []
+        while len(pids) < workers and time.time() < deadline:
+            pids = worker_pids(server.pid)
+            time.sleep(0.2)
+
+        # Run real inference in (most likely) every worker so lazily touched pages are counted
+        image = synthetic_jpeg(640, 480)
+        with httpx.Client(base_url=url, timeout=60) as client:
+            for i in range(requests):
+                response = client.post("/api/analyze", files={"file": (f"{i}.jpg", image, "image/jpeg")},
+                                       headers={"Connection": "close"})
+                response.raise_for_status()
+        time.sleep(1)
+
+        per_worker = [memory_mb(pid) for pid in pids]
+        master = memory_mb(server.pid)
+        return master, per_worker
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="analyze requests spread over the workers")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--modes", default="uvicorn,prefork")
+    args = parser.parse_args()
+
+    # Distinct uploads would be needed otherwise; here every request must reach the model
+    os.environ["RESULT_CACHE_SIZE"] = "0"
+    print(f"model: {os.getenv('MODEL_PATH') or 'simulated'}, {args.workers} workers")
+    print(f"{'mode':<9} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} {'total PSS':>10}")
+    for mode in args.modes.split(","):
+        master, per_worker = measure(mode, args.workers, args.port, args.requests)
+        average = {key: sum(w[key] for w in per_worker) / len(per_worker) for key in ("rss", "pss", "uss")}
+        total = master["pss"] + sum(w["pss"] for w in per_worker)
+        print(f"{mode:<9} {average['rss']:>9.1f}MB {average['pss']:>9.1f}MB {average['uss']:>9.1f}MB "
+              f"{total:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
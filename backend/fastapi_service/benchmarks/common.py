@@ -0,0 +1,144 @@
+"""Shared helpers for the FastAPI service benchmarks."""
+import os
+import sys
+import json
+import time
+import glob
+import resource
+
+import cv2
+import numpy as np
+
+# Make `utils` importable when a script is run directly from benchmarks/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Typical phone-camera resolutions (width, height)
+PHONE_RESOLUTIONS = [(4032, 3024), (3264, 2448), (1920, 1080)]
+
+# The sample PDFs at the repository root
+SAMPLE_REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "lab_report")
+
+
+def synthetic_jpeg(width, height, seed=0, quality=90):
+    """Encode a produce-like test image: a textured blob on a noisy background."""
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    center = (width // 2, height // 2)
+    axes = (width // 3, height // 3)
+    color = tuple(int(c) for c in rng.integers(40, 255, size=3))
+    cv2.ellipse(image, center, axes, 0, 0, 360, color, -1)
+    for _ in range(40):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        cv2.circle(image, (x, y), int(rng.integers(5, max(6, width // 40))), (30, 30, 30), -1)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Failed to encode synthetic JPEG")
+    return encoded.tobytes()
+
+
+def load_images(directory=None, count=6, resolutions=PHONE_RESOLUTIONS):
+    """Return a list of (name, jpeg_bytes) from `directory`, or synthetic ones."""
+    if directory:
+        paths = sorted(
+            glob.glob(os.path.join(directory, "*.jpg"))
+            + glob.glob(os.path.join(directory, "*.jpeg"))
+            + glob.glob(os.path.join(directory, "*.png"))
+        )
+        if not paths:
+            raise SystemExit(f"No images found in {directory}")
+        images = []
+        for path in paths:
+            with open(path, "rb") as f:
+                images.append((os.path.basename(path), f.read()))
+        return images
+
+    images = []
+    for i in range(count):
+        width, height = resolutions[i % len(resolutions)]
+        images.append((f"synthetic_{width}x{height}_{i}.jpg", synthetic_jpeg(width, height, seed=i)))
+    return images
+
+
+def load_reports(directory=SAMPLE_REPORTS):
+    """Return a list of (name, pdf_bytes) for the PDFs in `directory`."""
+    paths = sorted(glob.glob(os.path.join(directory, "*.pdf")))
+    if not paths:
+        raise SystemExit(f"No PDFs found in {directory}")
+    reports = []
+    for path in paths:
+        with open(path, "rb") as f:
+            reports.append((os.path.basename(path), f.read()))
+    return reports
+
+
+class StubGeminiModel:
+    """Stands in for genai.GenerativeModel: fixed latency, fixed answer"""
+
+    ANSWER = {
+        "pH": 6.8, "pH_status": "Normal", "nitrogen": 280, "nitrogen_status": "Adequate",
+        "phosphorus": 18, "phosphorus_status": "Adequate", "potassium": 140, "potassium_status": "Normal",
+        "organic_carbon": None, "organic_carbon_status": None, "report_date": None,
+        "lab_name": None, "sample_id": None,
+    }
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, parts):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return type("Response", (), {"text": f"```json\n{json.dumps(self.ANSWER)}\n```"})()
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec on Linux (a child starts at its parent's peak); VmHWM does not
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Throughput and latency summary; latencies and elapsed are in seconds."""
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+    }
+
+
+def format_row(label, stats):
+    return (
+        f"{label:<24} {stats['requests']:>6} req  {stats['rps']:>8.1f} req/s  "
+        f"p50 {stats['p50_ms']:>8.1f} ms  p99 {stats['p99_ms']:>8.1f} ms"
+    )
+
+
+class Timer:
+    """Context manager that records elapsed wall time in seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
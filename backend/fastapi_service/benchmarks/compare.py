@@ -0,0 +1,100 @@
+"""
+Compare two benchmark result files (suite.py, or Django's
+benchmark_full_pipeline --output) and fail on regressions.
+
+    python benchmarks/compare.py baseline.json results.json --threshold 0.2
+
+*_ms and *_mb metrics are better lower and regress when worse than the
+baseline by more than --threshold (relative); baseline values under --floor
+are skipped as timer noise. rps is better higher, compared the same way.
+*_ratio metrics (e.g. shed_ratio, the share of requests shed with a 503)
+are shares, often 0 in the baseline, so they regress when they grow by
+more than --ratio-threshold in absolute terms. Metrics in the baseline but
+not in the current run are listed; --fail-on-missing makes them fail too.
+"""
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = ("rps",)
+COST_SUFFIXES = ("_ms", "_mb")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def compare(baseline, current, threshold=0.2, floor=0.05, ratio_threshold=0.05):
+    """
+    Return (rows, regressions, missing). Each row is (name, metric, old, new,
+    change, absolute); `change` is relative unless `absolute`. `missing`
+    lists the (name, metric) pairs of the baseline the current run lacks.
+    """
+    rows, regressions, missing = [], [], []
+    for name, old_metrics in sorted(baseline["results"].items()):
+        new_metrics = current["results"].get(name, {})
+        for metric, old in sorted(old_metrics.items()):
+            if not _is_number(old):
+                continue
+            new = new_metrics.get(metric)
+            if not _is_number(new):
+                missing.append((name, metric))
+                continue
+            if metric.endswith("_ratio"):
+                change, absolute, limit = new - old, True, ratio_threshold
+            else:
+                if old == 0 or (metric.endswith(COST_SUFFIXES) and abs(old) < floor):
+                    continue
+                change, absolute, limit = (new - old) / old, False, threshold
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            row = (name, metric, old, new, change, absolute)
+            rows.append(row)
+            if worse > limit:
+                regressions.append(row)
+    return rows, regressions, missing
+
+
+def format_change(row):
+    name, metric, old, new, change, absolute = row
+    shown = f"{change:+8.3f}" if absolute else f"{change:+7.1%}"
+    return f"{name:<44} {metric:<20} {old:>10.2f} -> {new:>10.2f}  {shown}"
+
+
+def report(baseline, current, threshold=0.2, floor=0.05, verbose=False, ratio_threshold=0.05,
+           fail_on_missing=False):
+    """Print the comparison; returns False if anything regressed (or is missing, with fail_on_missing)."""
+    rows, regressions, missing = compare(baseline, current, threshold, floor, ratio_threshold)
+    for row in rows if verbose else regressions:
+        print(format_change(row))
+    for name, metric in missing:
+        print(f"{name:<44} {metric:<20} missing from this run")
+    print(f"{len(rows)} metrics compared against {baseline['meta'].get('git') or 'baseline'}, "
+          f"{len(regressions)} regressed by more than {threshold:.0%} "
+          f"({ratio_threshold:g} for ratios), {len(missing)} missing")
+    return not regressions and not (fail_on_missing and missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--floor", type=float, default=0.05, help="skip *_ms/*_mb baselines below this")
+    parser.add_argument("--ratio-threshold", type=float, default=0.05,
+                        help="absolute growth allowed for *_ratio metrics")
+    parser.add_argument("--fail-on-missing", action="store_true",
+                        help="also fail when a baseline metric is missing from the current run")
+    parser.add_argument("--verbose", action="store_true", help="print every metric, not only regressions")
+    args = parser.parse_args()
+    ok = report(load(args.baseline), load(args.current), args.threshold, args.floor, args.verbose,
+                args.ratio_threshold, args.fail_on_missing)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Saturate /api/analyze and sample /health latency at the same time.
+
+Start the service first, e.g.
+
+    WORKER_POOL_SIZE=4 WORKER_POOL_MAX_QUEUE=8 uvicorn main:app --port 8001
+    python benchmarks/load_health.py --url http://localhost:8001 --concurrency 32
+
+/health should stay flat between the idle and loaded phases; analyze
+requests beyond the pool's queue limit come back as 503.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from common import format_row, load_images, summarize
+
+
+async def probe_health(client, stop, latencies, interval):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def hammer_analyze(client, images, stop, statuses, latencies, worker_id):
+    i = worker_id
+    while not stop.is_set():
+        name, data = images[i % len(images)]
+        start = time.perf_counter()
+        response = await client.post("/api/analyze", files={"file": (name, data, "image/jpeg")})
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] += 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)
+        i += 1
+
+
+async def measure_health(client, seconds, interval):
+    stop = asyncio.Event()
+    latencies = []
+    task = asyncio.create_task(probe_health(client, stop, latencies, interval))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await task
+    return summarize(latencies, seconds)
+
+
+async def main_async(args):
+    images = load_images(args.images)
+    timeout = httpx.Timeout(120.0)
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+        idle = await measure_health(client, args.seconds, args.interval)
+
+        stop = asyncio.Event()
+        statuses = Counter()
+        analyze_latencies = []
+        workers = [
+            asyncio.create_task(hammer_analyze(client, images, stop, statuses, analyze_latencies, w))
+            for w in range(args.concurrency)
+        ]
+        loaded = await measure_health(client, args.seconds, args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+
+    print(f"{args.concurrency} concurrent analyze clients for {args.seconds}s")
+    print(format_row("/health idle", idle))
+    print(format_row("/health under load", loaded))
+    print(format_row("/api/analyze", summarize(analyze_latencies, args.seconds)))
+    print("analyze status codes:", dict(statuses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--images", help="directory of JPEGs (default: synthetic)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.05, help="delay between /health probes")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
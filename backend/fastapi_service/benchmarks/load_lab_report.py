@@ -0,0 +1,107 @@
+"""
+/health latency while lab-report uploads wait on a slow Gemini model, and
+single-flight coalescing of identical uploads. Runs the app in-process with a
+fake model whose generate_content sleeps (no API key or network needed).
+
+    python benchmarks/load_lab_report.py --uploads 16 --gemini-latency 1.5
+
+"blocking" calls the analyzer synchronously inside the async route, as the
+endpoint used to; "async" is the real /api/lab-report/analyze route.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import cv2
+import httpx
+import numpy as np
+
+from common import StubGeminiModel, format_row, summarize
+
+
+def report_png(seed):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(200, 255, size=(400, 300, 3), dtype=np.uint8)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+async def probe_health(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.02)
+
+
+async def run_phase(client, path, uploads):
+    stop = asyncio.Event()
+    health = []
+    prober = asyncio.create_task(probe_health(client, stop, health))
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post(path, files={"file": (f"report_{i}.png", data, "image/png")})
+        for i, data in enumerate(uploads)
+    ])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+    return responses, summarize(health, elapsed), elapsed
+
+
+async def main_async(args):
+    from fastapi import File, HTTPException, UploadFile
+    from main import app
+    from utils.gemini_analyzer import LabReportAnalyzer
+    from utils.model_registry import registry
+
+    model = StubGeminiModel(args.gemini_latency)
+    registry.register("lab_report_analyzer", lambda: LabReportAnalyzer(model=model), required=False)
+    registry.load_all()
+    analyzer = registry.get("lab_report_analyzer")
+
+    @app.post("/bench/blocking-analyze")
+    async def blocking_analyze(file: UploadFile = File(...)):
+        # The old shape of the endpoint: a blocking remote call inside async def
+        data = await file.read()
+        try:
+            return analyzer.calculate_grade(analyzer.extract_parameters(data, False))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        seed = int(time.time())
+        for label, path in (("blocking", "/bench/blocking-analyze"), ("async", "/api/lab-report/analyze")):
+            uploads = [report_png(seed + i) for i in range(args.uploads)]
+            seed += args.uploads
+            calls = model.calls
+            responses, health, elapsed = await run_phase(client, path, uploads)
+            ok = sum(r.status_code == 200 for r in responses)
+            print(f"{label}: {ok}/{len(uploads)} ok in {elapsed:.2f}s, {model.calls - calls} model calls")
+            print("  " + format_row("/health during uploads", health))
+
+        same = [report_png(seed)] * args.uploads
+        calls = model.calls
+        responses, health, elapsed = await run_phase(client, "/api/lab-report/analyze", same)
+        ok = sum(r.status_code == 200 for r in responses)
+        print(f"identical x{args.uploads}: {ok} ok in {elapsed:.2f}s, {model.calls - calls} model call(s)")
+        print("  client stats:", (await client.get("/health/gemini")).json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--concurrency", type=int, default=4, help="GEMINI_MAX_CONCURRENCY")
+    parser.add_argument("--rate-per-minute", type=float, default=600, help="GEMINI_RATE_PER_MINUTE")
+    args = parser.parse_args()
+
+    os.environ["GEMINI_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["GEMINI_RATE_PER_MINUTE"] = str(args.rate_per_minute)
+    os.environ["GEMINI_BURST"] = str(args.concurrency)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+End-to-end benchmark suite: per-function microbenchmarks, per-endpoint
+throughput/latency through the ASGI app, and memory high-water marks, saved
+to JSON so runs can be compared (see compare.py).
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --output new.json --baseline results.json --threshold 0.2
+
+Images are synthetic; lab reports are the sample PDFs with a stubbed Gemini
+model (no API key or network). Result caches are disabled so every request
+does the work. Memory scenarios each run in a fresh subprocess so the peak
+RSS of one does not hide the next.
+"""
+import os
+
+# Measure the work, not the cache or the Gemini quota; set before the app modules read them
+os.environ["RESULT_CACHE_SIZE"] = "0"
+os.environ.setdefault("GEMINI_RATE_PER_MINUTE", "1000000")
+os.environ.setdefault("GEMINI_BURST", "64")
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from common import (SAMPLE_REPORTS, StubGeminiModel, load_reports, peak_rss_mb, percentile,
+                    summarize, synthetic_jpeg)
+import compare
+from utils.ai_inference import get_inference, preprocess
+from utils.analysis_pipeline import analyze_bytes
+from utils.freshness_calculator import calculate_freshness
+from utils.gemini_analyzer import LabReportAnalyzer
+from utils.image_processor import decode_image, process_image
+from utils.model_registry import registry
+from utils.pdf_ingest import ingest_pdf
+from utils.quality_grader import grade_produce
+from utils.report_parser import parse_report_text
+
+RESOLUTIONS = [(640, 480), (1920, 1080), (4032, 3024)]
+
+
+def measure(fn, repeat, min_sample=0.005):
+    """Per-call latency stats; fast functions are looped so each sample is >= min_sample s."""
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_sample or number >= 1 << 20:
+            break
+        number *= 4
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "min_ms": min(samples) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+    }
+
+
+def micro(args, analyzer, reports):
+    results = {}
+    for width, height in RESOLUTIONS:
+        size = f"{width}x{height}"
+        data = synthetic_jpeg(width, height)
+        image = decode_image(data)
+        processed = process_image(image)
+        inference = get_inference(image)
+        freshness = calculate_freshness(processed, inference)
+        cases = {
+            "decode_image": lambda: decode_image(data),
+            "process_image": lambda: process_image(image),
+            "preprocess": lambda: preprocess(image),
+            "get_inference": lambda: get_inference(image),
+            "calculate_freshness": lambda: calculate_freshness(processed, inference),
+            "grade_produce": lambda: grade_produce(inference, freshness),
+            "analyze_bytes": lambda: analyze_bytes(data),
+        }
+        for name, fn in cases.items():
+            results[f"micro.{name}.{size}"] = measure(fn, args.repeat)
+
+    for name, pdf_bytes in reports:
+        content = ingest_pdf(pdf_bytes)
+        parameters = analyzer.extract_parameters(pdf_bytes, is_pdf=True)
+        cases = {
+            "ingest_pdf": lambda: ingest_pdf(pdf_bytes),
+            "parse_report_text": lambda: parse_report_text(content.text),
+            "calculate_grade": lambda: analyzer.calculate_grade(parameters),
+            "extract_parameters": lambda: analyzer.extract_parameters(pdf_bytes, is_pdf=True),
+        }
+        for case, fn in cases.items():
+            results[f"micro.{case}.{name}"] = measure(fn, args.repeat)
+    return results
+
+
+async def drive(client, make_request, count, concurrency):
+    """
+    Send `count` requests with at most `concurrency` in flight. Returns
+    summarize() stats over the 200s plus the share shed with a 503.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    shed = 0
+
+    async def one(i):
+        nonlocal shed
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            elapsed = time.perf_counter() - start
+        if response.status_code == 503:
+            # Backpressure (worker pool saturated) is expected at high concurrency
+            shed += 1
+        elif response.status_code != 200:
+            raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+        else:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(count)])
+    stats = summarize(latencies, time.perf_counter() - start)
+    del stats["requests"]
+    stats["shed_ratio"] = shed / count
+    return stats
+
+
+async def endpoints(args, reports):
+    import httpx
+    from main import app
+
+    images = {f"{w}x{h}": synthetic_jpeg(w, h) for w, h in RESOLUTIONS}
+    # A scanned-looking report: goes past the local parser to the (stubbed) model
+    buffer = io.BytesIO()
+    ingest_pdf(reports[0][1], use_text_layer=False).pages[0].to_pil().save(buffer, format="PNG")
+    png_bytes = buffer.getvalue()
+
+    def upload_pdf(i):
+        name, pdf_bytes = reports[i % len(reports)]
+        return client.post("/api/lab-report/analyze", files={"file": (name, pdf_bytes, "application/pdf")})
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results["endpoint.health.c1"] = await drive(
+            client, lambda i: client.get("/health"), args.requests * 4, 1)
+        for size, data in images.items():
+            for concurrency in (1, args.concurrency):
+                results[f"endpoint.analyze.{size}.c{concurrency}"] = await drive(
+                    client, lambda i: client.post("/api/analyze", files={"file": ("p.jpg", data, "image/jpeg")}),
+                    args.requests, concurrency)
+        for concurrency in (1, args.concurrency):
+            results[f"endpoint.lab_report_pdf.c{concurrency}"] = await drive(
+                client, upload_pdf, args.requests, concurrency)
+            results[f"endpoint.lab_report_image.c{concurrency}"] = await drive(
+                client, lambda i: client.post("/api/lab-report/analyze", files={
+                    "file": ("report.png", png_bytes, "image/png")}),
+                args.requests, concurrency)
+    return results
+
+
+MEMORY_SCENARIOS = {
+    **{f"analyze_bytes.{w}x{h}": ("image", (w, h)) for w, h in RESOLUTIONS},
+    "extract_parameters.text_layer": ("pdf", True),
+    "ingest_pdf.raster": ("pdf", False),
+}
+
+
+def memory_child(name, repeat):
+    """Runs in a subprocess: peak RSS and the tracemalloc peak of `repeat` calls"""
+    kind, arg = MEMORY_SCENARIOS[name]
+    if kind == "image":
+        data = synthetic_jpeg(*arg)
+        fn = lambda: analyze_bytes(data)
+    else:
+        analyzer = LabReportAnalyzer(model=StubGeminiModel())
+        pdf_bytes = load_reports()[0][1]
+        if arg:
+            fn = lambda: analyzer.extract_parameters(pdf_bytes, is_pdf=True)
+        else:
+            fn = lambda: [page.to_pil() for page in ingest_pdf(pdf_bytes, use_text_layer=False).pages]
+    fn()
+    tracemalloc.start()
+    for _ in range(repeat):
+        fn()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "peak_rss_mb": peak_rss_mb(),
+        "tracemalloc_peak_mb": traced_peak / (1024 * 1024),
+    }))
+
+
+def memory(args):
+    results = {}
+    for name in MEMORY_SCENARIOS:
+        output = subprocess.check_output(
+            [sys.executable, __file__, "--memory-child", name, "--repeat", "3"],
+            stderr=subprocess.DEVNULL, text=True)
+        # Last line: libraries may print warnings to stdout first
+        results[f"memory.{name}"] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--levels", default="micro,endpoint,memory")
+    parser.add_argument("--repeat", type=int, default=15, help="samples per microbenchmark")
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--reports", default=SAMPLE_REPORTS)
+    parser.add_argument("--baseline", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--memory-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        memory_child(args.memory_child, args.repeat)
+        return
+
+    levels = args.levels.split(",")
+    reports = load_reports(args.reports)
+    model = StubGeminiModel()
+    registry.register("lab_report_analyzer", lambda: LabReportAnalyzer(model=model), required=False)
+    registry.load_all()
+    analyzer = registry.get("lab_report_analyzer")
+
+    results = {}
+    if "micro" in levels:
+        results.update(micro(args, analyzer, reports))
+    if "endpoint" in levels:
+        results.update(asyncio.run(endpoints(args, reports)))
+    if "memory" in levels:
+        results.update(memory(args))
+
+    run = {
+        "meta": {
+            "suite": "fastapi_service",
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("memory_child", "baseline")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+
+    for name, stats in results.items():
+        print(f"{name:<44} " + "  ".join(f"{k} {v:.4g}" for k, v in stats.items()))
+    print(f"\n{len(results)} results written to {args.output}")
+
+    if args.baseline:
+        ok = compare.report(compare.load(args.baseline), run, args.threshold)
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Pre-fork serving: one copy of the model weights shared by every worker.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+gunicorn imports the app in the master (preload_app), the master loads and
+warms up the grading model, and the uvicorn workers are forked from it, so
+they share the weights copy-on-write instead of each loading its own copy
+(as `uvicorn --workers N` does: it spawns fresh interpreters). The
+lifespan's registry.load_all() then finds the model already loaded and
+only builds the rest (the Gemini client is not fork-safe) per worker.
+
+Forking is only safe while the master has no runtime thread pools, so
+inference runs single-threaded per worker (INFERENCE_THREADS=1) and
+parallelism comes from one worker per core. TensorFlow starts threads as
+soon as it is imported, so with that backend the master skips preloading
+and every worker loads its own model, as before.
+"""
+import gc
+import os
+import multiprocessing
+
+# Read by the backends when the master loads the model; must be set before that
+os.environ.setdefault("INFERENCE_THREADS", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+
+def when_ready(server):
+    from utils.ai_inference import MODEL_NAME
+    from utils.inference_backends import resolve_backend
+    from utils.model_registry import registry
+
+    backend, _ = resolve_backend()
+    if backend == "tensorflow":
+        server.log.warning("TensorFlow backend is not fork-safe; each worker loads its own model")
+        return
+    if os.environ["INFERENCE_THREADS"] != "1":
+        server.log.warning("INFERENCE_THREADS=%s: thread pools created before fork may hang workers",
+                           os.environ["INFERENCE_THREADS"])
+    registry.get(MODEL_NAME)
+    # Keep the collector from writing to (and so un-sharing) every preloaded object
+    gc.freeze()
+    server.log.info("%s (%s) loaded in the master, shared with %d workers", MODEL_NAME, backend, server.num_workers)
@@ -1,11 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routers import analyze, health, lab_report
+from routers import admin, analyze, grading, health, lab_report
+from utils.model_registry import registry
+from utils.worker_pool import get_worker_pool, shutdown_worker_pool
+from utils.batcher import stop_batcher
+from utils.metrics import MetricsMiddleware
+from utils.profiling import ProfilingMiddleware, PROFILING_ENABLED
 
-app = FastAPI(title="Krishi Pramaan AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm up every model once, then start the CPU worker pool
+    await asyncio.to_thread(registry.load_all)
+    get_worker_pool()
+    yield
+    await stop_batcher()
+    shutdown_worker_pool()
+
+app = FastAPI(title="Krishi Pramaan AI Service", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    # Not installed at all by default, so it costs nothing
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(analyze.router)
 app.include_router(health.router)
 app.include_router(lab_report.router)
+app.include_router(grading.router)
+app.include_router(admin.router)
 
 @app.get("/")
 async def root():
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
 class AnalysisResult(BaseModel):
     grade: str
@@ -7,3 +7,16 @@ class AnalysisResult(BaseModel):
     freshness_score: float
     color_saturation: float
     surface_defects: Dict
+
+class ProduceGradingRequest(BaseModel):
+    # Column-oriented: one entry per record, all lists the same length
+    confidence: List[float]
+    freshness: Optional[List[Optional[float]]] = None
+    saturation: Optional[List[Optional[float]]] = None
+    defect_count: Optional[List[Optional[float]]] = None
+    version: Optional[str] = None
+
+class SoilGradingRequest(BaseModel):
+    # "<key>" values and "<key>_status" remarks, e.g. {"pH": [...], "pH_status": [...]}
+    columns: Dict[str, List[Any]]
+    version: Optional[str] = None
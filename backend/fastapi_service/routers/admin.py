@@ -0,0 +1,31 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from utils.profiling import ADMIN_TOKEN, PROFILING_ENABLED, captures
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def require_admin(token: Optional[str]):
+    # No PROFILING_ADMIN_TOKEN configured means no admin access at all
+    if not ADMIN_TOKEN or not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Slow-request captures, newest first, without the profile text"""
+    require_admin(x_admin_token)
+    return {
+        "enabled": PROFILING_ENABLED,
+        "captures": [
+            {key: value for key, value in capture.items() if key != "profile"}
+            for capture in reversed(captures)
+        ],
+    }
+
+@router.get("/profiles/{capture_id}")
+async def get_profile(capture_id: str, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    for capture in captures:
+        if capture["id"] == capture_id:
+            return capture
+    raise HTTPException(status_code=404, detail="No such capture")
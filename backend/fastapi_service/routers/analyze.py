@@ -1,44 +1,147 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from utils.image_processor import process_image
-from utils.ai_inference import get_inference
-from utils.freshness_calculator import calculate_freshness
-from utils.quality_grader import grade_produce
-import shutil
 import os
+import io
+import json
+import asyncio
+import zipfile
+from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from utils.analysis_pipeline import prepare_bytes, finalize
+from utils.ai_inference import MODEL_VERSION
+from utils.batcher import get_batcher
+from utils.feature_extractor import get_extractor
+from utils.grading_rules import load_rules
+from utils.result_cache import get_cache
+from utils.worker_pool import get_worker_pool, PoolSaturated
+from utils.metrics import observe_stage, stage_timer
 
 router = APIRouter()
 
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100"))
+# Total image bytes per batch, counting zip members uncompressed
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_MB", "512")) * 1024 * 1024
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+def get_result_cache():
+    # Results depend on the model, the feature-extractor settings and the grading rules
+    extractor = get_extractor()
+    version = f"{MODEL_VERSION}:{extractor.max_side}:{extractor.extra_features}:{load_rules().version}"
+    return get_cache("analyze", version)
+
+async def run_pipeline(image_bytes):
+    # Re-uploads of the same photo skip OpenCV and inference entirely
+    cache = get_result_cache()
+    cache_key = await cache.key_async(image_bytes)
+    result = await cache.get_async(cache_key)
+    if result is not None:
+        return result
+    
+    # OpenCV preprocessing runs in the worker pool, keeping the event loop free
+    processed_data, model_input, timings = await get_worker_pool().run(prepare_bytes, image_bytes)
+    for stage, seconds in timings.items():
+        observe_stage(stage, seconds)
+    
+    # Inference (TensorFlow), micro-batched with concurrent requests
+    with stage_timer("inference"):
+        inference_results = await get_batcher().submit(model_input)
+    
+    result = finalize(processed_data, inference_results)
+    await cache.set_async(cache_key, result)
+    return result
+
 @router.post("/api/analyze")
 async def analyze_image(file: UploadFile = File(...)):
-    # Create temp file
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Read the upload into memory; no temp file on disk
+    with stage_timer("upload"):
+        image_bytes = await file.read()
     
     try:
-        # Preprocessing (OpenCV)
-        processed_data = process_image(temp_path)
-        
-        # Inference (TensorFlow)
-        inference_results = get_inference(temp_path)
-        
-        # Freshness calculation
-        freshness = calculate_freshness(processed_data, inference_results)
-        
-        # Grading
-        grade_info = grade_produce(inference_results, freshness)
-        
-        # Clean up
-        os.remove(temp_path)
-        
-        return {
-            "grade": grade_info['grade'],
-            "confidence_score": inference_results['confidence'],
-            "freshness_score": freshness,
-            "color_saturation": processed_data['saturation'],
-            "surface_defects": processed_data['defects']
-        }
+        return await run_pipeline(image_bytes)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
+
+def expand_uploads(uploads):
+    """
+    Flatten uploaded images and zip archives into (filename, bytes) pairs.
+    The image count and total size are checked from the zip directories
+    before any member is decompressed, so a small archive cannot expand
+    past the batch limits.
+    """
+    entries = []
+    for name, data in uploads:
+        if name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"{name} is not a valid zip archive")
+            entries.extend(
+                (archive, member) for member in archive.infolist()
+                if not member.is_dir() and member.filename.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            entries.append((name, data))
+    
+    if len(entries) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_FILES} images per batch")
+    # Reading a member stops at its declared file_size, so this bounds memory too
+    total = sum(item.file_size if isinstance(item, zipfile.ZipInfo) else len(item) for _, item in entries)
+    if total > BATCH_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_BYTES // (1024 * 1024)} MB of images per batch")
+    
+    images = []
+    for source, item in entries:
+        if isinstance(source, zipfile.ZipFile):
+            try:
+                images.append((item.filename, source.read(item)))
+            except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                raise HTTPException(status_code=400, detail=f"Cannot extract {item.filename}: {e}")
+        else:
+            images.append((source, item))
+    return images
+
+async def analyze_one(index, filename, image_bytes, slots):
+    async with slots:
+        # Batch items wait for a free slot rather than failing on a busy pool
+        for attempt in range(20):
+            try:
+                result = await run_pipeline(image_bytes)
+                return {"index": index, "filename": filename, "status": "ok", "result": result}
+            except PoolSaturated:
+                await asyncio.sleep(0.05 * (attempt + 1))
+            except ValueError as e:
+                return {"index": index, "filename": filename, "status": "error", "status_code": 400, "detail": str(e)}
+            except Exception as e:
+                return {"index": index, "filename": filename, "status": "error", "status_code": 500, "detail": str(e)}
+        return {"index": index, "filename": filename, "status": "error", "status_code": 503, "detail": "Worker pool saturated"}
+
+@router.post("/api/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """
+    Analyze many produce images (or zip archives of images) in one request.
+    Streams one NDJSON line per image, in completion order, as each finishes.
+    """
+    uploads = [(f.filename or f"upload_{i}", await f.read()) for i, f in enumerate(files)]
+    images = expand_uploads(uploads)
+    if not images:
+        raise HTTPException(status_code=400, detail="No images found in upload")
+    
+    # Enough in flight to fill the pool and the inference batcher, no more
+    slots = asyncio.Semaphore(get_worker_pool().size)
+    
+    async def stream():
+        tasks = [
+            asyncio.create_task(analyze_one(i, name, data, slots))
+            for i, (name, data) in enumerate(images)
+        ]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,69 @@
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from models.schemas import ProduceGradingRequest, SoilGradingRequest
+from utils.grading_rules import available_versions, load_rules
+
+router = APIRouter(prefix="/api/grading", tags=["grading"])
+
+def get_rules(version):
+    try:
+        return load_rules(version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_lengths(columns):
+    lengths = {len(column) for column in columns if column is not None}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=400, detail="All columns must have the same length")
+
+@router.get("/rules")
+async def get_grading_rules(version: str = None):
+    """The active (or requested) rules table and the versions on disk"""
+    rules = get_rules(version)
+    return {"version": rules.version, "available": available_versions(), "rules": rules.table}
+
+@router.post("/produce")
+async def grade_produce_batch(request: ProduceGradingRequest):
+    """
+    Grade many produce records at once (bulk re-grading). Freshness is
+    recomputed where saturation and defect counts are given, otherwise the
+    stored `freshness` is graded as is.
+    """
+    check_lengths([request.confidence, request.freshness, request.saturation, request.defect_count])
+    rules = get_rules(request.version)
+    size = len(request.confidence)
+
+    def column(values):
+        return np.array([np.nan if v is None else v for v in values or [None] * size], dtype=np.float64)
+
+    freshness = column(request.freshness)
+    saturation, defects = column(request.saturation), column(request.defect_count)
+    measured = ~np.isnan(saturation) & ~np.isnan(defects)
+    freshness = np.where(measured, rules.freshness(saturation, defects), freshness)
+    if np.isnan(freshness).any():
+        raise HTTPException(status_code=400, detail="Each record needs a freshness, or saturation and defect_count")
+
+    grades, labels = rules.grade_produce(column(request.confidence), freshness)
+    return {
+        "rules_version": rules.version,
+        "grade": grades.tolist(),
+        "label": labels.tolist(),
+        "freshness": freshness.tolist(),
+    }
+
+@router.post("/soil")
+async def grade_soil_batch(request: SoilGradingRequest):
+    """Grade many soil reports at once from their parameter columns"""
+    check_lengths(request.columns.values())
+    rules = get_rules(request.version)
+    if not request.columns:
+        return {"rules_version": rules.version, "grade": [], "grade_description": [],
+                "out_of_range_count": [], "issues": []}
+    grades, descriptions, counts, issues = rules.grade_soil(request.columns)
+    return {
+        "rules_version": rules.version,
+        "grade": grades.tolist(),
+        "grade_description": descriptions.tolist(),
+        "out_of_range_count": counts.tolist(),
+        "issues": issues,
+    }
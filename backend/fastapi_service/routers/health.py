@@ -1,7 +1,41 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from utils.metrics import render_metrics
+from utils.batcher import get_batcher
+from utils.model_registry import registry
+from utils.result_cache import cache_stats
+from utils.gemini_analyzer import GeminiUnavailable
 
 router = APIRouter()
 
 @router.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+async def health_check(response: Response):
+    # Ready only once every required model is loaded and warmed up
+    if not registry.ready:
+        response.status_code = 503
+        return {"status": "starting", "models": registry.status()}
+    return {"status": "healthy", "models": registry.status()}
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus exposition: per-route requests/latency, stage histograms, queue gauges"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/health/inference")
+async def inference_stats():
+    """Micro-batching counters, including batch fill ratio"""
+    return get_batcher().stats()
+
+@router.get("/health/cache")
+async def result_cache_stats():
+    """Hit/miss counters for the analyze and lab-report result caches"""
+    return cache_stats()
+
+@router.get("/health/gemini")
+async def gemini_stats():
+    """Concurrency, rate-limit and coalescing counters for the Gemini client"""
+    try:
+        client = registry.get("lab_report_analyzer").client
+    except (ValueError, GeminiUnavailable) as e:
+        return {"available": False, "error": str(e)}
+    return {"available": True, **client.stats()}
@@ -6,11 +6,18 @@ import os
 # Add parent directory to path to import utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.gemini_analyzer import LabReportAnalyzer
+from utils.model_registry import registry
+from utils.gemini_analyzer import GeminiUnavailable, PROMPT_VERSION  # also registers the lab report analyzer
+from utils.result_cache import get_cache
 
 router = APIRouter(prefix="/api/lab-report", tags=["lab-report"])
 
-analyzer = LabReportAnalyzer()
+def get_analyzer():
+    # Built once by the registry (at startup, or on first use)
+    try:
+        return registry.get("lab_report_analyzer")
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Lab report analysis unavailable: {str(e)}")
 
 @router.post("/analyze")
 async def analyze_lab_report(file: UploadFile = File(...)):
@@ -24,18 +31,35 @@ async def analyze_lab_report(file: UploadFile = File(...)):
     if not any(file.content_type.startswith(t) for t in allowed_types):
         raise HTTPException(status_code=400, detail="File must be an image or PDF")
     
+    # Read file bytes
+    file_bytes = await file.read()
+    
+    # Check if it's a PDF
+    is_pdf = file.content_type == 'application/pdf'
+    
+    # Same bytes + same prompt version -> reuse the earlier extraction
+    cache = get_cache("lab_report", PROMPT_VERSION)
+    cache_key = await cache.key_async(file_bytes, is_pdf)
+    parameters = await cache.get_async(cache_key)
+    
     try:
-        # Read file bytes
-        file_bytes = await file.read()
+        analyzer = get_analyzer()
         
-        # Check if it's a PDF
-        is_pdf = file.content_type == 'application/pdf'
+        if parameters is None:
+            # Local parse or Gemini, off the event loop; identical in-flight uploads share one call
+            parameters = await analyzer.extract_parameters_async(file_bytes, is_pdf, key=cache_key)
+            await cache.set_async(cache_key, parameters)
         
-        # Analyze using Gemini
-        result = analyzer.analyze_report(file_bytes, is_pdf)
+        # Grading is cheap and always re-applied
+        result = analyzer.calculate_grade(parameters)
         
         return JSONResponse(content=result, status_code=200)
         
+    except HTTPException:
+        raise
+    except GeminiUnavailable as e:
+        # Only reports the local parser could not read get here
+        raise HTTPException(status_code=503, detail=f"Lab report analysis unavailable: {str(e)}")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
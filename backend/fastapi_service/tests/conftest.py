@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make `main`, `routers` and `utils` importable when pytest runs from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
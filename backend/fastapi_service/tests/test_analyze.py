@@ -0,0 +1,14 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from utils.image_processor import decode_image
+
+
+def test_empty_upload_is_rejected():
+    with pytest.raises(ValueError):
+        decode_image(b"")
+    with TestClient(app) as client:
+        response = client.post("/api/analyze", files={"file": ("empty.jpg", b"", "image/jpeg")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Empty image upload"
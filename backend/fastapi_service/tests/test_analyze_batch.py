@@ -0,0 +1,53 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+import routers.analyze
+from routers.analyze import expand_uploads
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def no_reads(monkeypatch):
+    def read(self, member):
+        raise AssertionError(f"{member} decompressed before the limits were checked")
+    monkeypatch.setattr(zipfile.ZipFile, "read", read)
+
+
+def test_images_and_archives_are_flattened():
+    archive = make_zip({"a.jpg": b"aa", "notes.txt": b"skip", "dir/b.PNG": b"bb"})
+    images = expand_uploads([("one.jpg", b"11"), ("photos.zip", archive)])
+    assert images == [("one.jpg", b"11"), ("a.jpg", b"aa"), ("dir/b.PNG", b"bb")]
+
+
+def test_too_many_members_rejected_before_reading(monkeypatch, no_reads):
+    monkeypatch.setattr(routers.analyze, "BATCH_MAX_FILES", 3)
+    archive = make_zip({f"{i}.jpg": b"x" for i in range(4)})
+    with pytest.raises(HTTPException) as error:
+        expand_uploads([("photos.zip", archive)])
+    assert error.value.status_code == 413
+
+
+def test_uncompressed_size_rejected_before_reading(monkeypatch, no_reads):
+    monkeypatch.setattr(routers.analyze, "BATCH_MAX_BYTES", 1024 * 1024)
+    # 2 MB of zeros compresses to a few KB
+    archive = make_zip({"bomb.jpg": bytes(2 * 1024 * 1024)})
+    assert len(archive) < 64 * 1024
+    with pytest.raises(HTTPException) as error:
+        expand_uploads([("photos.zip", archive)])
+    assert error.value.status_code == 413
+
+
+def test_invalid_archive_is_400():
+    with pytest.raises(HTTPException) as error:
+        expand_uploads([("photos.zip", b"not a zip")])
+    assert error.value.status_code == 400
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from utils.batcher import MicroBatcher
+
+# A tiny linear "model": 4 features -> 3 class scores
+WEIGHTS = np.arange(12, dtype=np.float32).reshape(4, 3)
+
+
+class LinearModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        return inputs @ WEIGHTS
+
+
+def inputs(count):
+    return [np.full(4, i, dtype=np.float32) for i in range(count)]
+
+
+async def run_batcher(batcher, items):
+    try:
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_submits_fill_batches():
+    model = LinearModel()
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=1000)
+    asyncio.run(run_batcher(batcher, inputs(32)))
+    assert model.batch_sizes == [8, 8, 8, 8]
+    assert batcher.stats()["fill_ratio"] == 1.0
+
+
+def test_rows_go_back_to_their_callers():
+    batcher = MicroBatcher(LinearModel(), max_batch_size=8, max_wait_ms=5)
+    items = inputs(20)
+    results = asyncio.run(run_batcher(batcher, items))
+    for item, result in zip(items, results):
+        np.testing.assert_array_equal(result, item @ WEIGHTS)
+
+
+def test_partial_batch_flushes_after_max_wait():
+    model = LinearModel()
+    batcher = MicroBatcher(model, max_batch_size=16, max_wait_ms=50)
+    start = time.perf_counter()
+    asyncio.run(run_batcher(batcher, inputs(3)))
+    elapsed = time.perf_counter() - start
+    assert model.batch_sizes == [3]
+    assert 0.04 <= elapsed < 1.0
+
+
+@pytest.mark.parametrize("failure", ["stack", "predict"])
+def test_failure_reaches_every_waiter_in_the_batch(failure):
+    def predict(batch):
+        raise RuntimeError("model crashed")
+
+    items = inputs(4)
+    if failure == "stack":
+        items[2] = np.zeros(5, dtype=np.float32)
+    batcher = MicroBatcher(predict if failure == "predict" else LinearModel(), max_batch_size=4, max_wait_ms=1000)
+
+    async def scenario():
+        results = await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        # The loop survives the failed batch
+        batcher.predict_fn = LinearModel()
+        batcher.max_wait = 0.01
+        after = await batcher.submit(inputs(1)[0])
+        await batcher.stop()
+        return results, after
+
+    results, after = asyncio.run(scenario())
+    expected = RuntimeError if failure == "predict" else ValueError
+    assert all(isinstance(result, expected) for result in results)
+    np.testing.assert_array_equal(after, np.zeros(3, dtype=np.float32))
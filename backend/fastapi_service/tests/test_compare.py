@@ -0,0 +1,32 @@
+from benchmarks import compare
+
+
+def run(results, git="abc123"):
+    return {"meta": {"git": git}, "results": results}
+
+
+def test_floor_only_skips_small_cost_metrics():
+    baseline = run({"x": {"p50_ms": 0.01, "rps": 0.01}})
+    current = run({"x": {"p50_ms": 0.05, "rps": 0.001}})
+    rows, regressions, missing = compare.compare(baseline, current)
+    assert [row[1] for row in rows] == ["rps"]
+    assert [row[1] for row in regressions] == ["rps"]
+    assert missing == []
+
+
+def test_ratios_compare_in_absolute_terms():
+    baseline = run({"load": {"shed_ratio": 0.0}, "steady": {"shed_ratio": 0.2}})
+    current = run({"load": {"shed_ratio": 0.3}, "steady": {"shed_ratio": 0.22}})
+    rows, regressions, _ = compare.compare(baseline, current)
+    assert {row[0]: row[4] for row in rows} == {"load": 0.3, "steady": 0.22 - 0.2}
+    assert [row[0] for row in regressions] == ["load"]
+
+
+def test_missing_metrics_are_reported():
+    baseline = run({"kept": {"p50_ms": 10.0, "peak_mb": 50.0}, "gone": {"p50_ms": 10.0}})
+    current = run({"kept": {"p50_ms": 10.0}})
+    _, regressions, missing = compare.compare(baseline, current)
+    assert regressions == []
+    assert missing == [("gone", "p50_ms"), ("kept", "peak_mb")]
+    assert compare.report(baseline, current)
+    assert not compare.report(baseline, current, fail_on_missing=True)
@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+
+from utils.feature_extractor import FeatureExtractor
+
+
+def spotted_scene(width, height, seed=0):
+    """Coloured discs on a smooth dark background, drawn relative to the frame size"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 20, dtype=np.uint8)
+    for _ in range(60):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(width // 200 + 2, width // 30))
+        cv2.circle(image, center, radius, tuple(int(c) for c in rng.integers(60, 255, size=3)), -1)
+    return cv2.GaussianBlur(image, (3, 3), 0)
+
+
+def legacy_defects(image, min_points=50):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [len(c) for c in contours if len(c) > min_points]
+
+
+def test_small_images_match_the_legacy_rule():
+    image = spotted_scene(640, 480)
+    defects = FeatureExtractor().extract(image)["defects"]
+    expected = legacy_defects(image)
+    assert defects["count"] == len(expected)
+    assert defects["details"] == expected[:5]
+
+
+def test_downsampled_counts_track_full_resolution():
+    full, downsampled = 0, 0
+    for seed in range(4):
+        image = spotted_scene(3264, 2448, seed)
+        full += len(legacy_defects(image))
+        downsampled += FeatureExtractor(max_side=640).extract(image)["defects"]["count"]
+    # Grading rules v2 scales the defect penalty by about this ratio
+    assert 0.8 < downsampled / full <= 1.0
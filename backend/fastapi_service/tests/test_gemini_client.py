@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.gemini_client import AsyncGeminiClient
+
+
+class SleepingModel:
+    """Blocking generate_content that sleeps, tracking how many calls overlap"""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self.finished_at = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, parts):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+            self.finished_at.append(time.monotonic())
+        return f"parsed {parts}"
+
+
+def client(model, **options):
+    options.setdefault("rate_per_minute", 60000)
+    options.setdefault("burst", 100)
+    return AsyncGeminiClient(model, **options)
+
+
+def test_same_key_shares_one_call():
+    model = SleepingModel()
+    gemini = client(model)
+
+    async def scenario():
+        return await asyncio.gather(*(gemini.generate(["report"], key="sha") for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["parsed ['report']"] * 5
+    assert model.calls == 1
+    assert gemini.stats()["coalesced"] == 4
+
+
+def test_concurrency_is_bounded():
+    model = SleepingModel()
+    gemini = client(model, max_concurrency=2)
+
+    async def scenario():
+        await asyncio.gather(*(gemini.generate([i]) for i in range(6)))
+
+    asyncio.run(scenario())
+    assert model.calls == 6
+    assert model.max_running == 2
+
+
+def test_timed_out_thread_keeps_its_slot():
+    model = SleepingModel(seconds=0.3)
+    gemini = client(model, max_concurrency=1, timeout=0.05, retries=0)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await gemini.generate(["slow"])
+        started = time.monotonic()
+        model.seconds = 0
+        await gemini.generate(["next"])
+        return started
+
+    started = asyncio.run(scenario())
+    assert model.max_running == 1
+    # The second call waited for the abandoned thread instead of running next to it
+    assert model.finished_at[1] >= model.finished_at[0] > started
+
+
+def test_token_bucket_spaces_calls():
+    model = SleepingModel(seconds=0)
+    gemini = client(model, rate_per_minute=600, burst=1)
+
+    async def scenario():
+        start = time.monotonic()
+        await asyncio.gather(*(gemini.generate([i]) for i in range(4)))
+        return time.monotonic() - start
+
+    # One call from the burst, then one every 0.1 s
+    assert asyncio.run(scenario()) >= 0.28
+    assert gemini.stats()["rate_limited_seconds"] >= 0.28
@@ -0,0 +1,100 @@
+import itertools
+
+import pytest
+
+from utils.freshness_calculator import calculate_freshness
+from utils.gemini_analyzer import LabReportAnalyzer
+from utils.grading_rules import load_rules
+from utils.quality_grader import grade_produce
+
+
+# The if/else rules that grading_rules/v1.json replaced
+def legacy_freshness(processed_data):
+    saturation = processed_data.get('saturation', 50)
+    defects_count = processed_data.get('defects', {}).get('count', 0)
+    return float(max(0, min(100, saturation * 0.8) - defects_count * 2))
+
+
+def legacy_grade_produce(confidence, freshness_score):
+    if freshness_score > 85 and confidence > 0.9:
+        return {"grade": "A", "label": "Premium"}
+    elif freshness_score > 60:
+        return {"grade": "B", "label": "Standard"}
+    return {"grade": "C", "label": "Sub-standard"}
+
+
+def legacy_grade_soil(parameters):
+    checks = [("pH", "pH", ["acidic", "alkaline"]), ("nitrogen", "Nitrogen", ["low", "high"]),
+              ("phosphorus", "Phosphorus", ["low", "high"]), ("potassium", "Potassium", ["low", "high"]),
+              ("organic_carbon", "Organic Carbon", ["low", "high"])]
+    issues = []
+    for key, label, out_of_range in checks:
+        status = (parameters.get(f"{key}_status") or "").lower()
+        if status in out_of_range:
+            issues.append(f"{label} is {status}")
+    grade, description = [
+        ("A", "Top Quality - All parameters within normal range"),
+        ("B", "Medium/Fresh - One parameter needs attention"),
+        ("C", "Needs Improvement - Multiple parameters out of range"),
+    ][min(len(issues), 2)]
+    return {"grade": grade, "grade_description": description, "out_of_range_count": len(issues), "issues": issues}
+
+
+@pytest.fixture(autouse=True)
+def v1(monkeypatch):
+    monkeypatch.setenv("GRADING_RULES_VERSION", "v1")
+    load_rules.cache_clear()
+    yield
+    load_rules.cache_clear()
+
+
+def test_v1_freshness_matches_legacy():
+    for saturation, defects in itertools.product([None, 0, 30, 62.5, 106.25, 125, 200], [0, 1, 5, 17, 60]):
+        data = {"defects": {"count": defects}}
+        if saturation is not None:
+            data["saturation"] = saturation
+        assert calculate_freshness(data, {}) == legacy_freshness(data)
+
+
+def test_v1_produce_grades_match_legacy():
+    confidences = [0.0, 0.5, 0.9, 0.9001, 1.0]
+    scores = [0.0, 60.0, 60.01, 85.0, 85.01, 100.0]
+    for confidence, score in itertools.product(confidences, scores):
+        assert grade_produce({"confidence": confidence}, score) == legacy_grade_produce(confidence, score)
+
+    # The column-oriented call used by bulk re-grading agrees row by row
+    pairs = list(itertools.product(confidences, scores))
+    grades, labels = load_rules().grade_produce([c for c, _ in pairs], [s for _, s in pairs])
+    assert [legacy_grade_produce(c, s) for c, s in pairs] == [
+        {"grade": g, "label": l} for g, l in zip(grades.tolist(), labels.tolist())
+    ]
+
+
+def test_v1_soil_grades_match_legacy():
+    analyzer = LabReportAnalyzer()
+    statuses = {
+        "pH_status": [None, "Normal", "Acidic", "ALKALINE"],
+        "nitrogen_status": [None, "Adequate", "Low"],
+        "phosphorus_status": ["Normal", "High"],
+        "potassium_status": ["Normal", "low"],
+        "organic_carbon_status": [None, "Normal", "High"],
+    }
+    for combination in itertools.product(*statuses.values()):
+        parameters = {key: status for key, status in zip(statuses, combination) if status is not None}
+        parameters["pH"] = 6.5
+        result = analyzer.calculate_grade(parameters)
+        assert {key: result[key] for key in ("grade", "grade_description", "out_of_range_count", "issues")} \
+            == legacy_grade_soil(parameters)
+        assert result["rules_version"] == "v1"
+
+
+def test_soil_grade_of_an_empty_extraction():
+    result = LabReportAnalyzer().calculate_grade({})
+    assert (result["grade"], result["out_of_range_count"], result["issues"]) == ("A", 0, [])
+
+
+def test_soil_columns_may_be_missing():
+    grades, _, counts, _ = load_rules().grade_soil({"pH_status": ["Acidic", None], "nitrogen": None})
+    assert grades.tolist() == ["B", "A"]
+    assert counts.tolist() == [1, 0]
+    assert load_rules().grade_soil({})[2].tolist() == []
@@ -0,0 +1,44 @@
+import pytest
+
+from utils.inference_backends import BACKENDS, load_backend, resolve_backend
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    def create(name, content=b"weights"):
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+    return create
+
+
+@pytest.mark.parametrize("name, backend", [
+    ("model.h5", "tensorflow"), ("model.keras", "tensorflow"), ("model.onnx", "onnx"), ("model.tflite", "tflite"),
+])
+def test_auto_picks_the_backend_from_the_extension(model_file, name, backend):
+    path = model_file(name)
+    assert resolve_backend("auto", path) == (backend, path)
+
+
+def test_auto_treats_a_directory_as_a_saved_model(tmp_path):
+    assert resolve_backend("auto", str(tmp_path)) == ("tensorflow", str(tmp_path))
+
+
+@pytest.mark.parametrize("path", ["", "/no/such/model.onnx", "empty"])
+def test_auto_falls_back_to_simulated_without_a_model(model_file, path):
+    if path == "empty":
+        path = model_file("model.onnx", b"")
+    assert resolve_backend("auto", path) == ("simulated", None)
+    assert isinstance(load_backend("auto", path), BACKENDS["simulated"])
+
+
+def test_explicit_backend_is_checked(model_file):
+    path = model_file("model.onnx")
+    assert resolve_backend("onnx", path) == ("onnx", path)
+    assert resolve_backend("simulated", "") == ("simulated", "")
+    with pytest.raises(ValueError, match="needs MODEL_PATH"):
+        resolve_backend("onnx", "")
+    with pytest.raises(ValueError, match="Unknown INFERENCE_BACKEND"):
+        resolve_backend("pytorch", path)
+    with pytest.raises(ValueError, match="Cannot infer"):
+        resolve_backend("auto", model_file("model.pt"))
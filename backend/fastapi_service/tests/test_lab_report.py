@@ -0,0 +1,38 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from utils.gemini_analyzer import LabReportAnalyzer
+
+SAMPLE_REPORTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "lab_report")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    return TestClient(app)
+
+
+def test_text_layer_pdf_needs_no_gemini_key(client):
+    with open(os.path.join(SAMPLE_REPORTS, "Report_1.pdf"), "rb") as f:
+        response = client.post("/api/lab-report/analyze", files={"file": ("Report_1.pdf", f, "application/pdf")})
+    assert response.status_code == 200
+    assert response.json()["grade"] == "A"
+
+
+def test_gemini_fallback_without_key_is_503(client):
+    # Random pixels: never in the result cache, and only Gemini can read an image
+    image = np.random.default_rng().integers(0, 255, size=(32, 32, 3), dtype=np.uint8)
+    _, png = cv2.imencode(".png", image)
+    response = client.post("/api/lab-report/analyze", files={"file": ("scan.png", png.tobytes(), "image/png")})
+    assert response.status_code == 503
+    assert "GEMINI_API_KEY" in response.json()["detail"]
+
+
+def test_analyzer_builds_without_key(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    assert LabReportAnalyzer().calculate_grade({"pH": 7.0, "pH_status": "Normal"})["grade"] == "A"
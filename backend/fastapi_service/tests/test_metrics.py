@@ -0,0 +1,17 @@
+from prometheus_client import REGISTRY
+
+from utils import metrics
+
+
+def test_scrape_time_gauges_read_at_scrape():
+    gauge = metrics.scrape_time_gauge("krishi_test_scrape_gauge", "Test gauge", lambda: 7)
+    try:
+        assert REGISTRY.get_sample_value("krishi_test_scrape_gauge") == 7
+    finally:
+        REGISTRY.unregister(gauge)
+
+
+def test_scrape_time_gauges_skipped_in_multiprocess_mode(monkeypatch):
+    monkeypatch.setattr(metrics, "MULTIPROCESS", True)
+    assert metrics.scrape_time_gauge("krishi_test_multiprocess_gauge", "Test gauge", lambda: 7) is None
+    assert REGISTRY.get_sample_value("krishi_test_multiprocess_gauge") is None
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.admin
+from main import app
+from utils import profiling
+from utils.profiling import ProfilingMiddleware, captures
+
+
+@pytest.fixture(autouse=True)
+def empty_captures():
+    captures.clear()
+    yield
+    captures.clear()
+
+
+@pytest.fixture
+def client():
+    # No `with`: the lifespan (model loading) is not needed for these routes
+    return TestClient(app)
+
+
+def test_off_by_default(client):
+    assert not profiling.PROFILING_ENABLED
+    assert ProfilingMiddleware not in [middleware.cls for middleware in app.user_middleware]
+    assert client.get("/", headers={"X-Profile": "1"}).status_code == 200
+    assert len(captures) == 0
+
+
+def test_header_request_is_captured_when_installed():
+    service = FastAPI()
+    service.add_middleware(ProfilingMiddleware)
+
+    @service.get("/ping")
+    async def ping():
+        return {}
+
+    client = TestClient(service)
+    client.get("/ping")
+    assert len(captures) == 0
+    client.get("/ping", headers={"X-Profile": "1"})
+    assert [(c["path"], c["reason"], c["status"]) for c in captures] == [("/ping", "header", 200)]
+
+
+def test_profiles_require_admin_token(client, monkeypatch):
+    # No PROFILING_ADMIN_TOKEN configured: nobody gets in
+    monkeypatch.setattr(routers.admin, "ADMIN_TOKEN", "")
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(routers.admin, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles/abc", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"enabled": False, "captures": []}
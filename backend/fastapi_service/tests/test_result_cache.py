@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from utils import result_cache
+from utils.result_cache import ResultCache
+
+
+def test_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ResultCache("test", "v1", disk_path=str(tmp_path / "cache.sqlite3"))
+    threads = []
+    for name in ("key", "get", "set"):
+        method = getattr(cache, name)
+        def record(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+        monkeypatch.setattr(cache, name, record)
+
+    async def roundtrip():
+        key = await cache.key_async(b"photo", True)
+        assert await cache.get_async(key) is None
+        await cache.set_async(key, {"grade": "A"})
+        return key, threading.get_ident()
+
+    key, loop_thread = asyncio.run(roundtrip())
+    assert len(threads) == 3 and loop_thread not in threads
+    # A fresh process (empty memory tier) is answered from SQLite
+    reopened = ResultCache("test", "v1", disk_path=str(tmp_path / "cache.sqlite3"))
+    assert asyncio.run(reopened.get_async(key)) == {"grade": "A"}
+    assert reopened.disk_hits == 1
+
+
+def test_memory_only_roundtrip():
+    cache = ResultCache("test", "v1")
+
+    async def roundtrip():
+        key = await cache.key_async(b"photo")
+        await cache.set_async(key, [1])
+        return await cache.get_async(key)
+
+    assert asyncio.run(roundtrip()) == [1]
+
+
+def test_new_version_replaces_the_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, "_caches", {})
+    old = result_cache.get_cache("analyze", "model-1")
+    old.set("analyze:abc", {"grade": "A"})
+    assert result_cache.get_cache("analyze", "model-1") is old
+    new = result_cache.get_cache("analyze", "model-2")
+    assert new is not old and new.version == "model-2"
+    assert new.get("analyze:abc") is None
+
+
+def test_disk_tier_is_pruned_on_write(tmp_path):
+    cache = ResultCache("test", "v1", max_entries=0, disk_path=str(tmp_path / "cache.sqlite3"),
+                        disk_max_entries=10, prune_every=5)
+    other = ResultCache("other", "v1", disk_path=str(tmp_path / "cache.sqlite3"))
+    other.set("other:keep", 1)
+    for i in range(23):
+        cache.set(f"test:{i}", i)
+
+    def rows(namespace):
+        return cache._db.execute("SELECT COUNT(*) FROM result_cache WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    # Pruned at the 20th write back to 10, then 3 more
+    assert rows("test") == 13
+    assert rows("other") == 1
+    # The newest entries survive
+    assert cache.get("test:22") == 22 and cache.get("test:0") is None
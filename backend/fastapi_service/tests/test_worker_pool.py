@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import routers.analyze
+from main import app
+from utils.worker_pool import PoolSaturated, WorkerPool
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    pool = WorkerPool(size=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert (pool.in_flight, pool.queue_depth) == (2, 1)
+        with pytest.raises(PoolSaturated):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        assert pool.in_flight == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+
+def test_saturated_pool_answers_503_with_retry_after(monkeypatch):
+    class SaturatedPool:
+        async def run(self, fn, *args):
+            raise PoolSaturated("Worker pool saturated (48 jobs in flight)")
+
+    monkeypatch.setattr(routers.analyze, "get_worker_pool", lambda: SaturatedPool())
+    with TestClient(app) as client:
+        response = client.post("/api/analyze", files={"file": ("photo.jpg", b"not cached", "image/jpeg")})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
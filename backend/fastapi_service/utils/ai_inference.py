@@ -1,21 +1,51 @@
-import tensorflow as tf
+import os
 import numpy as np
-from PIL import Image
-
-def get_inference(image_path):
-    # In a real scenario, you'd load a MobileNetV2 model here
-    # For hackathon demo, we'll simulate the output
-    
-    # model = tf.keras.applications.MobileNetV2(weights='imagenet', include_top=True)
-    # img = Image.open(image_path).resize((224, 224))
-    # x = np.array(img) / 255.0
-    # x = np.expand_dims(x, axis=0)
-    # preds = model.predict(x)
-    
-    # Simulating inference results
-    # Grade A: 0.8, Grade B: 0.15, Grade C: 0.05
+import cv2
+from utils.model_registry import registry
+from utils.inference_backends import load_backend
+
+CLASSES = ["A", "B", "C"]
+INPUT_SIZE = (224, 224)
+MODEL_NAME = "produce_classifier"
+# Bump when the weights change so cached results are not reused; by default
+# each model file (e.g. the fp32 vs. int8 export) gets its own cache entries
+MODEL_VERSION = os.getenv("MODEL_VERSION") or (
+    os.path.basename(os.getenv("MODEL_PATH", "")) or "simulated-1"
+)
+
+def load_model():
+    """Called once by the model registry, never per request."""
+    # INFERENCE_BACKEND / MODEL_PATH pick TensorFlow, ONNX Runtime, TFLite or
+    # the simulated model; only that runtime is imported
+    return load_backend()
+
+def warmup_model(model):
+    # First predict triggers graph tracing / kernel selection; pay it at startup
+    model.predict(np.zeros((1, *INPUT_SIZE, 3), dtype=np.float32))
+
+registry.register(MODEL_NAME, load_model, warmup_model)
+
+def preprocess(image):
+    """Turn the shared BGR array into one MobileNetV2-sized model input."""
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    resized = cv2.resize(rgb, INPUT_SIZE, interpolation=cv2.INTER_AREA)
+    return resized.astype(np.float32) / 255.0
+
+def to_result(scores):
+    scores = np.asarray(scores, dtype=np.float32)
+    best = int(np.argmax(scores))
     return {
-        "class": "A",
-        "confidence": 0.92,
-        "raw_scores": [0.92, 0.05, 0.03]
+        "class": CLASSES[best],
+        "confidence": round(float(scores[best]), 4),
+        "raw_scores": [round(float(s), 4) for s in scores]
     }
+
+def predict_batch(batch):
+    """Run the model once over a (N, 224, 224, 3) batch; returns N result dicts."""
+    model = registry.get(MODEL_NAME)
+    preds = model.predict(batch)
+    return [to_result(p) for p in preds]
+
+def get_inference(image):
+    # `image` is the decoded BGR array shared with process_image
+    return predict_batch(np.expand_dims(preprocess(image), axis=0))[0]
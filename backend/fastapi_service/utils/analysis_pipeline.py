@@ -0,0 +1,48 @@
+import time
+from utils.image_processor import decode_image, process_image
+from utils.ai_inference import get_inference, preprocess
+from utils.freshness_calculator import calculate_freshness
+from utils.quality_grader import grade_produce
+from utils.grading_rules import load_rules
+
+def prepare_bytes(image_bytes):
+    """
+    CPU-bound half of the pipeline: decode, OpenCV features and model input.
+    Module-level so it can be shipped to a thread or process worker; stage
+    timings are returned rather than recorded so they survive a process pool.
+    """
+    clock = time.perf_counter
+    t0 = clock()
+    # Decode once (OpenCV); all stages below share this array
+    image = decode_image(image_bytes)
+    t1 = clock()
+    
+    # Preprocessing (OpenCV)
+    processed_data = process_image(image)
+    t2 = clock()
+    
+    model_input = preprocess(image)
+    timings = {"decode": t1 - t0, "features": t2 - t1, "preprocess": clock() - t2}
+    return processed_data, model_input, timings
+
+def finalize(processed_data, inference_results):
+    # Freshness calculation
+    freshness = calculate_freshness(processed_data, inference_results)
+    
+    # Grading
+    grade_info = grade_produce(inference_results, freshness)
+    
+    return {
+        "grade": grade_info['grade'],
+        "confidence_score": inference_results['confidence'],
+        "freshness_score": freshness,
+        "color_saturation": processed_data['saturation'],
+        "surface_defects": processed_data['defects'],
+        "rules_version": load_rules().version
+    }
+
+def analyze_bytes(image_bytes):
+    """Full pipeline for one upload, with unbatched inference."""
+    image = decode_image(image_bytes)
+    processed_data = process_image(image)
+    return finalize(processed_data, get_inference(image))
@@ -0,0 +1,133 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Dynamic batcher for model inference.
+
+    Concurrent callers `await submit(x)` with one model input each. The
+    batcher waits up to `max_wait_ms` (or until `max_batch_size` inputs have
+    arrived), stacks them, runs a single `predict_fn(batch)` and hands row i
+    of the output back to the i-th caller.
+
+    `predict_fn` takes an array of shape (N, ...) and returns a sequence of
+    N per-item results. It runs on `executor` so the event loop stays free.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+        self._owns_executor = executor is None
+        self._queue = None
+        self._task = None
+        # Items taken off the queue but not yet answered
+        self._collecting = []
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+
+    async def submit(self, item):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._dispatch(loop, batch)
+            self._collecting = []
+
+    def _fail(self, batch, error):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _dispatch(self, loop, batch):
+        try:
+            # Inside the try: one input of the wrong shape must fail its batch, not the loop
+            inputs = np.stack([item for item, _ in batch])
+            results = await loop.run_in_executor(self._executor, self.predict_fn, inputs)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        self.last_batch_size = len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        fill_ratio = self.items / (self.batches * self.max_batch_size) if self.batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "fill_ratio": fill_ratio,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def stop(self):
+        """Stop the batching loop; callers still waiting get a RuntimeError"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            pending = self._collecting
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._fail(pending, RuntimeError("Inference batcher stopped"))
+            self._collecting = []
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+
+_batcher = None
+
+
+def get_batcher():
+    """Process-wide inference batcher tuned by INFERENCE_BATCH_SIZE/WAIT_MS."""
+    global _batcher
+    if _batcher is None:
+        from utils.ai_inference import predict_batch
+        _batcher = MicroBatcher(
+            predict_batch,
+            max_batch_size=int(os.getenv("INFERENCE_BATCH_SIZE", "16")),
+            max_wait_ms=float(os.getenv("INFERENCE_BATCH_WAIT_MS", "5")),
+        )
+    return _batcher
+
+
+async def stop_batcher():
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
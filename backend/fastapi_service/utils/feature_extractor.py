@@ -0,0 +1,124 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+class FeatureExtractor:
+    """
+    Single-pass produce feature extraction.
+
+    The image is downsampled once to `max_side` pixels on its longest edge
+    and converted to HSV once. Saturation statistics and the optional extras
+    (hue histogram, bruise-area ratio) are computed from that one HSV array
+    with vectorized reductions.
+
+    Defects are the external contours of the grayscale Canny edges of the
+    same downsampled frame. `min_defect_points` is given at full resolution
+    and scaled with the frame, since an outline's point count shrinks with
+    it; the contour lengths are filtered as one NumPy array. Counts come out
+    a few percent below the old full-resolution pass, which grading rules
+    v2 compensates for in its defect penalty.
+    """
+
+    def __init__(self, max_side=640, min_defect_points=50, hue_bins=18, extra_features=False):
+        self.max_side = max_side
+        self.min_defect_points = min_defect_points
+        self.hue_bins = hue_bins
+        self.extra_features = extra_features
+
+    def _downsample(self, image):
+        height, width = image.shape[:2]
+        scale = min(1.0, self.max_side / float(max(height, width)))
+        if scale < 1.0:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            # Nearest-neighbour keeps the per-pixel saturation distribution
+            # (area averaging washes out texture) and is the cheapest resize
+            image = cv2.resize(image, size, interpolation=cv2.INTER_NEAREST)
+        return image, scale
+
+    def extract(self, image, timings=None):
+        """
+        Returns {"saturation", "defects", ...}; `timings`, if given, is filled
+        with per-stage seconds.
+        """
+        if image is None:
+            raise ValueError("Image not found or invalid")
+        clock = time.perf_counter
+        t0 = clock()
+
+        small, scale = self._downsample(image)
+        t1 = clock()
+
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hue, sat, val = cv2.split(hsv)
+        t2 = clock()
+
+        sat_mean, sat_std = cv2.meanStdDev(sat)
+        t3 = clock()
+
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        lengths = np.fromiter(map(len, contours), dtype=np.intp, count=len(contours))
+        defects = lengths[lengths > self.min_defect_points * scale]
+        t4 = clock()
+
+        features = {
+            "saturation": float(sat_mean[0, 0]),
+            "saturation_std": float(sat_std[0, 0]),
+            "defects": {
+                "count": int(defects.size),
+                "details": defects[:5].tolist(),
+                "edge_density": float(np.count_nonzero(edges)) / edges.size,
+            },
+            "analysis_shape": [int(small.shape[0]), int(small.shape[1])],
+        }
+
+        if self.extra_features:
+            features.update(self._extras(hue, sat, val))
+        t5 = clock()
+
+        if timings is not None:
+            timings.update({
+                "downsample": t1 - t0,
+                "hsv": t2 - t1,
+                "saturation": t3 - t2,
+                "defects": t4 - t3,
+                "extras": t5 - t4,
+                "total": t5 - t0,
+            })
+        return features
+
+    def _extras(self, hue, sat, val):
+        # Produce pixels: coloured enough to not be background
+        produce = sat > 40
+        produce_pixels = int(np.count_nonzero(produce))
+
+        # OpenCV hue is 0-179; histogram over produce pixels only, normalized
+        bins = np.minimum((hue[produce].astype(np.int32) * self.hue_bins) // 180, self.hue_bins - 1)
+        histogram = np.bincount(bins, minlength=self.hue_bins).astype(np.float64)
+        if produce_pixels:
+            histogram /= produce_pixels
+
+        # Bruises: dark patches inside the produce region
+        bruised = np.count_nonzero(produce & (val < 80))
+        return {
+            "hue_histogram": [round(float(h), 4) for h in histogram],
+            "bruise_area_ratio": bruised / produce_pixels if produce_pixels else 0.0,
+        }
+
+
+_extractor = None
+
+
+def get_extractor():
+    """Shared extractor configured by ANALYSIS_MAX_SIDE and EXTRA_FEATURES."""
+    global _extractor
+    if _extractor is None:
+        _extractor = FeatureExtractor(
+            max_side=int(os.getenv("ANALYSIS_MAX_SIDE", "640")),
+            extra_features=os.getenv("EXTRA_FEATURES", "False") == "True",
+        )
+    return _extractor
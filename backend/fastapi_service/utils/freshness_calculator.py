@@ -1,11 +1,9 @@
+import numpy as np
+from utils.grading_rules import load_rules
+
 def calculate_freshness(processed_data, inference_results):
-    # Logic: Higher saturation and fewer defects mean higher freshness
-    saturation = processed_data.get('saturation', 50)
+    # Higher saturation and fewer defects mean higher freshness; weights come from the rules table
+    saturation = processed_data.get('saturation')
     defects_count = processed_data.get('defects', {}).get('count', 0)
-    
-    # Scale from 0 to 100
-    base_freshness = min(100, saturation * 0.8)
-    penalty = defects_count * 2
-    
-    final_score = max(0, base_freshness - penalty)
-    return float(final_score)
+    freshness = load_rules().freshness([np.nan if saturation is None else saturation], [defects_count])
+    return float(freshness[0])
@@ -1,38 +1,22 @@
 import os
 import json
+import hashlib
 from typing import Dict, Any, Optional
-import google.generativeai as genai
-from PIL import Image
 import io
-import fitz  # PyMuPDF for PDF handling
+import asyncio
+from utils.model_registry import registry
+from utils.pdf_ingest import ingest_pdf, INGEST_VERSION
+from utils.report_parser import parse_report_text, PARSER_VERSION, LOCAL_PARSER_ENABLED
+from utils.gemini_client import AsyncGeminiClient, client_for
+from utils.metrics import stage_timer
+from utils.grading_rules import load_rules
 
-class LabReportAnalyzer:
-    """Analyzes soil lab reports using Gemini API and applies grading logic"""
-    
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    def extract_parameters(self, image_bytes: bytes, is_pdf: bool = False) -> Dict[str, Any]:
-        """Extract soil parameters from lab report image or PDF using Gemini Vision"""
-        
-        # Convert PDF to image if needed
-        if is_pdf:
-            # Open PDF and convert first page to image
-            pdf_document = fitz.open(stream=image_bytes, filetype="pdf")
-            first_page = pdf_document[0]
-            pix = first_page.get_pixmap(dpi=300)
-            img_bytes = pix.tobytes("png")
-            image = Image.open(io.BytesIO(img_bytes))
-            pdf_document.close()
-        else:
-            image = Image.open(io.BytesIO(image_bytes))
-        
-        prompt = """
+# google.generativeai, PIL and PyMuPDF are imported where they are used so
+# importing this module (and the lab-report router) stays cheap
+
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+EXTRACTION_PROMPT = """
         Analyze this soil testing lab report and extract the following parameters in JSON format:
         
         {
@@ -54,10 +38,84 @@ class LabReportAnalyzer:
         Extract only the values shown in the report. If a parameter is not present, use null.
         Return ONLY valid JSON, no additional text.
         """
+
+# Changes whenever the model, prompt, PDF ingestion or local parser does; used to key cached extractions
+PROMPT_VERSION = hashlib.sha256(
+    (GEMINI_MODEL_NAME + EXTRACTION_PROMPT + INGEST_VERSION + PARSER_VERSION).encode()
+).hexdigest()[:12]
+
+class GeminiUnavailable(RuntimeError):
+    """A report needs the Gemini fallback, but GEMINI_API_KEY is not set"""
+
+class LabReportAnalyzer:
+    """Analyzes soil lab reports using Gemini API and applies grading logic"""
+    
+    def __init__(self, model=None):
+        # Injected model (benchmarks, offline runs): anything with generate_content()
+        self._model = model
+        self._client = None
+    
+    @property
+    def model(self):
+        # Configured on the first report the local parser cannot read, so
+        # text-layer PDFs are analyzed without GEMINI_API_KEY
+        if self._model is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise GeminiUnavailable("GEMINI_API_KEY not found in environment variables")
+            
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        return self._model
+    
+    def _prepare(self, image_bytes: bytes, is_pdf: bool):
+        """
+        (parameters, None) when a text-layer PDF in a known layout parses locally,
+        otherwise (None, prompt parts) for Gemini Vision.
+        """
+        from PIL import Image
         
-        response = self.model.generate_content([prompt, image])
-        
-        # Parse JSON from response
+        if is_pdf:
+            with stage_timer("pdf_ingest"):
+                content = ingest_pdf(image_bytes)
+                parsed = parse_report_text(content.text) if content.text and LOCAL_PARSER_ENABLED else None
+            if parsed is not None and parsed.confident:
+                return parsed.parameters, None
+            return None, self.pdf_parts(content)
+        return None, [Image.open(io.BytesIO(image_bytes))]
+    
+    def extract_parameters(self, image_bytes: bytes, is_pdf: bool = False) -> Dict[str, Any]:
+        """Extract soil parameters from lab report image or PDF (locally if possible, else Gemini Vision)"""
+        parameters, parts = self._prepare(image_bytes, is_pdf)
+        if parameters is not None:
+            return parameters
+        response = self.model.generate_content([EXTRACTION_PROMPT, *parts])
+        return self.parse_response(response)
+    
+    async def extract_parameters_async(self, image_bytes: bytes, is_pdf: bool = False,
+                                       key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        extract_parameters for the event loop: PDF work runs in a thread and the
+        remote call goes through the rate-limited client, shared by callers with
+        the same `key`.
+        """
+        parameters, parts = await asyncio.to_thread(self._prepare, image_bytes, is_pdf)
+        if parameters is not None:
+            return parameters
+        response = await self.client.generate([EXTRACTION_PROMPT, *parts], key=key)
+        return self.parse_response(response)
+    
+    @property
+    def client(self) -> AsyncGeminiClient:
+        # Created on first use, inside the running event loop
+        if self._client is None:
+            self._client = client_for(self.model)
+        return self._client
+    
+    @staticmethod
+    def parse_response(response) -> Dict[str, Any]:
+        """Parse JSON from the model response"""
         try:
             # Clean response text
             text = response.text.strip()
@@ -75,65 +133,34 @@ class LabReportAnalyzer:
         except json.JSONDecodeError as e:
             raise ValueError(f"Failed to parse Gemini response as JSON: {e}\nResponse: {response.text}")
     
+    @staticmethod
+    def pdf_parts(content) -> list:
+        """Prompt parts for an ingested PDF: its text layer if it has one, else page images"""
+        if content.text:
+            return ["Report text (from the PDF text layer):\n" + content.text]
+        return [page.to_pil() for page in content.pages]
+    
     def calculate_grade(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Apply grading logic based on soil parameters:
-        - Grade A: All parameters Normal/Adequate/Good
-        - Grade B: 1 parameter slightly Low or High, rest Normal/Adequate
-        - Grade C: 2+ parameters out of range OR pH problematic + nutrient imbalance
+        Apply the active soil grading rules (grading_rules/<version>.json) to one report.
+        Under v1: A when every parameter is Normal/Adequate, B with one Low/High
+        (or Acidic/Alkaline pH), C with two or more.
         """
-        
-        # Count parameters out of normal range
-        out_of_range_count = 0
-        issues = []
-        
-        # Check pH
-        ph_status = parameters.get("pH_status", "").lower()
-        if ph_status in ["acidic", "alkaline"]:
-            out_of_range_count += 1
-            issues.append(f"pH is {ph_status}")
-        
-        # Check Nitrogen
-        n_status = parameters.get("nitrogen_status", "").lower()
-        if n_status in ["low", "high"]:
-            out_of_range_count += 1
-            issues.append(f"Nitrogen is {n_status}")
-        
-        # Check Phosphorus
-        p_status = parameters.get("phosphorus_status", "").lower()
-        if p_status in ["low", "high"]:
-            out_of_range_count += 1
-            issues.append(f"Phosphorus is {p_status}")
-        
-        # Check Potassium
-        k_status = parameters.get("potassium_status", "").lower()
-        if k_status in ["low", "high"]:
-            out_of_range_count += 1
-            issues.append(f"Potassium is {k_status}")
-        
-        # Check Organic Carbon if present
-        oc_status = parameters.get("organic_carbon_status")
-        if oc_status and oc_status.lower() in ["low", "high"]:
-            out_of_range_count += 1
-            issues.append(f"Organic Carbon is {oc_status.lower()}")
-        
-        # Determine grade
-        if out_of_range_count == 0:
-            grade = "A"
-            grade_description = "Top Quality - All parameters within normal range"
-        elif out_of_range_count == 1:
-            grade = "B"
-            grade_description = "Medium/Fresh - One parameter needs attention"
-        else:
-            grade = "C"
-            grade_description = "Needs Improvement - Multiple parameters out of range"
+        rules = load_rules()
+        # One-row column per parameter the rules read, whatever the extraction returned
+        columns = {}
+        for parameter in rules.soil_parameters:
+            for key in (parameter["key"], f"{parameter['key']}_status"):
+                columns[key] = [parameters.get(key)]
+        grades, descriptions, counts, issues = rules.grade_soil(columns)
         
         return {
-            "grade": grade,
-            "grade_description": grade_description,
-            "out_of_range_count": out_of_range_count,
-            "issues": issues,
-            "parameters": parameters
+            "grade": str(grades[0]),
+            "grade_description": str(descriptions[0]),
+            "out_of_range_count": int(counts[0]),
+            "issues": issues[0],
+            "parameters": parameters,
+            "rules_version": rules.version
         }
     
     def analyze_report(self, image_bytes: bytes, is_pdf: bool = False) -> Dict[str, Any]:
@@ -146,3 +173,6 @@ class LabReportAnalyzer:
         result = self.calculate_grade(parameters)
         
         return result
+
+# Remote model, so no warm-up call; Gemini itself is only configured when first needed
+registry.register("lab_report_analyzer", LabReportAnalyzer, required=False)
@@ -0,0 +1,162 @@
+import os
+import time
+import random
+import asyncio
+from utils.metrics import GEMINI_ACTIVE, stage_timer
+
+# google.api_core exception names worth retrying (imported by name so this
+# module does not need google-generativeai to be installed)
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "DeadlineExceeded", "InternalServerError", "GatewayTimeout",
+}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, up to `burst` saved up."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    async def acquire(self):
+        # The lock makes waiters queue up in order instead of all waking at once
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+
+class AsyncGeminiClient:
+    """
+    Async front for a Gemini model (anything with generate_content()).
+
+    Calls are limited to `max_concurrency` at a time and `rate_per_minute`
+    overall so we stay inside the API quota, time out after `timeout`
+    seconds and are retried with exponential backoff on quota/availability
+    errors. Callers that pass the same `key` while a call is in flight share
+    its result instead of making a second remote call (single flight).
+
+    The model's own generate_content_async is used when it has one; a
+    blocking generate_content runs in a thread so the event loop stays free.
+    A thread cannot be cancelled, so when one times out its concurrency slot
+    stays taken until the thread returns: at most `max_concurrency` calls
+    ever run upstream.
+    """
+
+    def __init__(self, model, max_concurrency=4, rate_per_minute=60, burst=1,
+                 timeout=30.0, retries=2, backoff=1.0):
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self._inflight = {}
+        self.max_concurrency = max_concurrency
+        self.rate_per_minute = rate_per_minute
+        self.calls = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failures = 0
+        self.active = 0
+
+    async def generate(self, parts, key=None):
+        if key is None:
+            return await self._call_with_retry(parts)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._call_with_retry(parts))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _call_with_retry(self, parts):
+        attempt = 0
+        while True:
+            try:
+                return await self._call(parts)
+            except Exception as e:
+                retryable = isinstance(e, (asyncio.TimeoutError, ConnectionError)) or type(e).__name__ in RETRYABLE_ERRORS
+                if not retryable or attempt >= self.retries:
+                    self.failures += 1
+                    raise
+                attempt += 1
+                self.retried += 1
+                # Full jitter keeps retries from a burst of failures from lining up
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+
+    async def _call(self, parts):
+        await self._bucket.acquire()
+        await self._semaphore.acquire()
+        self.calls += 1
+        self.active += 1
+        GEMINI_ACTIVE.inc()
+        if hasattr(self.model, "generate_content_async"):
+            try:
+                with stage_timer("llm_extraction"):
+                    return await asyncio.wait_for(self.model.generate_content_async(parts), self.timeout)
+            finally:
+                self._release()
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(None, self.model.generate_content, parts)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._thread_done)
+        with stage_timer("llm_extraction"):
+            # Shielded: a timeout must not mark the future done while its thread still runs
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def _thread_done(self, future):
+        if not future.cancelled():
+            # Retrieve the error of a call nobody awaits any more (it timed out)
+            future.exception()
+        self._release()
+
+    def _release(self):
+        self.active -= 1
+        GEMINI_ACTIVE.dec()
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rate_per_minute": self.rate_per_minute,
+            "active": self.active,
+            "in_flight_keys": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "failures": self.failures,
+            "rate_limited_seconds": round(self._bucket.waited_seconds, 3),
+        }
+
+
+def client_for(model):
+    """Client tuned by GEMINI_MAX_CONCURRENCY, GEMINI_RATE_PER_MINUTE, GEMINI_TIMEOUT, ..."""
+    return AsyncGeminiClient(
+        model,
+        max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+        rate_per_minute=float(os.getenv("GEMINI_RATE_PER_MINUTE", "15")),
+        burst=int(os.getenv("GEMINI_BURST", "1")),
+        timeout=float(os.getenv("GEMINI_TIMEOUT", "30")),
+        retries=int(os.getenv("GEMINI_RETRIES", "2")),
+        backoff=float(os.getenv("GEMINI_BACKOFF", "1.0")),
+    )
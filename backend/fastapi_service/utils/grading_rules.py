@@ -0,0 +1,139 @@
+"""
+Versioned, table-driven grading rules.
+
+Each version is a JSON table in grading_rules/<version>.json (or
+GRADING_RULES_DIR): the freshness formula and grade thresholds for produce,
+and the parameters and out-of-range limits for soil reports. Agronomists
+change the rules by adding a new version; GRADING_RULES_VERSION picks the
+active one (default: the newest), and results carry `rules_version` so
+stored rows can be re-graded when it changes (Django's `regrade` command,
+via /api/grading/*).
+
+Scoring is column-oriented: one call grades whole NumPy arrays, which is
+what bulk re-grading uses; the per-request helpers (calculate_freshness,
+grade_produce, LabReportAnalyzer.calculate_grade) are the same functions
+called with one row.
+
+Produce grades are checked in table order and the first whose
+`freshness_above` / `confidence_above` (strict) both hold wins. A soil
+parameter is out of range when its status remark is in `out_of_range`, or,
+if the parameter has a `range: [low, high]` and a numeric value, when the
+value falls outside it (reported with `range_labels`, default low/high); the grade is the first whose `max_out_of_range`
+covers the count.
+"""
+import os
+import re
+import json
+from functools import lru_cache
+
+import numpy as np
+
+RULES_DIR = os.getenv(
+    "GRADING_RULES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "grading_rules"),
+)
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _version_key(version):
+    # v2 < v10
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+
+def available_versions():
+    names = (name[:-5] for name in os.listdir(RULES_DIR) if name.endswith(".json"))
+    return sorted(names, key=_version_key)
+
+
+class GradingRules:
+    def __init__(self, version, table):
+        self.version = version
+        self.table = table
+        produce, soil = table["produce"], table["soil"]
+        self.freshness_rules = produce["freshness"]
+        self.produce_grades = produce["grades"]
+        self.soil_parameters = soil["parameters"]
+        self.soil_grades = soil["grades"]
+        self._produce_names = np.array([row["grade"] for row in self.produce_grades])
+        self._produce_labels = np.array([row["label"] for row in self.produce_grades])
+        self._soil_names = np.array([row["grade"] for row in self.soil_grades])
+        self._soil_descriptions = np.array([row["description"] for row in self.soil_grades])
+
+    def freshness(self, saturation, defect_count):
+        """Freshness 0-100 from colour saturation (NaN: default) and surface defect counts"""
+        rules = self.freshness_rules
+        saturation = np.asarray(saturation, dtype=np.float64)
+        saturation = np.where(np.isnan(saturation), rules["default_saturation"], saturation)
+        base = np.minimum(rules["max"], saturation * rules["saturation_weight"])
+        penalty = np.nan_to_num(np.asarray(defect_count, dtype=np.float64)) * rules["defect_penalty"]
+        return np.maximum(0.0, base - penalty)
+
+    def grade_produce(self, confidence, freshness):
+        """Returns (grades, labels) arrays for model confidence and freshness arrays"""
+        confidence = np.asarray(confidence, dtype=np.float64)
+        freshness = np.asarray(freshness, dtype=np.float64)
+        conditions = []
+        for row in self.produce_grades[:-1]:
+            condition = np.ones(freshness.shape, dtype=bool)
+            if "freshness_above" in row:
+                condition &= freshness > row["freshness_above"]
+            if "confidence_above" in row:
+                condition &= confidence > row["confidence_above"]
+            conditions.append(condition)
+        # The last row is the catch-all
+        index = np.select(conditions, np.arange(len(conditions)), default=len(self.produce_grades) - 1)
+        return self._produce_names[index], self._produce_labels[index]
+
+    def soil_out_of_range(self, columns):
+        """
+        (n, parameters) mask of out-of-range parameters plus the matching
+        low/high/remark text. `columns` maps "<key>_status" to status remarks
+        and "<key>" to values (either may be missing or hold None).
+        """
+        size = max((len(column) for column in columns.values() if column is not None), default=0)
+        mask = np.zeros((size, len(self.soil_parameters)), dtype=bool)
+        statuses = []
+        for i, parameter in enumerate(self.soil_parameters):
+            remarks = columns.get(f"{parameter['key']}_status") or [None] * size
+            status = np.char.lower(np.array([remark or "" for remark in remarks], dtype=str))
+            out = np.isin(status, parameter["out_of_range"])
+            if parameter.get("range"):
+                low, high = parameter["range"]
+                below, above = parameter.get("range_labels", ["low", "high"])
+                values = np.array([_as_float(v) for v in columns.get(parameter["key"]) or [None] * size])
+                known = ~np.isnan(values)
+                status = np.where(known & (values < low), below, np.where(known & (values > high), above, status))
+                out = np.where(known, (values < low) | (values > high), out)
+            mask[:, i] = out
+            statuses.append(status)
+        return mask, statuses
+
+    def grade_soil(self, columns):
+        """Returns grades, descriptions, out-of-range counts and per-row issue lists"""
+        mask, statuses = self.soil_out_of_range(columns)
+        counts = mask.sum(axis=1)
+        conditions = [counts <= row["max_out_of_range"] for row in self.soil_grades[:-1]]
+        index = np.select(conditions, np.arange(len(conditions)), default=len(self.soil_grades) - 1)
+        labels = [parameter["label"] for parameter in self.soil_parameters]
+        issues = [
+            [f"{labels[j]} is {statuses[j][i]}" for j in np.flatnonzero(mask[i])]
+            for i in range(len(counts))
+        ]
+        return self._soil_names[index], self._soil_descriptions[index], counts, issues
+
+
+@lru_cache(maxsize=None)
+def load_rules(version=None):
+    """GradingRules for `version` (default: GRADING_RULES_VERSION, else the newest)"""
+    versions = available_versions()
+    version = version or os.getenv("GRADING_RULES_VERSION") or versions[-1]
+    if version not in versions:
+        raise ValueError(f"Unknown grading rules version {version!r}; available: {', '.join(versions)}")
+    with open(os.path.join(RULES_DIR, f"{version}.json")) as f:
+        return GradingRules(version, json.load(f))
@@ -1,24 +1,19 @@
 import cv2
 import numpy as np
+from utils.feature_extractor import get_extractor
 
-def process_image(image_path):
-    image = cv2.imread(image_path)
+def decode_image(image_bytes):
+    # Decode the upload once; every pipeline stage shares this BGR array
+    if not image_bytes:
+        # cv2.imdecode raises cv2.error (a 500) on an empty buffer rather than returning None
+        raise ValueError("Empty image upload")
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
     if image is None:
         raise ValueError("Image not found or invalid")
-    
-    # Convert to HSV for color saturation analysis
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    saturation = np.mean(hsv[:, :, 1])
-    
-    # Surface defect detection (simple contour analysis for demonstration)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blurred, 50, 150)
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    defects = [len(c) for c in contours if len(c) > 50] # Just a count of large contours
-    
-    return {
-        "saturation": float(saturation),
-        "defects": {"count": len(defects), "details": defects[:5]}
-    }
+    return image
+
+def process_image(image):
+    # Single downsampled HSV pass; returns the saturation/defects keys
+    # calculate_freshness expects, plus any extra features
+    return get_extractor().extract(image)
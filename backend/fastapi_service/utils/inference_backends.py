@@ -0,0 +1,167 @@
+"""
+Inference backends for the produce classifier.
+
+Every backend takes a float32 (N, 224, 224, 3) RGB batch scaled to [0, 1]
+and returns an (N, classes) array of scores, so the batcher and result
+code do not care which runtime is underneath:
+
+- tensorflow: the Keras .h5 / .keras file or SavedModel directory
+- onnx: ONNX Runtime on CPU (see ai-engine/export_model.py)
+- tflite: a .tflite flatbuffer via LiteRT, tflite-runtime or tf.lite
+- simulated: fixed scores, for the demo without weights
+
+INFERENCE_BACKEND selects one; 'auto' (default) goes by MODEL_PATH's
+extension and falls back to simulated when there is no model file. Only
+the chosen runtime is imported, so an ONNX or TFLite worker never loads
+TensorFlow.
+"""
+import os
+
+import numpy as np
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto")
+# Intra-op threads per worker; 0 lets the runtime decide (usually all cores)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+
+EXTENSIONS = {".h5": "tensorflow", ".keras": "tensorflow", ".onnx": "onnx", ".tflite": "tflite"}
+
+
+class InferenceBackend:
+    name = None
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path
+
+    def predict(self, batch):
+        """(N, 224, 224, 3) float32 -> (N, classes) scores"""
+        raise NotImplementedError
+
+    def info(self):
+        return {"backend": self.name, "model_path": self.model_path}
+
+
+class SimulatedBackend(InferenceBackend):
+    """Stand-in for the trained classifier while the demo has no weights"""
+
+    name = "simulated"
+
+    def predict(self, batch):
+        # Grade A: 0.92, Grade B: 0.05, Grade C: 0.03
+        return np.tile(np.array([0.92, 0.05, 0.03], dtype=np.float32), (len(batch), 1))
+
+
+class TensorFlowBackend(InferenceBackend):
+    name = "tensorflow"
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        import tensorflow as tf
+        if INFERENCE_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(INFERENCE_THREADS)
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+
+    def predict(self, batch):
+        # predict_on_batch skips predict()'s per-call dataset/callback setup
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class OnnxBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if INFERENCE_THREADS:
+            options.intra_op_num_threads = INFERENCE_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+def _tflite_interpreter():
+    # Smallest runtime first; full TensorFlow only as a last resort
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend(InferenceBackend):
+    name = "tflite"
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        Interpreter = _tflite_interpreter()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=INFERENCE_THREADS or None)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input["shape"][0])
+
+    def predict(self, batch):
+        interpreter = self.interpreter
+        if len(batch) != self._batch_size:
+            # Tensors are sized for one batch shape; re-plan when it changes
+            interpreter.resize_tensor_input(self.input["index"], list(batch.shape))
+            interpreter.allocate_tensors()
+            self.input = interpreter.get_input_details()[0]
+            self.output = interpreter.get_output_details()[0]
+            self._batch_size = len(batch)
+
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32 and scale:
+            # Full-integer model: quantize the input, dequantize the scores
+            batch = np.round(batch / scale + zero_point).astype(self.input["dtype"])
+        interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"], copy=False))
+        interpreter.invoke()
+        scores = interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32 and scale:
+            scores = (scores.astype(np.float32) - zero_point) * scale
+        return scores
+
+
+BACKENDS = {
+    "simulated": SimulatedBackend,
+    "tensorflow": TensorFlowBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+}
+
+
+def resolve_backend(name=None, model_path=None):
+    """(backend name, model path) for the configuration, after 'auto' detection"""
+    name = name or INFERENCE_BACKEND
+    model_path = model_path if model_path is not None else os.getenv("MODEL_PATH")
+    has_model = bool(model_path) and os.path.exists(model_path) and (
+        os.path.isdir(model_path) or os.path.getsize(model_path) > 0
+    )
+    if name == "auto":
+        if not has_model:
+            return "simulated", None
+        if os.path.isdir(model_path):
+            # SavedModel directory
+            return "tensorflow", model_path
+        extension = os.path.splitext(model_path)[1].lower()
+        if extension not in EXTENSIONS:
+            raise ValueError(f"Cannot infer the inference backend for {model_path}; set INFERENCE_BACKEND")
+        return EXTENSIONS[extension], model_path
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND {name!r}; expected auto or one of {', '.join(BACKENDS)}")
+    if name != "simulated" and not has_model:
+        raise ValueError(f"INFERENCE_BACKEND={name} needs MODEL_PATH to point at a model file")
+    return name, model_path
+
+
+def load_backend(name=None, model_path=None):
+    name, model_path = resolve_backend(name, model_path)
+    return BACKENDS[name](model_path)
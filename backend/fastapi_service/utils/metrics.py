@@ -0,0 +1,145 @@
+"""
+Prometheus metrics for the AI service.
+
+Per-route request counters and latency histograms come from MetricsMiddleware;
+pipeline stages are timed where they run (see STAGES). Queue gauges are read
+from the pools at scrape time, so they cost nothing on the request path.
+Label children are bound once up front: an observation is then a lock and a
+few float additions.
+
+Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, render_metrics merges the
+counters and histograms of all workers. The pool and batcher gauges describe
+one process only and are left out in that mode; without it, /metrics is the
+single worker that answered the scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from utils.profiling import record_stage
+
+# Latencies from a cache hit (~1 ms) to a slow Gemini call (~30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUESTS = Counter("krishi_http_requests_total", "HTTP requests", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "krishi_http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge("krishi_http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum")
+STAGE_LATENCY = Histogram(
+    "krishi_stage_duration_seconds", "Pipeline stage latency", ["stage"], buckets=LATENCY_BUCKETS
+)
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+GEMINI_ACTIVE = Gauge("krishi_gemini_active_calls", "Gemini calls in progress", multiprocess_mode="livesum")
+
+STAGE_NAMES = ("upload", "decode", "features", "preprocess", "inference", "pdf_ingest", "llm_extraction")
+STAGES = {name: STAGE_LATENCY.labels(name) for name in STAGE_NAMES}
+
+
+def observe_stage(stage, seconds):
+    STAGES[stage].observe(seconds)
+    record_stage(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage):
+    histogram = STAGES[stage]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed)
+        record_stage(stage, elapsed)
+
+
+def _worker_pool_stat(attr):
+    def read():
+        from utils import worker_pool
+        pool = worker_pool._pool
+        return getattr(pool, attr) if pool is not None else 0
+    return read
+
+
+def _batcher_queue_depth():
+    from utils import batcher
+    return batcher._batcher.stats()["queue_depth"] if batcher._batcher is not None else 0
+
+
+def scrape_time_gauge(name, documentation, read):
+    """
+    Gauge whose value is read() at scrape time. Returns None in multiprocess
+    mode, where only the workers' value files are collected and the gauge
+    would show up as a zero per worker.
+    """
+    if MULTIPROCESS:
+        return None
+    gauge = Gauge(name, documentation)
+    gauge.set_function(read)
+    return gauge
+
+
+scrape_time_gauge("krishi_worker_pool_in_flight", "CPU jobs running or waiting", _worker_pool_stat("in_flight"))
+scrape_time_gauge("krishi_worker_pool_queue_depth", "CPU jobs waiting for a worker", _worker_pool_stat("queue_depth"))
+scrape_time_gauge("krishi_inference_queue_depth", "Inputs waiting for the next inference batch", _batcher_queue_depth)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead). The
+    route label is the matched path template, so /produce/12 and /produce/13
+    share a series; unmatched paths are folded into one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+
+    def _series(self, method, route, status):
+        key = (method, route, status)
+        series = self._children.get(key)
+        if series is None:
+            series = (REQUESTS.labels(method, route, status), REQUEST_LATENCY.labels(method, route))
+            self._children[key] = series
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            counter, histogram = self._series(
+                scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            )
+            counter.inc()
+            histogram.observe(elapsed)
+
+
+def render_metrics():
+    """(body, content type) for /metrics; merges worker processes in multiprocess mode"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
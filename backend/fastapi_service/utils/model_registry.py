@@ -0,0 +1,78 @@
+import time
+import threading
+
+
+class ModelRegistry:
+    """
+    Loads each model exactly once and keeps it for the life of the process.
+
+    Models are registered at import time with a loader (and optional warm-up
+    callable) but nothing heavy runs until load_all() is called from the
+    FastAPI lifespan hook. get() falls back to loading on first use, so
+    scripts and worker processes that skip the lifespan still work.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._models = {}
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, warmup=None, required=True):
+        self._entries[name] = {"loader": loader, "warmup": warmup, "required": required}
+        self._status.setdefault(name, {"state": "registered", "required": required})
+
+    def _load(self, name):
+        entry = self._entries[name]
+        start = time.perf_counter()
+        try:
+            model = entry["loader"]()
+            load_seconds = time.perf_counter() - start
+            if entry["warmup"] is not None:
+                entry["warmup"](model)
+        except Exception as e:
+            self._status[name] = {"state": "failed", "required": entry["required"], "error": str(e)}
+            raise
+        self._models[name] = model
+        self._status[name] = {
+            "state": "ready",
+            "required": entry["required"],
+            "load_seconds": round(load_seconds, 4),
+            "warmup_seconds": round(time.perf_counter() - start - load_seconds, 4),
+        }
+        return model
+
+    def load_all(self):
+        """Load and warm up every registered model; optional ones may fail."""
+        for name in list(self._entries):
+            with self._lock:
+                if name in self._models:
+                    continue
+                try:
+                    self._load(name)
+                except Exception:
+                    if self._entries[name]["required"]:
+                        raise
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                return self._load(name)
+            return self._models[name]
+
+    @property
+    def ready(self):
+        return all(
+            name in self._models
+            for name, entry in self._entries.items()
+            if entry["required"]
+        )
+
+    def status(self):
+        return {name: dict(info) for name, info in self._status.items()}
+
+
+registry = ModelRegistry()
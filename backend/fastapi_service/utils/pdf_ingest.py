@@ -0,0 +1,120 @@
+"""
+PDF lab report ingestion.
+
+Most lab PDFs are generated, not scanned: the results table is already in the
+text layer and rasterising it only to have it read back is wasted work. When a
+page has no usable text (a scan), only those pages are rendered, at a DPI that
+matches the embedded scan instead of a fixed 300 DPI, and the raw pixmap samples
+are handed on without a PNG encode/decode round trip.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Bump when the ingestion output changes, so cached extractions are not reused
+INGEST_VERSION = "2"
+
+# Words that mark the page holding the results table
+RESULT_MARKERS = ("test results", "parameter", "result", "nitrogen", "phosphorus", "potassium", "normal range")
+MIN_RESULT_MARKERS = 3
+
+MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "40"))
+TARGET_LONG_SIDE = int(os.getenv("PDF_TARGET_LONG_SIDE", "2000"))  # pixels
+MIN_DPI = int(os.getenv("PDF_MIN_DPI", "100"))
+MAX_DPI = int(os.getenv("PDF_MAX_DPI", "300"))
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+
+
+@dataclass
+class RasterPage:
+    """One rendered page as raw RGB samples (row stride in bytes)"""
+    page_number: int
+    width: int
+    height: int
+    stride: int
+    dpi: int
+    samples: bytes
+
+    def to_pil(self):
+        from PIL import Image
+        # Wraps the buffer, no decode
+        return Image.frombuffer("RGB", (self.width, self.height), self.samples, "raw", "RGB", self.stride, 1)
+
+
+@dataclass
+class PdfContent:
+    page_count: int
+    text: Optional[str] = None          # results pages' text layer, when present
+    text_pages: List[int] = field(default_factory=list)
+    pages: List[RasterPage] = field(default_factory=list)
+
+    @property
+    def raster_bytes(self):
+        return sum(len(page.samples) for page in self.pages)
+
+
+def is_results_page(text):
+    lowered = text.lower()
+    return sum(marker in lowered for marker in RESULT_MARKERS) >= MIN_RESULT_MARKERS
+
+
+def adaptive_dpi(page):
+    """
+    Render so the long side is about TARGET_LONG_SIDE pixels, but never above
+    the resolution of an embedded scan (upsampling adds pixels, not detail).
+    """
+    long_side_in = max(page.rect.width, page.rect.height) / 72.0
+    dpi = TARGET_LONG_SIDE / long_side_in
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        if x1 - x0 <= 0:
+            continue
+        native = info["width"] / ((x1 - x0) / 72.0)
+        dpi = min(dpi, native)
+    return int(max(MIN_DPI, min(MAX_DPI, dpi)))
+
+
+def render_page(page, dpi=None):
+    import fitz
+    dpi = dpi or adaptive_dpi(page)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return RasterPage(page.number, pix.width, pix.height, pix.stride, dpi, pix.samples)
+
+
+def ingest_pdf(pdf_bytes: bytes, use_text_layer: bool = True) -> PdfContent:
+    """
+    Return the results pages' text if the PDF has a text layer, otherwise the
+    rendered pages without text (at most MAX_PAGES). Raises ValueError for
+    unreadable or empty PDFs.
+    """
+    import fitz
+
+    try:
+        document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as e:
+        raise ValueError(f"Could not open PDF: {e}")
+
+    with document:
+        if document.page_count == 0:
+            raise ValueError("PDF has no pages")
+        content = PdfContent(page_count=document.page_count)
+        texts = []
+        scanned = []
+        for page in document.pages(0, min(document.page_count, MAX_PAGES)):
+            text = page.get_text("text") if use_text_layer else ""
+            if len(text.strip()) >= MIN_TEXT_CHARS:
+                if is_results_page(text):
+                    texts.append(text)
+                    content.text_pages.append(page.number)
+            else:
+                scanned.append(page.number)
+
+        if texts:
+            content.text = "\n".join(texts)
+            return content
+
+        # No results table in the text layer: render the pages that have no
+        # text (scans); if every page has text but none matched, render them all
+        for number in scanned or range(min(document.page_count, MAX_PAGES)):
+            content.pages.append(render_page(document[number]))
+        return content
@@ -0,0 +1,110 @@
+"""
+Opt-in request profiling.
+
+Off unless PROFILING_ENABLED=1, and then the middleware is installed at all
+(main.py). When on, a request is profiled if it carries the X-Profile header
+(matching PROFILING_TOKEN when one is set) or is picked by
+PROFILING_SAMPLE_RATE. Header requests are always kept; sampled ones only
+when slower than PROFILING_THRESHOLD_MS. Captures hold the top of a cProfile
+report plus the pipeline stage timings and live in a bounded ring buffer
+read by /admin/profiles.
+
+cProfile sees the whole event-loop thread, so other requests running at the
+same time show up in a capture too; only one request is profiled at once.
+"""
+import io
+import os
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import deque
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+THRESHOLD_SECONDS = float(os.getenv("PROFILING_THRESHOLD_MS", "500")) / 1000.0
+BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
+TOP_FUNCTIONS = int(os.getenv("PROFILING_TOP_FUNCTIONS", "40"))
+PROFILE_TOKEN = os.getenv("PROFILING_TOKEN", "")
+ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+
+PROFILE_HEADER = b"x-profile"
+
+# Stage timings of the request being profiled (see metrics.stage_timer)
+current_capture = contextvars.ContextVar("current_capture", default=None)
+
+captures = deque(maxlen=BUFFER_SIZE)
+_profiler_lock = threading.Lock()
+
+
+def record_stage(stage, seconds):
+    capture = current_capture.get()
+    if capture is not None:
+        capture.append({"stage": stage, "ms": round(seconds * 1000, 3)})
+
+
+def _profile_text(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _reason(self, scope):
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if not PROFILE_TOKEN or value.decode() == PROFILE_TOKEN:
+                    return "header"
+                break
+        if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        reason = self._reason(scope) if scope["type"] == "http" else None
+        # One cProfile at a time per process
+        if reason is None or not _profiler_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stages = []
+        token = current_capture.set(stages)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+        finally:
+            _profiler_lock.release()
+            current_capture.reset(token)
+            elapsed = time.perf_counter() - start
+            if reason == "header" or elapsed >= THRESHOLD_SECONDS:
+                captures.append({
+                    "id": uuid.uuid4().hex[:12],
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "captured_at": time.time(),
+                    "reason": reason,
+                    "stages": stages,
+                    "profile": _profile_text(profiler),
+                })
@@ -1,7 +1,6 @@
+from utils.grading_rules import load_rules
+
 def grade_produce(inference_results, freshness_score):
-    if freshness_score > 85 and inference_results['confidence'] > 0.9:
-        return {"grade": "A", "label": "Premium"}
-    elif freshness_score > 60:
-        return {"grade": "B", "label": "Standard"}
-    else:
-        return {"grade": "C", "label": "Sub-standard"}
+    # One-row call of the vectorized rules; thresholds live in grading_rules/<version>.json
+    grades, labels = load_rules().grade_produce([inference_results['confidence']], [freshness_score])
+    return {"grade": str(grades[0]), "label": str(labels[0])}
@@ -0,0 +1,162 @@
+"""
+Rule-based extraction for text-layer soil lab reports.
+
+Soil health cards follow a handful of fixed layouts: a header with the lab
+name, a block of "Label / value" pairs and a results table of Parameter /
+Result / Unit / Normal Range / Remark. When a PDF has a text layer in one of
+these layouts, it is parsed here directly; the remote model is only called
+for reports that do not parse with full confidence.
+Output uses the same keys as the Gemini extraction, so calculate_grade and
+the Django side see no difference.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Bump when parsing rules change, so cached extractions are not reused
+PARSER_VERSION = "1"
+
+LOCAL_PARSER_ENABLED = os.getenv("LOCAL_REPORT_PARSER", "1") == "1"
+MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSER_MIN_CONFIDENCE", "1.0"))
+
+# Result-table row labels, matched at the start of a line
+PARAMETER_PATTERNS = {
+    "pH": re.compile(r"^(soil\s+)?ph\b", re.I),
+    "nitrogen": re.compile(r"^(available\s+)?nitrogen\b|^n$", re.I),
+    "phosphorus": re.compile(r"^(available\s+)?phosphorus\b|^p$", re.I),
+    "potassium": re.compile(r"^(available\s+)?potassium\b|^k$", re.I),
+    "organic_carbon": re.compile(r"^organic\s+carbon\b|^o\.?\s?c\.?$", re.I),
+}
+CORE_PARAMETERS = ("pH", "nitrogen", "phosphorus", "potassium")
+
+# Lines that end the row of the previous parameter
+SECTION_BREAK = re.compile(r"^(recommendations?|remarks?|authori[sz]ed|note|signature)\b", re.I)
+
+NUMBER = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])")
+RANGE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:–|—|-|to)\s*(\d+(?:\.\d+)?)")
+UNITS = re.compile(r"kg/ha|mg/kg|ppm|ds/m|%", re.I)
+
+SAMPLE_ID_LABELS = ("sample id", "sample no", "sample number", "sample code")
+REPORT_DATE_LABELS = ("report date", "report generated on", "date of report", "reported on", "date of issue")
+DATE_FORMATS = ("%d-%b-%Y", "%d-%B-%Y", "%d %b %Y", "%d %B %Y", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d")
+
+
+@dataclass
+class ParseResult:
+    parameters: Dict[str, Any]
+    confidence: float
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def confident(self):
+        return self.confidence >= MIN_CONFIDENCE
+
+
+def _lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _label_value(lines, labels):
+    """Value for a "Label" line followed by its value, or "Label: value" on one line"""
+    for i, line in enumerate(lines):
+        lowered = line.lower()
+        for label in labels:
+            if lowered == label and i + 1 < len(lines):
+                return lines[i + 1]
+            if lowered.startswith(label) and re.match(r"\s*[:\-]\s*\S", line[len(label):]):
+                return re.sub(r"^\s*[:\-]\s*", "", line[len(label):])
+    return None
+
+
+def parse_date(value):
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _status(name, remark, value, low, high):
+    """Normalise a table remark to the statuses calculate_grade understands"""
+    remark = (remark or "").lower()
+    if name == "pH":
+        if "acid" in remark:
+            return "Acidic"
+        if "alkal" in remark:
+            return "Alkaline"
+        if remark in ("normal", "neutral", "optimum", "good"):
+            return "Normal"
+        if value is not None and low is not None:
+            return "Acidic" if value < low else "Alkaline" if value > high else "Normal"
+        return None
+    if "low" in remark or "deficient" in remark:
+        return "Low"
+    if "high" in remark or "excess" in remark:
+        return "High"
+    if remark in ("adequate", "good", "sufficient", "medium", "optimum"):
+        return "Adequate"
+    if remark == "normal":
+        return "Normal"
+    if value is not None and low is not None:
+        return "Low" if value < low else "High" if value > high else "Normal"
+    return None
+
+
+def _parse_row(name, cells):
+    """cells: the label line and what follows it up to the next row"""
+    first = cells[0]
+    # Drop the label itself ("Nitrogen (N)") before looking for numbers
+    label = PARAMETER_PATTERNS[name].match(first)
+    rest = " ".join([re.sub(r"\(.*?\)", "", first[label.end():])] + cells[1:])
+
+    # Result first, then the normal range after it (a "-" unit cell sits in between for pH)
+    number = NUMBER.search(rest)
+    value = float(number.group(1)) if number else None
+    after = rest[number.end():] if number else rest
+
+    low = high = None
+    range_match = RANGE.search(after)
+    if range_match:
+        low, high = float(range_match.group(1)), float(range_match.group(2))
+        after = after[range_match.end():]
+    remark = UNITS.sub(" ", after).strip(" -") or None
+    return value, _status(name, remark, value, low, high)
+
+
+def parse_report_text(text: str) -> ParseResult:
+    lines = _lines(text)
+    rows = {}
+    current = None
+    for line in lines:
+        if SECTION_BREAK.match(line):
+            current = None
+            continue
+        matched = next((name for name, pattern in PARAMETER_PATTERNS.items() if pattern.match(line)), None)
+        if matched and matched not in rows:
+            current = matched
+            rows[current] = [line]
+        elif current:
+            rows[current].append(line)
+
+    parameters: Dict[str, Any] = {}
+    missing = []
+    for name in PARAMETER_PATTERNS:
+        value, status = _parse_row(name, rows[name]) if name in rows else (None, None)
+        parameters[name] = value
+        parameters[f"{name}_status"] = status
+        if name in CORE_PARAMETERS and (value is None or status is None):
+            missing.append(name)
+
+    lab_name = next((line for line in lines[:5] if re.search(r"\blab(oratory)?\b", line, re.I)), None)
+    parameters["report_date"] = parse_date(_label_value(lines, REPORT_DATE_LABELS))
+    parameters["lab_name"] = lab_name
+    parameters["sample_id"] = _label_value(lines, SAMPLE_ID_LABELS)
+
+    confidence = 1 - len(missing) / len(CORE_PARAMETERS)
+    return ParseResult(parameters, confidence, missing)
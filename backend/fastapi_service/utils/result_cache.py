@@ -0,0 +1,177 @@
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Content-addressed cache for analysis results.
+
+    Keys are the SHA-256 of the uploaded bytes plus a version string (model
+    or prompt version), so a re-upload of the same photo or PDF is served
+    without re-running OpenCV/inference or a Gemini call, while a model or
+    prompt change naturally misses. Values must be JSON-serializable.
+
+    Tier 1 is an in-process LRU bounded by `max_entries` with a TTL.
+    Tier 2, if `disk_path` is set, is a SQLite file shared across restarts
+    and worker processes; disk hits are promoted to memory. Every
+    `prune_every` writes, expired rows are deleted and the namespace is cut
+    back to its `disk_max_entries` rows that expire last.
+
+    Async callers use key_async/get_async/set_async, which hash and touch
+    SQLite in a thread so neither blocks the event loop.
+    """
+
+    def __init__(self, namespace, version, max_entries=1024, ttl_seconds=3600, disk_path=None,
+                 disk_max_entries=100000, prune_every=256):
+        self.namespace = namespace
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, namespace TEXT, value TEXT, expires_at REAL)"
+            )
+
+    def key(self, data, *parts):
+        digest = hashlib.sha256()
+        digest.update(data)
+        for part in (self.version,) + parts:
+            digest.update(b"\0" + str(part).encode())
+        return f"{self.namespace}:{digest.hexdigest()}"
+
+    async def key_async(self, data, *parts):
+        # SHA-256 of a multi-megabyte upload takes milliseconds; hashlib releases the GIL
+        return await asyncio.to_thread(self.key, data, *parts)
+
+    async def get_async(self, key):
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value):
+        if self._db is None:
+            return self.set(key, value)
+        return await asyncio.to_thread(self.set, key, value)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM result_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, namespace, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, self.namespace, json.dumps(value), expires_at),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune_disk(time.time())
+
+    def _prune_disk(self, now):
+        self._db.execute("DELETE FROM result_cache WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM result_cache WHERE key IN (SELECT key FROM result_cache WHERE namespace = ? "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.disk_max_entries),
+        )
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is not None:
+                self._prune_disk(now)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "disk": bool(self._db),
+        }
+
+
+_caches = {}
+
+
+def get_cache(namespace, version):
+    """
+    One cache per namespace, sized by RESULT_CACHE_SIZE / RESULT_CACHE_TTL.
+    RESULT_CACHE_DB enables the shared SQLite tier, capped per namespace at
+    RESULT_CACHE_DB_SIZE rows. A new `version` replaces the namespace's
+    cache, dropping the old version's memory tier.
+    """
+    cache = _caches.get(namespace)
+    if cache is None or cache.version != version:
+        cache = ResultCache(
+            namespace,
+            version,
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", "86400")),
+            disk_path=os.getenv("RESULT_CACHE_DB") or None,
+            disk_max_entries=int(os.getenv("RESULT_CACHE_DB_SIZE", "100000")),
+        )
+        _caches[namespace] = cache
+    return cache
+
+
+def cache_stats():
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
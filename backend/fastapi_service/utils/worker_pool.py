@@ -0,0 +1,81 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already holds as much work as it is allowed to queue."""
+
+
+class WorkerPool:
+    """
+    Runs CPU-bound work (OpenCV, inference) off the event loop.
+
+    mode="thread" suits OpenCV/NumPy, which release the GIL; mode="process"
+    isolates pure-Python work. At most `size` jobs run at once and at most
+    `max_queue` more wait for a slot; anything beyond that is rejected with
+    PoolSaturated so the caller can answer 503 instead of piling up requests.
+    """
+
+    def __init__(self, mode="thread", size=None, max_queue=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool mode: {mode}")
+        self.mode = mode
+        self.size = size or os.cpu_count() or 1
+        self.max_queue = self.size * 2 if max_queue is None else max_queue
+        executor_cls = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        self._executor = executor_cls(max_workers=self.size)
+        self._slots = None
+        self._pending = 0
+
+    @property
+    def in_flight(self):
+        """Jobs currently running or waiting for a worker."""
+        return self._pending
+
+    @property
+    def queue_depth(self):
+        """Jobs accepted but not yet running."""
+        return max(0, self._pending - self.size)
+
+    async def run(self, fn, *args):
+        if self._pending >= self.size + self.max_queue:
+            raise PoolSaturated(f"Worker pool saturated ({self._pending} jobs in flight)")
+        if self._slots is None:
+            # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.size)
+
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_pool = None
+
+
+def get_worker_pool():
+    """Process-wide pool configured from WORKER_POOL_MODE/SIZE/MAX_QUEUE."""
+    global _pool
+    if _pool is None:
+        size = os.getenv("WORKER_POOL_SIZE")
+        max_queue = os.getenv("WORKER_POOL_MAX_QUEUE")
+        _pool = WorkerPool(
+            mode=os.getenv("WORKER_POOL_MODE", "thread"),
+            size=int(size) if size else None,
+            max_queue=int(max_queue) if max_queue else None,
+        )
+    return _pool
+
+
+def shutdown_worker_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
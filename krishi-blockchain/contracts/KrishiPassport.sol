@@ -23,6 +23,10 @@ contract KrishiPassport {
 
     mapping(uint256 => Passport) private passports;
 
+    // Merkle root of a batch of off-chain quality hashes => anchor timestamp
+    mapping(bytes32 => uint256) public anchoredRoots;
+    uint256 public anchorCount;
+
     event PassportCreated(
         uint256 indexed id,
         address indexed farmer,
@@ -34,6 +38,12 @@ contract KrishiPassport {
         address indexed verifier
     );
 
+    event RootAnchored(
+        bytes32 indexed root,
+        uint256 leafCount,
+        uint256 indexed batchId
+    );
+
     event AdminTransferred(
         address indexed oldAdmin,
         address indexed newAdmin
@@ -98,6 +108,30 @@ contract KrishiPassport {
         emit PassportVerified(_id, msg.sender);
     }
 
+    /// @notice Anchor one Merkle root covering a batch of quality hashes.
+    /// Membership of a single hash is proven off-chain with its proof.
+    function anchorRoot(bytes32 _root, uint256 _leafCount)
+        external
+        onlyAdmin
+    {
+        require(_root != bytes32(0), "Invalid root");
+        require(_leafCount > 0, "Empty batch");
+        require(anchoredRoots[_root] == 0, "Root already anchored");
+
+        anchorCount++;
+        anchoredRoots[_root] = block.timestamp;
+
+        emit RootAnchored(_root, _leafCount, anchorCount);
+    }
+
+    function isRootAnchored(bytes32 _root)
+        external
+        view
+        returns (bool)
+    {
+        return anchoredRoots[_root] != 0;
+    }
+
     function getPassport(uint256 _id)
         external
         view